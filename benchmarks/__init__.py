@@ -0,0 +1,7 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Stand-alone performance measurements for MeshCore Monitor.
+
+Run each module directly, e.g. ``python -m benchmarks.ws_encoding``.
+"""
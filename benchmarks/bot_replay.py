@@ -0,0 +1,281 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Replay a packet stream through the bot worker and report throughput.
+
+Runs the real :func:`~server.bot.worker.start_bot_worker` — rule index,
+rate limits, action dispatcher and pooled HTTP client — against a
+throwaway SQLite database.  Webhook and ``send_message`` actions go to a
+local stub HTTP server, so the figures include real HTTP round trips but
+no external services.  Events enter through the bot channel handler, as
+published by the ingest router.
+
+For each rule-set size it reports events per second, per-event
+evaluation latency, enqueue-to-evaluate lag and what the actions did.
+
+Usage::
+
+    python -m benchmarks.bot_replay [--events 5000] [--rules 10 100 1000]
+    python -m benchmarks.bot_replay --replay packets.ndjson
+
+``--replay`` takes the NDJSON produced by
+``GET /api/packets/export?format=ndjson``.
+"""
+
+import os
+import tempfile
+
+# Configure the server before importing it.
+_workdir = tempfile.mkdtemp(prefix="meshcore-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_workdir}/bench.db")
+os.environ.setdefault("BOT_LOCK_PATH", os.path.join(_workdir, "bot.lock"))
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import random  # noqa: E402
+import string  # noqa: E402
+import threading  # noqa: E402
+import time  # noqa: E402
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # noqa: E402
+
+from sqlmodel import delete  # noqa: E402
+
+from server.bot import actions, worker  # noqa: E402
+from server.bot.event_queue import BotEventQueue  # noqa: E402
+from server.bot.rules import RuleEngine, bump_rules_version  # noqa: E402
+from server.database import create_db, get_session  # noqa: E402
+from server.models import BotRule  # noqa: E402
+
+PACKET_TYPES = ["ADVERT", "TXT_MSG", "ACK", "TRACE", "PATH"]
+
+
+class StubServer:
+    """Threaded HTTP server answering every POST with 204.
+
+    Attributes:
+        url: Base URL of the server.
+        requests: Number of requests served.
+    """
+
+    def __init__(self) -> None:
+        stub = self
+        self.requests = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:  # noqa: N802
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.requests += 1
+                self.send_response(204)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        host, port = self._server.server_address[:2]
+        self.url = f"http://{host}:{port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        """Stop serving."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def random_word(rng: random.Random) -> str:
+    """Return a random lower-case word of 3-8 letters."""
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
+
+
+def seed_rules(
+    count: int,
+    rng: random.Random,
+    vocabulary: list[str],
+    nodes: list[str],
+    stub_url: str,
+) -> None:
+    """Replace all bot rules with *count* rules of mixed trigger types.
+
+    Triggers cycle through ``keyword``, ``node_seen``, ``word`` and
+    ``regex``, with one ``packet_type`` rule per 50 (these match a large
+    share of traffic).  Every third rule posts a webhook to the stub
+    server, the rest log.
+    """
+    with get_session() as session:
+        session.exec(delete(BotRule))
+        for i in range(count):
+            kind = i % 4
+            if i % 50 == 0:
+                trigger = ("packet_type", rng.choice(PACKET_TYPES))
+            elif kind == 0:
+                trigger = ("keyword", rng.choice(vocabulary))
+            elif kind == 1:
+                trigger = ("node_seen", rng.choice(nodes))
+            elif kind == 2:
+                trigger = ("word", rng.choice(vocabulary))
+            else:
+                trigger = ("regex", rf"\bch{i}\b")
+            if i % 3 == 0:
+                action = ("webhook", {"url": f"{stub_url}/hook/{i % 8}"})
+            else:
+                action = ("log", {})
+            session.add(
+                BotRule(
+                    name=f"bench-{i}",
+                    trigger_type=trigger[0],
+                    trigger_value=trigger[1],
+                    action_type=action[0],
+                    action_config=json.dumps(action[1]),
+                )
+            )
+        session.commit()
+    bump_rules_version()
+
+
+def synthetic_events(
+    count: int, rng: random.Random, vocabulary: list[str], nodes: list[str]
+) -> list[dict]:
+    """Build packet events with text payloads drawn partly from *vocabulary*."""
+    events = []
+    for i in range(count):
+        words = [
+            rng.choice(vocabulary) if rng.random() < 0.05 else random_word(rng)
+            for _ in range(rng.randint(3, 12))
+        ]
+        events.append(
+            {
+                "type": "packet",
+                "data": {
+                    "id": i + 1,
+                    "packet_type": rng.choice(PACKET_TYPES),
+                    "source_hash": rng.choice(nodes),
+                    "payload_hex": " ".join(words).encode().hex(),
+                    "hop_count": rng.randint(0, 6),
+                    "rssi": rng.randint(-120, -60),
+                    "snr": round(rng.uniform(-10, 12), 2),
+                },
+            }
+        )
+    return events
+
+
+def load_events(path: str) -> list[dict]:
+    """Read packet events from an NDJSON export."""
+    with open(path, encoding="utf-8") as fh:
+        return [
+            {"type": "packet", "data": json.loads(line)} for line in fh if line.strip()
+        ]
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return the *fraction* percentile of *values* (0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_once(events: list[dict], batch: int, queue_size: int) -> dict:
+    """Feed *events* through a fresh bot worker and measure it.
+
+    Returns:
+        Dict of throughput, latency and action figures.
+    """
+    timings: list[float] = []
+    evaluate = RuleEngine.evaluate
+
+    async def timed_evaluate(self, event, executor):
+        start = time.perf_counter()
+        await evaluate(self, event, executor)
+        timings.append(time.perf_counter() - start)
+
+    RuleEngine.evaluate = timed_evaluate
+    worker.event_queue = BotEventQueue(maxsize=queue_size)
+    await actions.executor.start()
+    task = asyncio.create_task(worker.start_bot_worker())
+    try:
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        for offset in range(0, len(events), batch):
+            await worker._receive({"events": events[offset : offset + batch]})
+            await asyncio.sleep(0)
+        queue = worker.event_queue
+        while len(timings) < queue.counts["enqueued"] - queue.counts["dropped"]:
+            await asyncio.sleep(0.001)
+        evaluated = time.perf_counter() - start
+        await worker.dispatcher.drain()
+        elapsed = time.perf_counter() - start
+        actions_stats = worker.dispatcher.stats()["actions"]
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        RuleEngine.evaluate = evaluate
+        await actions.executor.stop()
+    return {
+        "events": len(events),
+        "filtered": queue.counts["filtered"],
+        "dropped": queue.counts["dropped"],
+        "eval_events_per_s": len(events) / evaluated,
+        "events_per_s": len(events) / elapsed,
+        "eval_p50_us": percentile(timings, 0.5) * 1e6,
+        "eval_p99_us": percentile(timings, 0.99) * 1e6,
+        "lag_p50_ms": queue.lag.percentile(0.5) * 1000 if timings else 0.0,
+        "lag_p95_ms": queue.lag.percentile(0.95) * 1000 if timings else 0.0,
+        "actions": sum(a.get("succeeded", 0) for a in actions_stats.values()),
+        "failed": sum(a.get("failed", 0) for a in actions_stats.values()),
+    }
+
+
+def main() -> None:
+    """Run the replay for each rule-set size and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--batch", type=int, default=50, help="events per publish")
+    parser.add_argument("--queue-size", type=int, default=100_000)
+    parser.add_argument("--replay", help="NDJSON packet export to replay")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    create_db()
+    rng = random.Random(args.seed)
+    vocabulary = [random_word(rng) for _ in range(500)]
+    nodes = [f"{n:02X}" for n in range(256)]
+    if args.replay:
+        events = load_events(args.replay)
+    else:
+        events = synthetic_events(args.events, rng, vocabulary, nodes)
+
+    stub = StubServer()
+    actions.REPEATER_URL = stub.url
+    print(
+        f"{'rules':>6} {'ev/s':>8} {'eval ev/s':>10} {'p50 µs':>8} {'p99 µs':>8}"
+        f" {'lag p50 ms':>11} {'lag p95 ms':>11} {'filtered':>9} {'dropped':>8}"
+        f" {'actions':>8} {'http':>6}"
+    )
+    try:
+        for count in args.rules:
+            seed_rules(count, rng, vocabulary, nodes, stub.url)
+            stub.requests = 0
+            result = asyncio.run(run_once(events, args.batch, args.queue_size))
+            print(
+                f"{count:>6} {result['events_per_s']:>8.0f}"
+                f" {result['eval_events_per_s']:>10.0f}"
+                f" {result['eval_p50_us']:>8.1f} {result['eval_p99_us']:>8.1f}"
+                f" {result['lag_p50_ms']:>11.1f} {result['lag_p95_ms']:>11.1f}"
+                f" {result['filtered']:>9} {result['dropped']:>8}"
+                f" {result['actions']:>8} {stub.requests:>6}"
+            )
+    finally:
+        stub.close()
+
+
+if __name__ == "__main__":
+    main()
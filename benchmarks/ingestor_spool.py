@@ -0,0 +1,162 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Measure how fast the ingestor spool absorbs and drains a backlog.
+
+Simulates a monitor outage: ``--records`` normalized packets are written
+to a fresh :class:`~ingestor.mc_ingestor.Spool` in ingest-sized batches,
+then drained with :meth:`~ingestor.mc_ingestor.MCIngestor.drain_spool`
+over real HTTP — into a local stub server by default, or into a running
+monitor with ``--monitor``.
+
+Usage::
+
+    python -m benchmarks.ingestor_spool [--records 20000]
+        [--drain-batch 100 500 1000 5000] [--monitor URL --api-key KEY]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from ingestor.mc_ingestor import MCIngestor, Spool
+
+WRITE_BATCH = 200
+"""Records per spool write, matching the default ``batch.max_size``."""
+
+
+class StubMonitor:
+    """Threaded HTTP server accepting every ingest POST.
+
+    Attributes:
+        url: Base URL of the server.
+    """
+
+    def __init__(self) -> None:
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this,
+            # Nagle plus delayed ACKs add ~40 ms to every response.
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:  # noqa: N802
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                body = b'{"saved": 0}'
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        host, port = self._server.server_address[:2]
+        self.url = f"http://{host}:{port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        """Stop serving."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def synthetic_records(count: int, seed: int = 1) -> list[dict]:
+    """Build normalized packet dicts like :meth:`MCIngestor.normalize_packet`."""
+    rng = random.Random(seed)
+    ingestor = MCIngestor(
+        {"repeater": {"url": ""}, "monitor": {"url": "", "api_key": ""}}
+    )
+    nodes = [f"{n:02X}" for n in range(256)]
+    return [
+        ingestor.normalize_packet(
+            {
+                "hash": f"{rng.getrandbits(64):016x}",
+                "type": rng.choice(["ADVERT", "TXT_MSG", "ACK", "TRACE"]),
+                "route_type": "FLOOD",
+                "path": rng.sample(nodes, rng.randint(0, 4)),
+                "rssi": rng.randint(-120, -60),
+                "snr": round(rng.uniform(-10, 12), 2),
+                "payload_hex": rng.randbytes(rng.randint(8, 120)).hex(),
+                "timestamp": f"2026-01-01T00:00:{i % 60:02d}+00:00",
+            }
+        )
+        for i in range(count)
+    ]
+
+
+async def drain(
+    path: str, monitor_url: str, api_key: str, drain_batch: int
+) -> tuple[int, float]:
+    """Drain the spool at *path* into *monitor_url*.
+
+    Returns:
+        ``(records sent, seconds)``.
+    """
+    ingestor = MCIngestor(
+        {
+            "repeater": {"url": ""},
+            "monitor": {"url": monitor_url, "api_key": api_key},
+            "spool": {"path": path, "drain_batch_size": drain_batch},
+        }
+    )
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        start = time.perf_counter()
+        sent = await ingestor.drain_spool(client)
+        elapsed = time.perf_counter() - start
+    ingestor.spool.close()
+    return sent, elapsed
+
+
+def main() -> None:
+    """Fill and drain a spool for each drain batch size and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument(
+        "--drain-batch", type=int, nargs="+", default=[100, 500, 1000, 5000]
+    )
+    parser.add_argument("--monitor", help="monitor base URL (default: stub)")
+    parser.add_argument("--api-key", default="")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    records = synthetic_records(args.records)
+    stub = None if args.monitor else StubMonitor()
+    monitor_url = args.monitor or stub.url
+    print(f"{args.records} records, spool writes of {WRITE_BATCH}")
+    print(f"{'drain batch':>11} {'write rec/s':>12} {'drain rec/s':>12} {'MB':>6}")
+    try:
+        for drain_batch in args.drain_batch:
+            with tempfile.TemporaryDirectory(prefix="mc-spool-") as workdir:
+                path = os.path.join(workdir, "spool.db")
+                spool = Spool(path)
+                start = time.perf_counter()
+                for offset in range(0, len(records), WRITE_BATCH):
+                    spool.append("packets", records[offset : offset + WRITE_BATCH])
+                written = time.perf_counter() - start
+                megabytes = spool.bytes / 2**20
+                spool.close()
+                sent, elapsed = asyncio.run(
+                    drain(path, monitor_url, args.api_key, drain_batch)
+                )
+            print(
+                f"{drain_batch:>11} {len(records) / written:>12.0f}"
+                f" {sent / elapsed:>12.0f} {megabytes:>6.1f}"
+            )
+    finally:
+        if stub is not None:
+            stub.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Compare keyword rule matching strategies at 10, 100 and 1,000 rules.
+
+For each rule count, times three ways of firing ``keyword`` rules over the
+same stream of text packets:
+
+* ``per-rule`` — :meth:`RuleEngine._matches` for every rule, decoding the
+  payload once per rule (the original engine loop).
+* ``scan`` — :class:`~server.bot.index.KeywordMatcher` below its automaton
+  threshold: one decode, then ``str.find`` per distinct keyword.
+* ``automaton`` — the same matcher forced onto its Aho-Corasick automaton.
+
+Usage::
+
+    python -m benchmarks.keyword_matching [--packets 2000] [--rules 10 100 1000]
+"""
+
+import argparse
+import asyncio
+import random
+import string
+import time
+from typing import Callable
+
+from server.bot import index as bot_index
+from server.bot.index import RuleIndex
+from server.bot.rules import RuleEngine
+from server.models import BotRule
+
+
+def random_word(rng: random.Random) -> str:
+    """Return a random lower-case word of 3-8 letters."""
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
+
+
+def synthetic_events(count: int, vocabulary: list[str], seed: int = 1) -> list[dict]:
+    """Build packet events whose payloads are short text messages.
+
+    Roughly one word in twenty is drawn from *vocabulary* so some rules
+    fire; the rest are random.
+    """
+    rng = random.Random(seed)
+    events = []
+    for _ in range(count):
+        words = [
+            rng.choice(vocabulary) if rng.random() < 0.05 else random_word(rng)
+            for _ in range(rng.randint(4, 14))
+        ]
+        payload = " ".join(words).encode()
+        events.append({"type": "packet", "data": {"payload_hex": payload.hex()}})
+    return events
+
+
+def time_per_event(match: Callable[[dict], object], events: list[dict]) -> float:
+    """Return the mean time in microseconds of ``match(event)``."""
+    start = time.perf_counter()
+    for event in events:
+        match(event)
+    return (time.perf_counter() - start) / len(events) * 1e6
+
+
+def main() -> None:
+    """Run the comparison and print one row per rule count."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--packets", type=int, default=2000)
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    engine = RuleEngine()
+    print(f"{'rules':>6} {'per-rule µs':>12} {'scan µs':>9} {'automaton µs':>13}")
+    for count in args.rules:
+        keywords = [random_word(rng) for _ in range(count)]
+        rules = [
+            BotRule(
+                id=i,
+                name=f"kw{i}",
+                trigger_type="keyword",
+                trigger_value=keyword,
+                action_type="log",
+            )
+            for i, keyword in enumerate(keywords, start=1)
+        ]
+        events = synthetic_events(args.packets, keywords)
+
+        async def per_rule(event: dict) -> list[BotRule]:
+            return [r for r in rules if await engine._matches(r, event)]
+
+        naive = time_per_event(lambda e: asyncio.run(per_rule(e)), events)
+        # asyncio.run overhead is not part of the matching cost.
+        naive -= time_per_event(lambda e: asyncio.run(asyncio.sleep(0)), events)
+
+        bot_index.AUTOMATON_MIN_KEYWORDS = count + 1
+        scan = time_per_event(RuleIndex(rules).match, events)
+        bot_index.AUTOMATON_MIN_KEYWORDS = 1
+        automaton = time_per_event(RuleIndex(rules).match, events)
+        print(f"{count:>6} {naive:>12.1f} {scan:>9.1f} {automaton:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Report WebSocket bytes per packet for every codec and framing option.
+
+Encodes a synthetic stream of packets the way
+:class:`~server.routers.ws.ConnectionManager` does — one frame per packet
+(v1) or one array frame per batch (v2) — with each available codec, and
+with and without per-message deflate (raw DEFLATE with a context carried
+across messages, as browsers and uvicorn negotiate by default).
+
+Usage::
+
+    python -m benchmarks.ws_encoding [--packets 500] [--batch 50]
+"""
+
+import argparse
+import random
+import zlib
+from datetime import UTC, datetime, timedelta
+
+from server.routers.ws import CODECS, BroadcastEvent, _FrameEncoder
+
+
+def synthetic_packets(count: int, seed: int = 1) -> list[dict]:
+    """Build packet dicts shaped like the ingest broadcast payload.
+
+    Args:
+        count: Number of packets.
+        seed: RNG seed for reproducible output.
+
+    Returns:
+        List of packet dicts.
+    """
+    rng = random.Random(seed)
+    base = datetime(2026, 1, 1, tzinfo=UTC)
+    nodes = [f"{i:02X}" for i in rng.sample(range(256), 40)]
+    packets = []
+    for i in range(count):
+        path = rng.sample(nodes, rng.randint(0, 4))
+        packets.append(
+            {
+                "id": i + 1,
+                "received_at": (base + timedelta(seconds=i * 3)).isoformat(),
+                "packet_hash": f"{rng.getrandbits(64):016x}",
+                "packet_type": rng.choice(["ADVERT", "TXT_MSG", "ACK", "TRACE"]),
+                "route_type": rng.choice(["FLOOD", "DIRECT"]),
+                "payload_hex": rng.randbytes(rng.randint(8, 48)).hex(),
+                "path": str(path).replace("'", '"'),
+                "hop_count": len(path),
+                "rssi": rng.randint(-120, -60),
+                "snr": round(rng.uniform(-10, 12), 2),
+                "source_hash": path[0] if path else None,
+                "dest_hash": None,
+                "raw_json": None,
+            }
+        )
+    return packets
+
+
+def measure(packets: list[dict], batch: int, protocol: int, codec: str) -> dict:
+    """Encode *packets* in batches and total the bytes on the wire.
+
+    Args:
+        packets: Packet dicts to send.
+        batch: Packets per ingest batch.
+        protocol: 1 (frame per packet) or 2 (array frame per batch).
+        codec: Codec name from :data:`CODECS`.
+
+    Returns:
+        Dict with raw and deflated bytes per packet.
+    """
+    compressor = zlib.compressobj(wbits=-15)
+    raw = deflated = 0
+    for start in range(0, len(packets), batch):
+        chunk = packets[start : start + batch]
+        events = [BroadcastEvent(start + i, "packet", p) for i, p in enumerate(chunk)]
+        encoder = _FrameEncoder(events)
+        for frame, _ in encoder.frames(tuple(range(len(events))), protocol, codec):
+            payload = frame.encode() if isinstance(frame, str) else frame
+            compressed = compressor.compress(payload)
+            compressed += compressor.flush(zlib.Z_SYNC_FLUSH)
+            raw += len(payload)
+            # permessage-deflate strips the trailing 00 00 ff ff marker
+            deflated += len(compressed) - 4
+    return {
+        "raw": raw / len(packets),
+        "deflate": deflated / len(packets),
+    }
+
+
+def main() -> None:
+    """Print a bytes-per-packet table for every codec and protocol."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--packets", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=50)
+    args = parser.parse_args()
+
+    packets = synthetic_packets(args.packets)
+    print(f"{args.packets} packets, {args.batch} per ingest batch")
+    print(f"{'codec':<8} {'protocol':<9} {'bytes/pkt':>10} {'+deflate':>10}")
+    for codec in CODECS:
+        for protocol in (1, 2):
+            result = measure(packets, args.batch, protocol, codec)
+            print(
+                f"{codec:<8} v{protocol:<8} {result['raw']:>10.1f} "
+                f"{result['deflate']:>10.1f}"
+            )
+    missing = {"msgpack", "cbor"} - set(CODECS)
+    if missing:
+        print(f"(not installed: {', '.join(sorted(missing))})")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,35 @@ MeshCore Monitor Ingestor.
 Polls pyMC_Repeater's HTTP API and forwards normalized data to the
 MeshCore Monitor server.  Designed to run on the Pi alongside
 pyMC_Repeater, or remotely if the Pi is reachable over the network.
+
+Packets and neighbors are polled by independent loops on their own
+intervals.  Both feed a :class:`BatchQueue` drained by a single sender,
+so a slow monitor server never delays polling.  Neighbor tables are
+uploaded as deltas against what was last sent (see
+:class:`NeighborTracker`).  With a :class:`Spool`
+configured, every batch is written to disk before it is sent, so a
+monitor outage (or an ingestor restart) loses nothing.
+
+One process can serve several repeaters (see :class:`Repeater`): each
+poll cycle queries all of them concurrently over one shared HTTP client,
+drops packets another repeater already forwarded, and queues the merged
+result, so the monitor receives one batch per cycle rather than one per
+repeater.
 """
 
 import asyncio
+import hashlib
 import json
 import logging
+import math
+import os
+import sqlite3
+import struct
+import time
+from collections import deque
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Awaitable, Callable
 
 import httpx
 import yaml
@@ -21,32 +43,688 @@ import yaml
 logger = logging.getLogger("mc-ingestor")
 
 
+class BatchQueue:
+    """Bounded per-endpoint queue released in batches by size or age.
+
+    A batch for an endpoint is ready once it holds ``max_size`` records
+    or its oldest record has waited ``max_age`` seconds.  When the queue
+    holds ``capacity`` records, adding one drops the oldest queued record
+    of the same endpoint, so neither kind of data can starve the other.
+
+    Attributes:
+        dropped: Records discarded because the queue was full.
+        on_drop: Called with the endpoint of every discarded record.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 200,
+        max_age: float = 1.0,
+        capacity: int = 10000,
+        on_drop: Callable[[str], None] | None = None,
+    ) -> None:
+        self.max_size = max_size
+        self.max_age = max_age
+        self.capacity = capacity
+        self.dropped = 0
+        self.on_drop = on_drop
+        self._pending: dict[str, deque[dict]] = {}
+        self._since: dict[str, float] = {}
+        self._count = 0
+        self._changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def put(self, endpoint: str, record: dict) -> None:
+        """Queue *record* for ``POST /ingest/<endpoint>``."""
+        pending = self._pending.get(endpoint)
+        if pending is None:
+            pending = self._pending[endpoint] = deque()
+            self._since[endpoint] = time.monotonic()
+        if self._count >= self.capacity and pending:
+            pending.popleft()
+            self._count -= 1
+            self.dropped += 1
+            if self.on_drop is not None:
+                self.on_drop(endpoint)
+        pending.append(record)
+        self._count += 1
+        self._changed.set()
+
+    def _take(self, endpoint: str) -> list[dict]:
+        """Remove and return up to ``max_size`` records of *endpoint*."""
+        pending = self._pending[endpoint]
+        batch = [pending.popleft() for _ in range(min(self.max_size, len(pending)))]
+        self._count -= len(batch)
+        if pending:
+            self._since[endpoint] = time.monotonic()
+        else:
+            del self._pending[endpoint], self._since[endpoint]
+        return batch
+
+    def take_all(self) -> list[tuple[str, list[dict]]]:
+        """Remove every queued record, ready or not, as ``(endpoint, batch)``."""
+        batches = []
+        while self._pending:
+            endpoint = next(iter(self._pending))
+            batches.append((endpoint, self._take(endpoint)))
+        return batches
+
+    async def get_batch(self) -> tuple[str, list[dict]]:
+        """Wait for the next ready batch.
+
+        Returns:
+            ``(endpoint, records)`` with at most ``max_size`` records.
+        """
+        while True:
+            self._changed.clear()
+            now = time.monotonic()
+            deadline = None
+            for endpoint, pending in self._pending.items():
+                ready_at = self._since[endpoint] + self.max_age
+                if len(pending) >= self.max_size or ready_at <= now:
+                    return endpoint, self._take(endpoint)
+                deadline = ready_at if deadline is None else min(deadline, ready_at)
+            timeout = None if deadline is None else deadline - now
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except TimeoutError:
+                pass
+
+
+class AdaptiveInterval:
+    """Poll interval that tightens while traffic flows and relaxes when idle.
+
+    Each poll that finds new records halves the interval (down to
+    ``minimum``); each empty poll stretches it by half (up to
+    ``maximum``).
+
+    Attributes:
+        current: Seconds to wait before the next poll.
+    """
+
+    def __init__(self, start: float, minimum: float, maximum: float) -> None:
+        if not 0 < minimum <= maximum:
+            raise ValueError("Need 0 < minimum <= maximum")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.current = min(max(start, minimum), maximum)
+
+    def update(self, found: int) -> float:
+        """Adjust for a poll that returned *found* new records."""
+        if found:
+            self.current = max(self.minimum, self.current / 2)
+        else:
+            self.current = min(self.maximum, self.current * 1.5)
+        return self.current
+
+
+def _cursor_key(value: object) -> tuple[int, float | str]:
+    """Order cursor values: numbers numerically, anything else as text."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return 0, float(value)
+    return 1, str(value)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys.
+
+    Positions come from double hashing one BLAKE2b digest, so a lookup
+    costs a single hash regardless of the number of hash functions.
+
+    Attributes:
+        bits: Number of bits in the filter.
+        hashes: Number of bit positions per key.
+        count: Keys added so far.
+    """
+
+    def __init__(self, bits: int, hashes: int, data: bytes | None = None) -> None:
+        self.bits = bits
+        self.hashes = hashes
+        self.count = 0
+        self._array = bytearray(data) if data else bytearray((bits + 7) // 8)
+
+    def _positions(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = struct.unpack("<QQ", digest)
+        second |= 1
+        return [(first + i * second) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, key: str) -> bool:
+        array = self._array
+        return all(array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def add(self, key: str) -> None:
+        """Insert *key*."""
+        for pos in self._positions(key):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def to_bytes(self) -> bytes:
+        """Return the raw bit array."""
+        return bytes(self._array)
+
+
+class SeenPackets:
+    """Time-windowed packet deduplication in bounded memory.
+
+    Two Bloom filters rotate: keys are added to the current one and
+    looked up in both.  The current filter becomes the previous one (and
+    the old previous one is discarded) once it has been filled for
+    ``window`` seconds or holds :attr:`capacity` keys, so a packet is
+    remembered for at least one window unless traffic exceeds the
+    capacity, and memory never grows.
+
+    The filters are sized from ``memory_bytes`` and the false-positive
+    target: a false positive means a genuinely new packet is skipped.
+
+    Attributes:
+        capacity: Keys per filter at which the false-positive target holds.
+        path: File the filters are persisted to, or ``None``.
+    """
+
+    _HEADER = struct.Struct("<4sQBQQdd")
+    _MAGIC = b"MCS1"
+
+    def __init__(
+        self,
+        memory_bytes: int = 256 * 1024,
+        fp_rate: float = 1e-4,
+        window: float = 86400,
+        path: str | None = None,
+    ) -> None:
+        if not 0 < fp_rate < 1:
+            raise ValueError("fp_rate must be between 0 and 1")
+        bits = max(64, memory_bytes * 8 // 2)
+        self.capacity = max(1, int(bits * math.log(2) ** 2 / -math.log(fp_rate)))
+        self._bits = bits
+        self._hashes = max(1, round(-math.log2(fp_rate)))
+        self.window = window
+        self.path = path
+        self._current = BloomFilter(bits, self._hashes)
+        self._previous = BloomFilter(bits, self._hashes)
+        self._started = time.time()
+        self._dirty = False
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def _rotate(self, now: float) -> None:
+        self._previous = self._current
+        self._current = BloomFilter(self._bits, self._hashes)
+        self._started = now
+
+    def add_if_new(self, key: str) -> bool:
+        """Record *key*, returning whether it had not been seen before."""
+        now = time.time()
+        if (
+            now - self._started >= self.window
+            or self._current.count >= self.capacity
+        ):
+            self._rotate(now)
+        if key in self._current or key in self._previous:
+            return False
+        self._current.add(key)
+        self._dirty = True
+        return True
+
+    def save(self) -> None:
+        """Write both filters to :attr:`path` atomically, if anything changed."""
+        if not self.path or not self._dirty:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(
+                self._HEADER.pack(
+                    self._MAGIC,
+                    self._bits,
+                    self._hashes,
+                    self._current.count,
+                    self._previous.count,
+                    self._started,
+                    self.window,
+                )
+            )
+            fh.write(self._current.to_bytes())
+            fh.write(self._previous.to_bytes())
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    def _load(self, path: str) -> None:
+        """Restore filters saved with the same size, ignoring stale files."""
+        with open(path, "rb") as fh:
+            data = fh.read()
+        size = (self._bits + 7) // 8
+        header = self._HEADER.size
+        if len(data) != header + 2 * size:
+            logger.warning("Ignoring dedup state %s: size changed", path)
+            return
+        magic, bits, hashes, current, previous, started, _ = self._HEADER.unpack(
+            data[:header]
+        )
+        if (magic, bits, hashes) != (self._MAGIC, self._bits, self._hashes):
+            logger.warning("Ignoring dedup state %s: format changed", path)
+            return
+        self._current = BloomFilter(bits, hashes, data[header : header + size])
+        self._current.count = current
+        self._previous = BloomFilter(bits, hashes, data[header + size :])
+        self._previous.count = previous
+        self._started = started
+        # Expire whatever aged out while the ingestor was down.
+        age = time.time() - started
+        if age >= 2 * self.window:
+            self._rotate(time.time())
+            self._previous = BloomFilter(bits, hashes)
+        elif age >= self.window:
+            self._rotate(time.time())
+        logger.info("Restored dedup state from %s", path)
+
+
+class NeighborTracker:
+    """Turns neighbor table snapshots into deltas worth uploading.
+
+    A neighbor is sent when it appears, disappears, or its RSSI or SNR
+    moved by at least the threshold since it was last sent.  Every
+    ``full_sync`` seconds the whole table is sent instead, with
+    ``full`` set, so the server converges even if a delta was lost.
+
+    Attributes:
+        last_sent: Neighbors as last uploaded, keyed by hash.
+    """
+
+    def __init__(
+        self,
+        rssi_threshold: float = 5,
+        snr_threshold: float = 2,
+        full_sync: float = 900,
+        node_hash: str = "local",
+    ) -> None:
+        self.rssi_threshold = rssi_threshold
+        self.snr_threshold = snr_threshold
+        self.full_sync = full_sync
+        self.node_hash = node_hash
+        self.last_sent: dict[str, dict] = {}
+        self._last_full: float | None = None
+
+    @staticmethod
+    def _moved(old: object, new: object, threshold: float) -> bool:
+        if old is None or new is None:
+            return old is not new
+        return abs(new - old) >= threshold
+
+    def _changed(self, old: dict, new: dict) -> bool:
+        """Return whether *new*'s signal differs materially from *old*'s."""
+        return self._moved(
+            old.get("rssi"), new.get("rssi"), self.rssi_threshold
+        ) or self._moved(old.get("snr"), new.get("snr"), self.snr_threshold)
+
+    def resync(self) -> None:
+        """Send the whole table on the next :meth:`diff`."""
+        self._last_full = None
+
+    def diff(self, neighbors: list[dict]) -> dict | None:
+        """Compare *neighbors* with the last upload.
+
+        The tracker assumes the returned delta will be delivered; if it
+        is not, call :meth:`resync`.
+
+        Returns:
+            A ``POST /ingest/neighbors/delta`` record, or ``None`` if
+            nothing changed materially.
+        """
+        table = {}
+        for neighbor in neighbors:
+            neighbor_hash = neighbor.get("neighbor_hash") or neighbor.get("hash")
+            if neighbor_hash:
+                table[neighbor_hash] = neighbor
+        now = time.monotonic()
+        if self._last_full is None or now - self._last_full >= self.full_sync:
+            self._last_full = now
+            self.last_sent = table
+            return {
+                "node_hash": self.node_hash,
+                "full": True,
+                "upserts": list(table.values()),
+                "removed": [],
+            }
+        upserts = []
+        for neighbor_hash, neighbor in table.items():
+            old = self.last_sent.get(neighbor_hash)
+            if old is None or self._changed(old, neighbor):
+                upserts.append(neighbor)
+                self.last_sent[neighbor_hash] = neighbor
+        removed = [h for h in self.last_sent if h not in table]
+        for neighbor_hash in removed:
+            del self.last_sent[neighbor_hash]
+        if not upserts and not removed:
+            return None
+        return {
+            "node_hash": self.node_hash,
+            "full": False,
+            "upserts": upserts,
+            "removed": removed,
+        }
+
+
+class Spool:
+    """Durable FIFO of records awaiting upload, kept in a SQLite file.
+
+    One row per record, so a backlog can be drained in batches of any
+    size.  The stored records are limited to ``max_bytes`` of JSON; past
+    that the oldest rows are dropped.  Calls block briefly on disk I/O.
+
+    Attributes:
+        bytes: JSON bytes currently spooled.
+        dropped: Records discarded to stay within ``max_bytes``.
+        on_drop: Called once per endpoint that lost records to trimming.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 100 * 1024 * 1024,
+        on_drop: Callable[[str], None] | None = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self.on_drop = on_drop
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " endpoint TEXT NOT NULL,"
+            " record TEXT NOT NULL)"
+        )
+        self._count, self.bytes = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(record)), 0) FROM spool"
+        ).fetchone()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, endpoint: str, records: list[dict]) -> None:
+        """Durably add *records* for ``POST /ingest/<endpoint>``."""
+        rows = [(endpoint, json.dumps(record)) for record in records]
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT INTO spool (endpoint, record) VALUES (?, ?)", rows
+            )
+        self._count += len(rows)
+        self.bytes += sum(len(row[1]) for row in rows)
+        if self.bytes > self.max_bytes:
+            self._trim()
+
+    def _trim(self) -> None:
+        """Drop the oldest records until the spool fits ``max_bytes``."""
+        excess = self.bytes - self.max_bytes
+        freed = dropped = 0
+        cutoff = None
+        endpoints = set()
+        for row_id, endpoint, size in self._db.execute(
+            "SELECT id, endpoint, LENGTH(record) FROM spool ORDER BY id"
+        ):
+            freed += size
+            dropped += 1
+            cutoff = row_id
+            endpoints.add(endpoint)
+            if freed >= excess:
+                break
+        if cutoff is None:
+            return
+        self._db.execute("DELETE FROM spool WHERE id <= ?", (cutoff,))
+        self._count -= dropped
+        self.bytes -= freed
+        self.dropped += dropped
+        logger.warning("Spool full: dropped %d oldest records", dropped)
+        if self.on_drop is not None:
+            for endpoint in sorted(endpoints):
+                self.on_drop(endpoint)
+
+    def oldest(self, limit: int) -> tuple[str, int, list[dict]] | None:
+        """Return the oldest records, all for the same endpoint.
+
+        Returns:
+            ``(endpoint, last_id, records)`` with up to *limit* records,
+            or ``None`` if the spool is empty.  Pass ``endpoint`` and
+            ``last_id`` to :meth:`ack` once they are delivered.
+        """
+        first = self._db.execute(
+            "SELECT endpoint FROM spool ORDER BY id LIMIT 1"
+        ).fetchone()
+        if first is None:
+            return None
+        rows = self._db.execute(
+            "SELECT id, record FROM spool WHERE endpoint = ? ORDER BY id LIMIT ?",
+            (first[0], limit),
+        ).fetchall()
+        return first[0], rows[-1][0], [json.loads(record) for _, record in rows]
+
+    def ack(self, endpoint: str, last_id: int) -> None:
+        """Delete the delivered records of *endpoint* up to *last_id*."""
+        count, size = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(record)), 0) FROM spool"
+            " WHERE endpoint = ? AND id <= ?",
+            (endpoint, last_id),
+        ).fetchone()
+        self._db.execute(
+            "DELETE FROM spool WHERE endpoint = ? AND id <= ?", (endpoint, last_id)
+        )
+        self._count -= count
+        self.bytes -= size
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+
+class Repeater:
+    """One pyMC_Repeater polled by the ingestor.
+
+    Attributes:
+        name: Label packets from this repeater are tagged with.
+        url: Base URL of the pyMC_Repeater CherryPy server.
+        api_key: Optional API key for Repeater authentication.
+        cursor_param: Query parameter carrying the packet cursor.
+        cursor: Newest packet timestamp seen (the high-water mark).
+        incremental: Whether the repeater honours ``cursor_param``;
+            ``None`` until known.
+        neighbors: Delta tracker for this repeater's neighbor table.
+    """
+
+    def __init__(self, config: dict, neighbors: dict | None = None) -> None:
+        neighbors = neighbors or {}
+        self.url: str = config["url"]
+        self.name: str = config.get("name") or self.url
+        self.api_key: str | None = config.get("api_key")
+        self.cursor_param: str = config.get("cursor_param", "since")
+        self.cursor: object = None
+        self.incremental: bool | None = None
+        self.neighbors = NeighborTracker(
+            rssi_threshold=neighbors.get("rssi_threshold", 5),
+            snr_threshold=neighbors.get("snr_threshold", 2),
+            full_sync=neighbors.get("full_sync_seconds", 900),
+            node_hash=config.get("node_hash", "local"),
+        )
+
+    async def fetch_packets(self, client: httpx.AsyncClient) -> list[dict]:
+        """Fetch packets newer than the cursor and advance it.
+
+        Once a packet has been seen, requests carry the newest packet
+        ``timestamp`` as the ``cursor_param`` query parameter (inclusive;
+        the caller's dedup filter drops the overlap).  If the repeater
+        rejects the parameter or answers with packets older than the
+        cursor, it does not support incremental polling and full fetches
+        are used from then on.
+
+        Args:
+            client: Shared async HTTP client.
+
+        Returns:
+            Raw packet dicts from the Repeater API.
+        """
+        url = f"{self.url}/api/packets"
+        params = {}
+        if self.cursor is not None and self.incremental is not False:
+            params[self.cursor_param] = self.cursor
+        resp = await client.get(url, params=params)
+        if params and resp.status_code in (400, 404, 422):
+            self._fall_back(f"HTTP {resp.status_code}")
+            resp = await client.get(url)
+        resp.raise_for_status()
+        packets: list[dict] = resp.json()
+
+        stamps = [pkt["timestamp"] for pkt in packets if pkt.get("timestamp")]
+        if params and stamps:
+            cursor = _cursor_key(self.cursor)
+            if any(_cursor_key(stamp) < cursor for stamp in stamps):
+                self._fall_back("older packets returned")
+            elif self.incremental is None:
+                self.incremental = True
+                logger.info("Repeater %s supports incremental polling", self.name)
+        if stamps:
+            newest = max(stamps, key=_cursor_key)
+            if self.cursor is None or _cursor_key(newest) > _cursor_key(self.cursor):
+                self.cursor = newest
+        return packets
+
+    def _fall_back(self, reason: str) -> None:
+        """Stop sending the cursor parameter to the repeater."""
+        if self.incremental is not False:
+            logger.info(
+                "Repeater %s ignores '%s' (%s); polling in full",
+                self.name,
+                self.cursor_param,
+                reason,
+            )
+        self.incremental = False
+
+    async def fetch_neighbors(self, client: httpx.AsyncClient) -> list[dict]:
+        """Fetch the current neighbor table.
+
+        Args:
+            client: Shared async HTTP client.
+
+        Returns:
+            Raw neighbor list from the Repeater API.
+        """
+        resp = await client.get(f"{self.url}/api/neighbors")
+        resp.raise_for_status()
+        return resp.json()
+
+
 class MCIngestor:
     """Bridges pyMC_Repeater → MeshCore Monitor via HTTP polling.
 
     Attributes:
-        repeater_url: Base URL of the pyMC_Repeater CherryPy server.
-        repeater_api_key: Optional API key for Repeater authentication.
+        repeaters: The repeaters polled, from the ``repeaters`` list in
+            the config or its single ``repeater`` section.
         monitor_url: Base URL of the MeshCore Monitor server.
         monitor_api_key: API key accepted by the monitor's ingest endpoints.
-        poll_interval: Seconds between poll cycles.
-        seen_packet_hashes: In-memory set used for deduplication across polls.
+        poll_interval: Adaptive interval between packet poll cycles.
+        neighbor_interval: Seconds between neighbor table polls.
+        outbox: Records waiting to be sent to the monitor.
+        spool: On-disk queue every batch passes through, or ``None`` to
+            send straight from memory (and drop batches the monitor
+            refuses).
+        seen_packets: Bounded deduplication filter for packet hashes,
+            shared by all repeaters.
+
+    Raises:
+        ValueError: If two repeaters share a ``name`` or ``node_hash``.
     """
 
     def __init__(self, config: dict) -> None:
-        self.repeater_url: str = config["repeater"]["url"]
-        self.repeater_api_key: str | None = config["repeater"].get("api_key")
+        neighbors = config.get("neighbors", {})
+        self.repeaters = [
+            Repeater(repeater, neighbors)
+            for repeater in config.get("repeaters") or [config["repeater"]]
+        ]
+        names = [repeater.name for repeater in self.repeaters]
+        node_hashes = [repeater.neighbors.node_hash for repeater in self.repeaters]
+        if len(set(names)) != len(names):
+            raise ValueError("Repeaters need distinct 'name' values")
+        if len(set(node_hashes)) != len(node_hashes):
+            raise ValueError("Repeaters need distinct 'node_hash' values")
         self.monitor_url: str = config["monitor"]["url"]
         self.monitor_api_key: str = config["monitor"]["api_key"]
-        self.poll_interval: int = config.get("poll_interval_seconds", 5)
-        self.seen_packet_hashes: set[str] = set()
+        adaptive = config.get("adaptive_poll", {})
+        base = config.get("poll_interval_seconds", 5)
+        self.poll_interval = AdaptiveInterval(
+            base, adaptive.get("min_seconds", base), adaptive.get("max_seconds", base)
+        )
+        self.neighbor_interval: float = config.get("neighbor_interval_seconds", 60)
+        batch = config.get("batch", {})
+        self.outbox = BatchQueue(
+            max_size=batch.get("max_size", 200),
+            max_age=batch.get("max_age_seconds", 1.0),
+            capacity=batch.get("queue_size", 10000),
+            on_drop=self._dropped,
+        )
+        dedup = config.get("dedup", {})
+        self.seen_packets = SeenPackets(
+            memory_bytes=int(dedup.get("memory_kb", 256) * 1024),
+            fp_rate=dedup.get("false_positive_rate", 1e-4),
+            window=dedup.get("window_hours", 24) * 3600,
+            path=dedup.get("path"),
+        )
+        self.dedup_save_interval: float = dedup.get("save_interval_seconds", 60)
+        spool = config.get("spool", {})
+        self.spool: Spool | None = None
+        if spool.get("path"):
+            self.spool = Spool(
+                spool["path"],
+                int(spool.get("max_mb", 100) * 2**20),
+                on_drop=self._dropped,
+            )
+        self.drain_batch_size: int = spool.get("drain_batch_size", 1000)
+        self.retry_max: float = spool.get("retry_max_seconds", 60)
+        self._retry_delay = 0.0
+        self._retry_at = 0.0
 
     # ------------------------------------------------------------------
     # Polling helpers
     # ------------------------------------------------------------------
 
+    async def _gather(
+        self, fetch: Callable[[Repeater], Awaitable[list[dict]]]
+    ) -> list[tuple[Repeater, list[dict]]]:
+        """Run *fetch* against every repeater concurrently.
+
+        A repeater that fails is logged and skipped, so one unreachable
+        repeater does not hold back the others.
+
+        Returns:
+            ``(repeater, records)`` pairs for the repeaters that answered,
+            in configuration order.
+        """
+        results = await asyncio.gather(
+            *(fetch(repeater) for repeater in self.repeaters), return_exceptions=True
+        )
+        answered = []
+        for repeater, result in zip(self.repeaters, results):
+            if isinstance(result, httpx.HTTPError):
+                logger.warning("Error polling repeater %s: %s", repeater.name, result)
+            elif isinstance(result, Exception):
+                logger.error(
+                    "Unexpected error polling repeater %s",
+                    repeater.name,
+                    exc_info=result,
+                )
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                answered.append((repeater, result))
+        return answered
+
     async def poll_packets(self, client: httpx.AsyncClient) -> list[dict]:
-        """Fetch recent packets from pyMC_Repeater and deduplicate.
+        """Fetch new packets from every repeater and dedup across them.
+
+        A packet heard by several repeaters is forwarded once, tagged
+        with the first repeater (in configuration order) that reported
+        it.
 
         Args:
             client: Shared async HTTP client.
@@ -54,21 +732,18 @@ class MCIngestor:
         Returns:
             List of normalized packet dicts not yet seen by this process.
         """
-        resp = await client.get(f"{self.repeater_url}/api/packets")
-        resp.raise_for_status()
-        packets: list[dict] = resp.json()
-
         new_packets: list[dict] = []
-        for pkt in packets:
-            pkt_hash = pkt.get("hash") or pkt.get("id")
-            if pkt_hash and pkt_hash in self.seen_packet_hashes:
-                continue
-            if pkt_hash:
-                self.seen_packet_hashes.add(pkt_hash)
-            new_packets.append(self.normalize_packet(pkt))
+        for repeater, packets in await self._gather(
+            lambda repeater: repeater.fetch_packets(client)
+        ):
+            for pkt in packets:
+                pkt_hash = pkt.get("hash") or pkt.get("id")
+                if pkt_hash and not self.seen_packets.add_if_new(str(pkt_hash)):
+                    continue
+                new_packets.append(self.normalize_packet(pkt, repeater.name))
         return new_packets
 
-    def normalize_packet(self, raw: dict) -> dict:
+    def normalize_packet(self, raw: dict, repeater: str | None = None) -> dict:
         """Transform a pyMC_Repeater packet into the monitor server schema.
 
         Field names are placeholders — update once the actual Repeater API
@@ -76,11 +751,15 @@ class MCIngestor:
 
         Args:
             raw: Single packet dict from the Repeater API.
+            repeater: Name of the repeater that heard the packet; kept in
+                ``raw_json`` under ``"repeater"``.
 
         Returns:
             Normalized packet dict matching the monitor ingest schema.
         """
         path = raw.get("path", [])
+        if repeater is not None:
+            raw = {**raw, "repeater": repeater}
         return {
             "packet_hash": raw.get("hash") or raw.get("id"),
             "packet_type": raw.get("type", "UNKNOWN"),
@@ -98,18 +777,23 @@ class MCIngestor:
             ),
         }
 
-    async def poll_neighbors(self, client: httpx.AsyncClient) -> list[dict]:
-        """Fetch the current neighbor table from pyMC_Repeater.
+    async def poll_neighbor_delta(self, client: httpx.AsyncClient) -> list[dict]:
+        """Fetch all neighbor tables and return what changed since last sent.
 
         Args:
             client: Shared async HTTP client.
 
         Returns:
-            Raw neighbor list from the Repeater API.
+            One delta per repeater whose table changed.
         """
-        resp = await client.get(f"{self.repeater_url}/api/neighbors")
-        resp.raise_for_status()
-        return resp.json()
+        deltas = []
+        for repeater, neighbors in await self._gather(
+            lambda repeater: repeater.fetch_neighbors(client)
+        ):
+            delta = repeater.neighbors.diff(neighbors)
+            if delta:
+                deltas.append(delta)
+        return deltas
 
     # ------------------------------------------------------------------
     # Monitor server communication
@@ -144,27 +828,239 @@ class MCIngestor:
     # Main event loop
     # ------------------------------------------------------------------
 
+    async def poll_loop(
+        self,
+        endpoint: str,
+        poll: Callable[[], Awaitable[list[dict]]],
+        interval: float | AdaptiveInterval,
+    ) -> None:
+        """Poll repeatedly and queue the results for *endpoint*.
+
+        Args:
+            endpoint: Ingest sub-path the records are sent to.
+            poll: Coroutine function returning the records to forward.
+            interval: Seconds between the starts of consecutive polls, or
+                an :class:`AdaptiveInterval` updated after every poll.
+        """
+        while True:
+            started = time.monotonic()
+            records: list[dict] = []
+            try:
+                records = await poll()
+                for record in records:
+                    self.outbox.put(endpoint, record)
+            except httpx.RequestError as exc:
+                logger.warning("Request error polling %s: %s", endpoint, exc)
+            except Exception:
+                logger.exception("Unexpected error polling %s", endpoint)
+            if isinstance(interval, AdaptiveInterval):
+                delay = interval.update(len(records))
+            else:
+                delay = interval
+            await asyncio.sleep(max(0.0, started + delay - time.monotonic()))
+
+    async def send_loop(self, client: httpx.AsyncClient) -> None:
+        """Send queued batches to the monitor server as they become ready.
+
+        With a spool, each batch is spooled first and the spool is then
+        drained; while the monitor is unreachable the loop also wakes up
+        to retry the backlog.  If the spool itself fails (disk full,
+        database locked), batches are sent straight from memory and the
+        spool is retried with the same backoff as the monitor.
+
+        Args:
+            client: Shared async HTTP client.
+        """
+        while True:
+            if self.spool is None:
+                endpoint, batch = await self.outbox.get_batch()
+                await self._send_batch(client, endpoint, batch)
+                continue
+            timeout = None
+            if len(self.spool):
+                timeout = max(0.0, self._retry_at - time.monotonic())
+            try:
+                endpoint, batch = await asyncio.wait_for(
+                    self.outbox.get_batch(), timeout
+                )
+            except TimeoutError:
+                pass
+            else:
+                try:
+                    self.spool.append(endpoint, batch)
+                except Exception:
+                    logger.exception("Could not spool %d %s", len(batch), endpoint)
+                    await self._send_batch(client, endpoint, batch)
+            try:
+                await self.drain_spool(client)
+            except Exception:
+                self._retry_delay = min(
+                    self.retry_max, max(1.0, self._retry_delay * 2)
+                )
+                self._retry_at = time.monotonic() + self._retry_delay
+                logger.exception(
+                    "Could not read the spool; retrying in %.0fs", self._retry_delay
+                )
+                await asyncio.sleep(self._retry_delay)
+
+    async def _send_batch(
+        self, client: httpx.AsyncClient, endpoint: str, batch: list[dict]
+    ) -> None:
+        """POST *batch* once, logging (and dropping it) on failure."""
+        try:
+            await self.post_to_monitor(client, endpoint, batch)
+        except httpx.HTTPError as exc:
+            logger.warning(
+                "Dropped %d %s after send error: %s", len(batch), endpoint, exc
+            )
+            self._dropped(endpoint)
+        except Exception:
+            logger.exception("Unexpected error sending %s", endpoint)
+            self._dropped(endpoint)
+
+    def _dropped(self, endpoint: str) -> None:
+        """Note that records for *endpoint* will never reach the monitor.
+
+        A lost neighbor delta leaves the monitor's table stale, so every
+        repeater sends its full table on the next neighbor poll.
+        """
+        if endpoint == "neighbors/delta":
+            for repeater in self.repeaters:
+                repeater.neighbors.resync()
+
+    async def drain_spool(self, client: httpx.AsyncClient) -> int:
+        """Send spooled records, oldest first, until the spool is empty.
+
+        On a connection error or 5xx the backlog is kept and retried with
+        exponential backoff (capped at ``retry_max_seconds``).  A batch
+        the monitor rejects with another 4xx is dropped so it cannot
+        block the spool.
+
+        Args:
+            client: Shared async HTTP client.
+
+        Returns:
+            Number of records delivered.
+        """
+        if self.spool is None or time.monotonic() < self._retry_at:
+            return 0
+        sent = 0
+        started = time.monotonic()
+        while (chunk := self.spool.oldest(self.drain_batch_size)) is not None:
+            endpoint, last_id, records = chunk
+            try:
+                await self.post_to_monitor(client, endpoint, records)
+            except httpx.HTTPStatusError as exc:
+                status = exc.response.status_code
+                if 400 <= status < 500 and status not in (408, 429):
+                    logger.error(
+                        "Monitor rejected %d %s (HTTP %d); dropping them",
+                        len(records),
+                        endpoint,
+                        status,
+                    )
+                    self.spool.ack(endpoint, last_id)
+                    self._dropped(endpoint)
+                    continue
+                self._back_off(exc)
+                break
+            except httpx.RequestError as exc:
+                self._back_off(exc)
+                break
+            self.spool.ack(endpoint, last_id)
+            sent += len(records)
+            self._retry_delay = 0.0
+        if sent > self.drain_batch_size:
+            elapsed = time.monotonic() - started
+            logger.info(
+                "Drained %d spooled records in %.1fs (%.0f/s)",
+                sent,
+                elapsed,
+                sent / max(elapsed, 1e-9),
+            )
+        return sent
+
+    def _back_off(self, exc: Exception) -> None:
+        """Schedule the next spool drain after a failed send."""
+        self._retry_delay = min(self.retry_max, max(1.0, self._retry_delay * 2))
+        self._retry_at = time.monotonic() + self._retry_delay
+        logger.warning(
+            "Monitor unavailable (%s); %d records spooled, retrying in %.0fs",
+            exc,
+            len(self.spool or ()),
+            self._retry_delay,
+        )
+
+    async def flush_outbox(self, client: httpx.AsyncClient) -> None:
+        """Hand over records still queued in memory, e.g. at shutdown.
+
+        With a spool they are written to it and sent after the next
+        start; otherwise (or if that fails) one last send is attempted.
+        Either way this must happen before the dedup filter is saved,
+        which already counts these packets as seen.
+
+        Args:
+            client: Shared async HTTP client.
+        """
+        for endpoint, batch in self.outbox.take_all():
+            if self.spool is not None:
+                try:
+                    self.spool.append(endpoint, batch)
+                    continue
+                except Exception:
+                    logger.exception("Could not spool %d %s", len(batch), endpoint)
+            await self._send_batch(client, endpoint, batch)
+
+    async def save_loop(self) -> None:
+        """Persist the dedup filters periodically (if a path is configured)."""
+        while True:
+            await asyncio.sleep(self.dedup_save_interval)
+            try:
+                self.seen_packets.save()
+            except OSError as exc:
+                logger.warning("Could not save dedup state: %s", exc)
+
     async def run(self) -> None:
-        """Start the infinite poll → forward loop."""
+        """Run the packet, neighbor and sender loops until cancelled.
+
+        All repeaters and the monitor share one client; its pool keeps a
+        connection alive for each concurrent packet and neighbor poll.
+        """
         logger.info(
-            "Ingestor starting  repeater=%s  monitor=%s  interval=%ds",
-            self.repeater_url,
+            "Ingestor starting  repeaters=%s  monitor=%s  packets every %s-%ss"
+            "  neighbors every %ss",
+            ", ".join(repeater.name for repeater in self.repeaters),
             self.monitor_url,
-            self.poll_interval,
+            self.poll_interval.minimum,
+            self.poll_interval.maximum,
+            self.neighbor_interval,
         )
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            while True:
+        try:
+            limits = httpx.Limits(
+                max_keepalive_connections=max(20, 2 * len(self.repeaters) + 1)
+            )
+            async with httpx.AsyncClient(timeout=10.0, limits=limits) as client:
                 try:
-                    packets = await self.poll_packets(client)
-                    await self.post_to_monitor(client, "packets", packets)
-
-                    neighbors = await self.poll_neighbors(client)
-                    await self.post_to_monitor(client, "neighbors", neighbors)
-                except httpx.RequestError as exc:
-                    logger.warning("Request error: %s", exc)
-                except Exception:
-                    logger.exception("Unexpected error during poll cycle")
-                await asyncio.sleep(self.poll_interval)
+                    await asyncio.gather(
+                        self.poll_loop(
+                            "packets",
+                            lambda: self.poll_packets(client),
+                            self.poll_interval,
+                        ),
+                        self.poll_loop(
+                            "neighbors/delta",
+                            lambda: self.poll_neighbor_delta(client),
+                            self.neighbor_interval,
+                        ),
+                        self.send_loop(client),
+                        self.save_loop(),
+                    )
+                finally:
+                    await self.flush_outbox(client)
+        finally:
+            self.seen_packets.save()
+            if self.spool is not None:
+                self.spool.close()
 
 
 def main() -> None:
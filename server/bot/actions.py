@@ -6,27 +6,245 @@
 Supports ``log``, ``send_message``, ``webhook``, and ``telemetry_request``
 action types.  The ``send_message`` action requires a working
 pyMC_Repeater send endpoint (placeholder until the API is mapped).
+
+Failures propagate to the caller so that
+:class:`~server.bot.dispatch.ActionDispatcher` can apply its timeout and
+retry policy.
+
+All requests share one pooled, keep-alive :class:`httpx.AsyncClient`,
+opened and closed with the application lifespan via the module-level
+:data:`executor`.  A webhook rule with ``"batch": true`` in its
+``action_config`` collects events per URL for ``batch_window`` seconds (or
+until ``batch_max`` events) and POSTs them as one JSON array.  Such a rule
+returns as soon as its event is queued, so the batch POST applies the
+dispatcher's timeout and retry policy itself, using the ``timeout``,
+``retries`` and ``backoff`` of the rule that opened the batch.
 """
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
-from typing import TYPE_CHECKING
+from collections import Counter
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional
 
 import httpx
 
+from .dispatch import (
+    BOT_ACTION_BACKOFF,
+    BOT_ACTION_RETRIES,
+    BOT_ACTION_TIMEOUT,
+    parse_retry_policy,
+    run_with_retries,
+)
+
 if TYPE_CHECKING:
     from ..models import BotRule
 
 logger = logging.getLogger(__name__)
 
 REPEATER_URL: str = os.getenv("REPEATER_URL", "http://localhost:8000")
+BOT_HTTP_MAX_CONNECTIONS: int = int(os.getenv("BOT_HTTP_MAX_CONNECTIONS", "20"))
+BOT_HTTP_MAX_KEEPALIVE: int = int(os.getenv("BOT_HTTP_MAX_KEEPALIVE", "10"))
+BOT_HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("BOT_HTTP_KEEPALIVE_EXPIRY", "30"))
+BOT_HTTP_TIMEOUT: float = float(os.getenv("BOT_HTTP_TIMEOUT", "5"))
+
+WEBHOOK_BATCH_WINDOW = 2.0
+"""Default seconds a webhook batch stays open."""
+
+WEBHOOK_BATCH_MAX = 100
+"""Default number of events that closes a webhook batch early."""
+
+
+def create_http_client(
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> httpx.AsyncClient:
+    """Build the pooled client used for repeater and webhook requests.
+
+    Args:
+        transport: Optional transport override, e.g. for tests.
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=BOT_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=BOT_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=BOT_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=BOT_HTTP_TIMEOUT,
+        transport=transport,
+    )
+
+
+class WebhookBatcher:
+    """Collects webhook events per URL and posts them as arrays.
+
+    A batch opens with its first event and is sent after its window
+    elapses or as soon as it reaches its size limit, whichever is first.
+    Each POST attempt is cut off after ``timeout`` seconds and retried
+    like a dispatched action; a batch that still fails is dropped.
+
+    Attributes:
+        counts: ``batches``, ``events``, ``retried`` and ``failed``
+            delivery counters.
+    """
+
+    def __init__(self, post: Callable[[str, list[dict]], Awaitable[None]]) -> None:
+        self._post = post
+        self._pending: dict[str, list[dict]] = {}
+        self._policies: dict[str, tuple[float, int, float]] = {}
+        self._timers: dict[str, asyncio.Task] = {}
+        self._sending: set[asyncio.Task] = set()
+        self.counts: Counter = Counter()
+
+    @property
+    def pending(self) -> int:
+        """Number of events waiting in open batches."""
+        return sum(len(events) for events in self._pending.values())
+
+    def add(
+        self,
+        url: str,
+        event: dict,
+        window: float,
+        max_size: int,
+        timeout: float = BOT_ACTION_TIMEOUT,
+        retries: int = BOT_ACTION_RETRIES,
+        backoff: float = BOT_ACTION_BACKOFF,
+    ) -> None:
+        """Add *event* to the open batch for *url*.
+
+        Args:
+            url: Webhook endpoint.
+            event: Event dict to include.
+            window: Seconds to hold a new batch open.
+            max_size: Batch size that triggers an immediate send.
+            timeout: Per-attempt timeout for a new batch's POST.
+            retries: Retries after a failed attempt for a new batch.
+            backoff: Delay before a new batch's first retry, doubled
+                each time.
+        """
+        self._policies.setdefault(url, (timeout, retries, backoff))
+        batch = self._pending.setdefault(url, [])
+        batch.append(event)
+        if len(batch) >= max_size:
+            timer = self._timers.pop(url, None)
+            if timer is not None:
+                timer.cancel()
+            # Detach the full batch now so later events open a new one.
+            task = asyncio.create_task(
+                self._deliver(url, self._pending.pop(url), self._policies.pop(url))
+            )
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+        elif url not in self._timers:
+            self._timers[url] = asyncio.create_task(self._send_after(url, window))
+
+    async def _send_after(self, url: str, window: float) -> None:
+        """Send the batch for *url* once *window* has elapsed."""
+        await asyncio.sleep(window)
+        # From here on this task is a send that flush() must wait for.
+        task = self._timers.pop(url, None)
+        if task is not None:
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+        await self._send(url)
+
+    async def _send(self, url: str) -> None:
+        """Send the open batch for *url*, if any."""
+        events = self._pending.pop(url, None)
+        policy = self._policies.pop(url, None)
+        if events:
+            await self._deliver(url, events, policy)
+
+    async def _deliver(
+        self,
+        url: str,
+        events: list[dict],
+        policy: Optional[tuple[float, int, float]] = None,
+    ) -> None:
+        """POST *events* to *url* with retries, logging rather than raising."""
+        timeout, retries, backoff = policy or (
+            BOT_ACTION_TIMEOUT,
+            BOT_ACTION_RETRIES,
+            BOT_ACTION_BACKOFF,
+        )
+        try:
+            await run_with_retries(
+                lambda: self._post(url, events),
+                timeout,
+                retries,
+                backoff,
+                counts=self.counts,
+            )
+        except Exception as exc:
+            self.counts["failed"] += 1
+            logger.warning(
+                "[BOT] Webhook batch of %d events failed for %s: %r",
+                len(events),
+                url,
+                exc,
+            )
+        else:
+            self.counts["batches"] += 1
+            self.counts["events"] += len(events)
+
+    async def flush(self) -> None:
+        """Send every open batch now and wait for in-flight sends."""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for url in list(self._pending):
+            await self._send(url)
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
 
 
 class ActionExecutor:
-    """Dispatches rule actions based on :attr:`BotRule.action_type`."""
+    """Dispatches rule actions based on :attr:`BotRule.action_type`.
+
+    Attributes:
+        transport: Optional transport for the HTTP client, e.g. for tests.
+        batcher: Open webhook batches.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stopped = False
+        self.batcher = WebhookBatcher(self._post_batch)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared HTTP client, created on first use if not started.
+
+        Raises:
+            RuntimeError: After :meth:`stop`, until :meth:`start` is
+                called again.
+        """
+        if self._stopped:
+            raise RuntimeError("Action executor is stopped")
+        if self._client is None or self._client.is_closed:
+            self._client = create_http_client(self.transport)
+        return self._client
+
+    async def start(self) -> None:
+        """Open the pooled HTTP client; called from the application lifespan."""
+        self._stopped = False
+        _ = self.client
+
+    async def stop(self) -> None:
+        """Send open webhook batches and close the HTTP client."""
+        await self.batcher.flush()
+        self._stopped = True
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        """Return webhook batching counters for the metrics endpoint."""
+        return {**self.batcher.counts, "batched_pending": self.batcher.pending}
 
     async def execute(self, rule: BotRule, event: dict) -> None:
         """Run the action defined by *rule* in response to *event*.
@@ -34,6 +252,9 @@ class ActionExecutor:
         Args:
             rule: The triggered bot rule.
             event: The event that matched the rule.
+
+        Raises:
+            httpx.HTTPError: If a repeater or webhook request fails.
         """
         config: dict = json.loads(rule.action_config)
         action = rule.action_type
@@ -48,7 +269,19 @@ class ActionExecutor:
             )
 
         elif action == "webhook":
-            await self._call_webhook(config["url"], event)
+            if config.get("batch"):
+                timeout, retries, backoff = parse_retry_policy(config)
+                self.batcher.add(
+                    config["url"],
+                    event,
+                    float(config.get("batch_window", WEBHOOK_BATCH_WINDOW)),
+                    int(config.get("batch_max", WEBHOOK_BATCH_MAX)),
+                    timeout=timeout,
+                    retries=retries,
+                    backoff=backoff,
+                )
+            else:
+                await self._call_webhook(config["url"], event)
 
         elif action == "telemetry_request":
             await self._request_telemetry(config.get("node_hash"))
@@ -67,17 +300,12 @@ class ActionExecutor:
             destination: Target node hash or ``"flood"``.
             message: Text payload to transmit.
         """
-        try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(
-                    f"{REPEATER_URL}/api/send",  # PLACEHOLDER — verify endpoint
-                    json={"destination": destination, "message": message},
-                    timeout=5.0,
-                )
-                resp.raise_for_status()
-                logger.info("[BOT] Sent message to %s: %s", destination, message)
-        except Exception as exc:
-            logger.warning("[BOT] Failed to send message: %s", exc)
+        resp = await self.client.post(
+            f"{REPEATER_URL}/api/send",  # PLACEHOLDER — verify endpoint
+            json={"destination": destination, "message": message},
+        )
+        resp.raise_for_status()
+        logger.info("[BOT] Sent message to %s: %s", destination, message)
 
     async def _call_webhook(self, url: str, event: dict) -> None:
         """POST the event payload to an external webhook URL.
@@ -86,12 +314,15 @@ class ActionExecutor:
             url: Webhook endpoint.
             event: Event dict to forward.
         """
-        try:
-            async with httpx.AsyncClient() as client:
-                await client.post(url, json=event, timeout=5.0)
-                logger.info("[BOT] Webhook delivered to %s", url)
-        except Exception as exc:
-            logger.warning("[BOT] Webhook failed for %s: %s", url, exc)
+        resp = await self.client.post(url, json=event)
+        resp.raise_for_status()
+        logger.info("[BOT] Webhook delivered to %s", url)
+
+    async def _post_batch(self, url: str, events: list[dict]) -> None:
+        """POST a JSON array of events to a batching webhook."""
+        resp = await self.client.post(url, json=events)
+        resp.raise_for_status()
+        logger.info("[BOT] Webhook batch of %d delivered to %s", len(events), url)
 
     async def _request_telemetry(self, node_hash: str | None) -> None:
         """Request telemetry from a specific node.
@@ -106,3 +337,7 @@ class ActionExecutor:
             "[BOT] Telemetry request for %s — endpoint TBD",
             node_hash or "local",
         )
+
+
+executor = ActionExecutor()
+"""Process-wide executor whose HTTP client follows the app lifespan."""
@@ -0,0 +1,300 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Condition expressions for ``condition`` bot rules.
+
+A condition is a small boolean expression over packet fields, written
+with Python syntax::
+
+    packet_type == "ADVERT" and source_hash == "FA" and rssi < -110
+    hop_count > 3 or (route_type == "FLOOD" and "help" in text)
+    packet_type in ["ACK", "TRACE"] and not dest_hash
+
+Available names are the packet fields in :data:`FIELDS` plus ``text``,
+the lower-cased decoded payload.  Supported operators are comparisons
+(``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``, ``in``, ``not in``,
+chained comparisons included), ``and``, ``or``, ``not`` and parentheses;
+literals are strings, numbers, ``True``/``False``/``None`` and lists of
+those.  An ordering comparison against a missing (``None``) field is
+false.
+
+Expressions are parsed with :mod:`ast` and compiled into closures once
+per rule index build — nothing is interpreted per event.  A
+:class:`ConditionCompiler` shares identical comparisons between all the
+rules it compiles, and each comparison is evaluated at most once per
+event (see :class:`EventContext`).
+"""
+
+from __future__ import annotations
+
+import ast
+import operator
+from typing import Any, Callable, Optional
+
+FIELDS = frozenset(
+    {
+        "id",
+        "packet_hash",
+        "packet_type",
+        "route_type",
+        "payload_hex",
+        "path",
+        "hop_count",
+        "rssi",
+        "snr",
+        "source_hash",
+        "dest_hash",
+    }
+)
+"""Packet fields a condition may refer to, besides ``text``."""
+
+MAX_CONDITION_LENGTH = 2000
+
+_ORDERING = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+
+def _contains(left: Any, right: Any) -> bool:
+    return right is not None and left in right
+
+
+def _not_contains(left: Any, right: Any) -> bool:
+    return right is not None and left not in right
+
+
+_OPERATORS: dict[type, Callable[[Any, Any], bool]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.In: _contains,
+    ast.NotIn: _not_contains,
+    **_ORDERING,
+}
+
+Getter = Callable[["EventContext"], Any]
+Predicate = Callable[["EventContext"], bool]
+
+
+class EventContext:
+    """Per-event state shared by every compiled condition.
+
+    Attributes:
+        data: The event's ``data`` dict.
+        text: The payload decoded by
+            :func:`~server.bot.index.decode_payload`, if any.
+        memo: Results of the comparisons evaluated so far, by atom number.
+    """
+
+    __slots__ = ("data", "text", "memo")
+
+    def __init__(self, data: dict, text: Optional[str] = None) -> None:
+        self.data = data
+        self.text = text
+        self.memo: dict[int, bool] = {}
+
+
+class ConditionCompiler:
+    """Compiles condition expressions, sharing identical comparisons.
+
+    Use one compiler for all rules of a rule index so that, for example,
+    ``rssi < -110`` appearing in ten rules is evaluated once per event.
+
+    Attributes:
+        atoms: Number of distinct comparisons compiled so far.
+        uses_text: Whether any compiled condition reads ``text``, i.e.
+            whether callers need to decode the payload.
+    """
+
+    def __init__(self) -> None:
+        self._atoms: dict[str, Predicate] = {}
+        self.uses_text = False
+
+    @property
+    def atoms(self) -> int:
+        return len(self._atoms)
+
+    def compile(self, source: str) -> Predicate:
+        """Compile *source* into a predicate over an :class:`EventContext`.
+
+        Raises:
+            ValueError: If *source* is not a valid condition.
+        """
+        if len(source) > MAX_CONDITION_LENGTH:
+            raise ValueError("Condition is too long")
+        try:
+            tree = ast.parse(source.strip(), mode="eval")
+        except SyntaxError as exc:
+            raise ValueError(f"Invalid condition syntax: {exc.msg}") from exc
+        return self._predicate(tree.body)
+
+    def _predicate(self, node: ast.expr) -> Predicate:
+        """Compile a boolean node."""
+        if isinstance(node, ast.BoolOp):
+            parts = tuple(self._predicate(value) for value in node.values)
+            if isinstance(node.op, ast.And):
+
+                def all_of(ctx: EventContext) -> bool:
+                    for part in parts:
+                        if not part(ctx):
+                            return False
+                    return True
+
+                return all_of
+
+            def any_of(ctx: EventContext) -> bool:
+                for part in parts:
+                    if part(ctx):
+                        return True
+                return False
+
+            return any_of
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            inner = self._predicate(node.operand)
+            return lambda ctx: not inner(ctx)
+        if isinstance(node, ast.Constant) and isinstance(node.value, bool):
+            value = node.value
+            return lambda ctx: value
+        if isinstance(node, (ast.Compare, ast.Name)):
+            return self._atom(node)
+        raise ValueError(f"Unsupported condition element '{ast.unparse(node)}'")
+
+    def _atom(self, node: ast.Compare | ast.Name) -> Predicate:
+        """Compile a comparison (or bare field test) into a shared atom."""
+        key = ast.dump(node, annotate_fields=False)
+        shared = self._atoms.get(key)
+        if shared is not None:
+            return shared
+        test = self._comparison(node) if isinstance(node, ast.Compare) else None
+        if test is None:
+            field = self._value(node)
+
+            def test(ctx: EventContext) -> bool:
+                return bool(field(ctx))
+
+        index = len(self._atoms)
+
+        def atom(ctx: EventContext) -> bool:
+            memo = ctx.memo
+            result = memo.get(index)
+            if result is None:
+                try:
+                    result = test(ctx)
+                except TypeError:
+                    result = False
+                memo[index] = result
+            return result
+
+        self._atoms[key] = atom
+        return atom
+
+    def _comparison(self, node: ast.Compare) -> Predicate:
+        """Compile a possibly chained comparison."""
+        operands = [self._value(node.left)]
+        operands += [self._value(comparator) for comparator in node.comparators]
+        steps = []
+        for i, op in enumerate(node.ops):
+            func = _OPERATORS.get(type(op))
+            if func is None:
+                raise ValueError(f"Unsupported operator in '{ast.unparse(node)}'")
+            steps.append((operands[i], func, operands[i + 1], type(op) in _ORDERING))
+
+        def compare(ctx: EventContext) -> bool:
+            for left, func, right, ordering in steps:
+                a, b = left(ctx), right(ctx)
+                if ordering and (a is None or b is None):
+                    return False
+                if not func(a, b):
+                    return False
+            return True
+
+        return compare
+
+    def _value(self, node: ast.expr) -> Getter:
+        """Compile an operand: a field, ``text`` or a literal."""
+        if isinstance(node, ast.Name):
+            name = node.id
+            if name == "text":
+                self.uses_text = True
+                return lambda ctx: ctx.text
+            if name not in FIELDS:
+                raise ValueError(f"Unknown field '{name}'")
+            return lambda ctx: ctx.data.get(name)
+        value = self._literal(node)
+        return lambda ctx: value
+
+    def _literal(self, node: ast.expr) -> Any:
+        """Evaluate a literal node."""
+        if isinstance(node, ast.Constant) and (
+            node.value is None or isinstance(node.value, (str, int, float, bool))
+        ):
+            return node.value
+        if (
+            isinstance(node, ast.UnaryOp)
+            and isinstance(node.op, ast.USub)
+            and isinstance(node.operand, ast.Constant)
+            and isinstance(node.operand.value, (int, float))
+        ):
+            return -node.operand.value
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            return frozenset(self._literal(element) for element in node.elts)
+        raise ValueError(f"Unsupported value '{ast.unparse(node)}'")
+
+
+def required_filters(source: str) -> dict[str, Any]:
+    """Return tests every event matching *source* must pass.
+
+    Only top-level conjuncts are considered, so ``packet_type == "ACK"
+    and "help" in text and rssi < -100`` yields ``{"packet_type": "ACK",
+    "has_payload": True}`` while anything under ``or``/``not`` is
+    ignored.  Keys are ``field == literal`` tests on string fields plus
+    ``has_payload`` for a ``"..." in text`` test; callers can apply them
+    in SQL before evaluating the full condition.
+
+    Raises:
+        ValueError: If *source* is not valid Python syntax.
+    """
+    try:
+        body = ast.parse(source.strip(), mode="eval").body
+    except SyntaxError as exc:
+        raise ValueError(f"Invalid condition syntax: {exc.msg}") from exc
+    if isinstance(body, ast.BoolOp) and not isinstance(body.op, ast.And):
+        return {}
+    terms = body.values if isinstance(body, ast.BoolOp) else [body]
+    filters: dict[str, Any] = {}
+    for term in terms:
+        if not (isinstance(term, ast.Compare) and len(term.ops) == 1):
+            continue
+        left, op, right = term.left, term.ops[0], term.comparators[0]
+        if (
+            isinstance(op, ast.In)
+            and isinstance(right, ast.Name)
+            and right.id == "text"
+            and isinstance(left, ast.Constant)
+            and isinstance(left.value, str)
+        ):
+            filters["has_payload"] = True
+            continue
+        if not isinstance(op, ast.Eq):
+            continue
+        if isinstance(right, ast.Name):
+            left, right = right, left
+        if (
+            isinstance(left, ast.Name)
+            and left.id in FIELDS
+            and isinstance(right, ast.Constant)
+            and isinstance(right.value, str)
+        ):
+            filters.setdefault(left.id, right.value)
+    return filters
+
+
+def compile_condition(source: str) -> Predicate:
+    """Compile a single condition with its own compiler.
+
+    Raises:
+        ValueError: If *source* is not a valid condition.
+    """
+    return ConditionCompiler().compile(source)
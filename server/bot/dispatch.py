@@ -0,0 +1,391 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Concurrent dispatch of bot actions.
+
+:class:`ActionDispatcher` stands in for the :class:`ActionExecutor` passed
+to :meth:`RuleEngine.evaluate`: ``execute`` only enqueues the action, so a
+slow webhook no longer holds up the events behind it.  Each action type
+gets its own bounded queue and pool of worker tasks, sized by
+``BOT_ACTION_LIMITS`` (``type=n`` pairs) or ``BOT_ACTION_WORKERS``.
+
+Every attempt runs under a timeout and failed attempts are retried with
+exponential backoff.  A rule may override the defaults with ``timeout``,
+``retries`` and ``backoff`` keys in its ``action_config``.  Actions listed
+in :data:`NON_IDEMPOTENT_ACTIONS` are only retried when the request never
+reached its target.  Actions listed in :data:`ORDERED_ACTIONS` run
+strictly in submission order per destination, so replies to one node
+never overtake each other; at most ``BOT_ACTION_LANE_SIZE`` of them wait
+per destination, and further ones are dropped.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+
+import httpx
+
+from .latency import LatencyWindow
+
+if TYPE_CHECKING:
+    from ..models import BotRule
+    from .actions import ActionExecutor
+
+logger = logging.getLogger(__name__)
+
+BOT_ACTION_WORKERS: int = int(os.getenv("BOT_ACTION_WORKERS", "8"))
+BOT_ACTION_LIMITS: str = os.getenv("BOT_ACTION_LIMITS", "send_message=1,webhook=4")
+BOT_ACTION_QUEUE_SIZE: int = int(os.getenv("BOT_ACTION_QUEUE_SIZE", "1000"))
+BOT_ACTION_LANE_SIZE: int = int(os.getenv("BOT_ACTION_LANE_SIZE", "100"))
+BOT_ACTION_TIMEOUT: float = float(os.getenv("BOT_ACTION_TIMEOUT", "10"))
+BOT_ACTION_RETRIES: int = int(os.getenv("BOT_ACTION_RETRIES", "2"))
+BOT_ACTION_BACKOFF: float = float(os.getenv("BOT_ACTION_BACKOFF", "0.5"))
+
+MAX_BACKOFF_SECONDS = 30.0
+
+ORDERED_ACTIONS: dict[str, tuple[str, str]] = {
+    "send_message": ("destination", "flood"),
+}
+"""Action types executed in order per destination.
+
+Maps the action type to the ``action_config`` key naming the destination
+and its default value.
+"""
+
+NON_IDEMPOTENT_ACTIONS: frozenset[str] = frozenset({"send_message"})
+"""Action types that must not run twice.
+
+A ``send_message`` that timed out or lost its response may already have
+been transmitted over the mesh, so these are retried only after a
+connection error, when the request cannot have been sent.
+"""
+
+
+def parse_limits(spec: str) -> dict[str, int]:
+    """Parse ``"type=n,type=n"`` into per-action-type worker counts.
+
+    Raises:
+        ValueError: If an entry is not ``type=n`` with a positive ``n``.
+    """
+    limits: dict[str, int] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        action, sep, count = item.partition("=")
+        if not sep or int(count) < 1:
+            raise ValueError(f"Invalid action limit '{item}'")
+        limits[action.strip()] = int(count)
+    return limits
+
+
+def parse_retry_policy(
+    config: dict,
+    timeout: float = BOT_ACTION_TIMEOUT,
+    retries: int = BOT_ACTION_RETRIES,
+    backoff: float = BOT_ACTION_BACKOFF,
+) -> tuple[float, int, float]:
+    """Read the ``timeout``, ``retries`` and ``backoff`` keys of a config.
+
+    Args:
+        config: Parsed ``action_config``.
+        timeout: Default per-attempt timeout in seconds.
+        retries: Default number of retries.
+        backoff: Default delay before the first retry.
+
+    Returns:
+        ``(timeout, retries, backoff)``.
+
+    Raises:
+        ValueError: If a key is not a number in range.
+    """
+    try:
+        timeout = float(config.get("timeout", timeout))
+        retries = int(config.get("retries", retries))
+        backoff = float(config.get("backoff", backoff))
+    except (TypeError, ValueError) as exc:
+        raise ValueError(
+            f"timeout, retries and backoff must be numbers: {exc}"
+        ) from exc
+    if not timeout > 0 or retries < 0 or not backoff >= 0:
+        raise ValueError("timeout must be positive, retries and backoff not negative")
+    return timeout, retries, backoff
+
+
+def retryable(exc: BaseException, idempotent: bool = True) -> bool:
+    """Return whether a failed attempt is worth repeating.
+
+    Timeouts, connection errors and 5xx responses are; client errors and
+    malformed rule configurations are not.  A non-idempotent action is
+    only retried if it failed to connect.
+    """
+    if not idempotent:
+        return isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, (httpx.HTTPError, TimeoutError, OSError))
+
+
+async def run_with_retries(
+    attempt: Callable[[], Awaitable[Any]],
+    timeout: float,
+    retries: int,
+    backoff: float,
+    idempotent: bool = True,
+    counts: Optional[Counter] = None,
+) -> None:
+    """Await ``attempt()`` under *timeout*, repeating failures worth retrying.
+
+    Retries wait *backoff* seconds, doubled each time and capped at
+    :data:`MAX_BACKOFF_SECONDS`; see :func:`retryable`.
+
+    Args:
+        attempt: Returns a fresh awaitable for each attempt.
+        timeout: Per-attempt timeout in seconds.
+        retries: Retries allowed after the first attempt.
+        backoff: Delay before the first retry.
+        idempotent: ``False`` to retry only failed connections.
+        counts: If given, ``timed_out`` and ``retried`` are tallied here.
+
+    Raises:
+        Exception: The last failure, once it is not retryable or the
+            retries are used up.
+    """
+    for n in range(retries + 1):
+        try:
+            await asyncio.wait_for(attempt(), timeout)
+            return
+        except Exception as exc:
+            if counts is not None and isinstance(exc, TimeoutError):
+                counts["timed_out"] += 1
+            if n >= retries or not retryable(exc, idempotent):
+                raise
+            if counts is not None:
+                counts["retried"] += 1
+            await asyncio.sleep(min(backoff * 2**n, MAX_BACKOFF_SECONDS))
+
+
+@dataclass
+class ActionJob:
+    """One triggered action waiting to run.
+
+    Attributes:
+        rule: The rule that fired.
+        event: The event that matched.
+        config: Parsed ``action_config``.
+        submitted: Event-loop time of submission.
+        lane: Ordering key for :data:`ORDERED_ACTIONS`, else ``None``.
+    """
+
+    rule: BotRule
+    event: dict
+    config: dict
+    submitted: float
+    lane: Optional[tuple[str, str]] = None
+
+
+class ActionDispatcher:
+    """Runs rule actions on bounded per-type worker pools.
+
+    Attributes:
+        executor: Performs the actual side-effects.
+        workers: Pool size for action types without an explicit limit.
+        limits: Pool size per action type.
+        queue_size: Capacity of each action type's queue; submitting to a
+            full queue waits, slowing the bot worker rather than growing
+            memory.
+        lane_size: Most ordered actions waiting per destination; beyond
+            that new ones are dropped and counted as ``dropped``.
+        timeout: Default per-attempt timeout in seconds.
+        retries: Default number of retries after a failed attempt.
+        backoff: Default delay before the first retry, doubled each time.
+    """
+
+    def __init__(
+        self,
+        executor: ActionExecutor,
+        workers: int = BOT_ACTION_WORKERS,
+        limits: Optional[dict[str, int]] = None,
+        queue_size: int = BOT_ACTION_QUEUE_SIZE,
+        lane_size: int = BOT_ACTION_LANE_SIZE,
+        timeout: float = BOT_ACTION_TIMEOUT,
+        retries: int = BOT_ACTION_RETRIES,
+        backoff: float = BOT_ACTION_BACKOFF,
+    ) -> None:
+        self.executor = executor
+        self.workers = workers
+        self.limits = parse_limits(BOT_ACTION_LIMITS) if limits is None else limits
+        self.queue_size = queue_size
+        self.lane_size = lane_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._queues: dict[str, asyncio.Queue[ActionJob]] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._lanes: dict[tuple[str, str], deque[ActionJob]] = {}
+        self._counts: defaultdict[str, Counter] = defaultdict(Counter)
+        self._queue_wait: defaultdict[str, LatencyWindow] = defaultdict(LatencyWindow)
+        self._latency: defaultdict[str, LatencyWindow] = defaultdict(LatencyWindow)
+
+    async def execute(self, rule: BotRule, event: dict) -> None:
+        """Queue *rule*'s action for *event*; see :meth:`submit`."""
+        await self.submit(rule, event)
+
+    async def submit(self, rule: BotRule, event: dict) -> None:
+        """Queue the action of *rule* for *event*.
+
+        Waits while the action type's queue is full.  Rules whose
+        ``action_config`` is not a JSON object are counted as failed, and
+        ordered actions beyond ``lane_size`` for one destination are
+        dropped.
+
+        Args:
+            rule: The triggered rule.
+            event: The event that matched.
+        """
+        action = rule.action_type
+        counts = self._counts[action]
+        counts["submitted"] += 1
+        try:
+            config = json.loads(rule.action_config)
+            if not isinstance(config, dict):
+                raise ValueError("action_config must be a JSON object")
+        except ValueError:
+            counts["failed"] += 1
+            logger.warning("[BOT] Rule '%s' has invalid action_config", rule.name)
+            return
+        job = ActionJob(rule, event, config, asyncio.get_running_loop().time())
+        if action in ORDERED_ACTIONS:
+            key, default = ORDERED_ACTIONS[action]
+            job.lane = (action, str(config.get(key, default)))
+            lane = self._lanes.get(job.lane)
+            if lane is not None:
+                # A job for this destination is queued or running; its
+                # worker picks this one up when it finishes.
+                if len(lane) >= self.lane_size:
+                    counts["dropped"] += 1
+                    logger.warning(
+                        "[BOT] Dropped '%s' of rule '%s': %d already waiting for %s",
+                        action,
+                        rule.name,
+                        len(lane),
+                        job.lane[1],
+                    )
+                    return
+                lane.append(job)
+                return
+            self._lanes[job.lane] = deque()
+        await self._queue(action).put(job)
+
+    def _queue(self, action: str) -> asyncio.Queue[ActionJob]:
+        """Return the queue for *action*, starting its workers on first use."""
+        queue = self._queues.get(action)
+        if queue is None:
+            queue = self._queues[action] = asyncio.Queue(self.queue_size)
+            for _ in range(self.limits.get(action, self.workers)):
+                self._tasks.append(asyncio.create_task(self._work(queue)))
+        return queue
+
+    async def _work(self, queue: asyncio.Queue[ActionJob]) -> None:
+        """Worker loop: run jobs, following ordered lanes to their end."""
+        while True:
+            job: Optional[ActionJob] = await queue.get()
+            try:
+                while job is not None:
+                    try:
+                        await self._run(job)
+                    except Exception:
+                        self._counts[job.rule.action_type]["failed"] += 1
+                        logger.exception(
+                            "[BOT] Action of rule '%s' crashed", job.rule.name
+                        )
+                    job = self._next_in_lane(job)
+            finally:
+                queue.task_done()
+
+    def _next_in_lane(self, job: ActionJob) -> Optional[ActionJob]:
+        """Pop the job queued behind *job* for the same destination."""
+        if job.lane is None:
+            return None
+        lane = self._lanes.get(job.lane)
+        if lane:
+            return lane.popleft()
+        self._lanes.pop(job.lane, None)
+        return None
+
+    async def _run(self, job: ActionJob) -> None:
+        """Execute *job* with its timeout and retry policy."""
+        loop = asyncio.get_running_loop()
+        rule, action = job.rule, job.rule.action_type
+        counts = self._counts[action]
+        started = loop.time()
+        self._queue_wait[action].observe(started - job.submitted)
+        try:
+            timeout, retries, backoff = parse_retry_policy(
+                job.config, self.timeout, self.retries, self.backoff
+            )
+        except ValueError as exc:
+            counts["failed"] += 1
+            logger.warning("[BOT] Rule '%s' has %s", rule.name, exc)
+            return
+        try:
+            await run_with_retries(
+                lambda: self.executor.execute(rule, job.event),
+                timeout,
+                retries,
+                backoff,
+                idempotent=action not in NON_IDEMPOTENT_ACTIONS,
+                counts=counts,
+            )
+        except Exception as exc:
+            counts["failed"] += 1
+            logger.warning(
+                "[BOT] Action '%s' of rule '%s' failed: %r", action, rule.name, exc
+            )
+        else:
+            counts["succeeded"] += 1
+        self._latency[action].observe(loop.time() - started)
+
+    async def drain(self) -> None:
+        """Wait until every queued action has finished."""
+        for queue in list(self._queues.values()):
+            await queue.join()
+
+    async def close(self) -> None:
+        """Stop the workers, abandoning actions that have not started."""
+        pending = sum(q.qsize() for q in self._queues.values()) + sum(
+            len(lane) for lane in self._lanes.values()
+        )
+        if pending:
+            logger.warning("[BOT] Dropping %d queued actions on shutdown", pending)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._queues.clear()
+        self._lanes.clear()
+
+    def stats(self) -> dict:
+        """Return per-action-type counters and timings for the metrics."""
+        actions = self._counts.keys() | self._queues.keys()
+        return {
+            "workers": self.workers,
+            "limits": dict(self.limits),
+            "queue_size": self.queue_size,
+            "lane_size": self.lane_size,
+            "ordered_lanes": len(self._lanes),
+            "actions": {
+                action: {
+                    **self._counts[action],
+                    "queued": (
+                        self._queues[action].qsize() if action in self._queues else 0
+                    ),
+                    "queue_wait": self._queue_wait[action].summary(),
+                    "latency": self._latency[action].summary(),
+                }
+                for action in sorted(actions)
+            },
+        }
@@ -0,0 +1,108 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Bounded queue feeding events to the bot worker.
+
+When the bot falls behind, ``BOT_OVERFLOW_POLICY`` decides what gives:
+
+* ``drop_oldest`` (default) — discard the longest-waiting event, keeping
+  the bot close to real time.
+* ``drop_newest`` — discard the incoming event.
+* ``block`` — make the publisher wait, slowing ingest requests down to
+  the bot's pace.  Only honoured with the in-memory pub/sub backend:
+  with Redis, waiting would stall the shared reader and WebSocket
+  fan-out, so the worker enqueues via :meth:`BotEventQueue.put_nowait`,
+  which treats ``block`` like ``drop_oldest``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import Counter
+
+from .latency import LatencyWindow
+
+BOT_QUEUE_SIZE: int = int(os.getenv("BOT_QUEUE_SIZE", "10000"))
+BOT_OVERFLOW_POLICY: str = os.getenv("BOT_OVERFLOW_POLICY", "drop_oldest")
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class BotEventQueue:
+    """FIFO of bot events with an overflow policy and lag tracking.
+
+    Attributes:
+        maxsize: Capacity in events.
+        policy: One of :data:`OVERFLOW_POLICIES`.
+        counts: ``enqueued``, ``dropped`` and ``filtered`` counters.
+        lag: Time events spent queued before being taken for evaluation.
+    """
+
+    def __init__(
+        self, maxsize: int = BOT_QUEUE_SIZE, policy: str = BOT_OVERFLOW_POLICY
+    ) -> None:
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown bot overflow policy '{policy}'")
+        self.maxsize = maxsize
+        self.policy = policy
+        self._queue: asyncio.Queue[tuple[float, dict]] = asyncio.Queue(maxsize)
+        self.counts: Counter = Counter()
+        self.lag = LatencyWindow()
+
+    def qsize(self) -> int:
+        """Return the number of queued events."""
+        return self._queue.qsize()
+
+    async def put(self, event: dict) -> bool:
+        """Queue *event*, applying the overflow policy when full.
+
+        Returns:
+            ``False`` if *event* itself was dropped.
+        """
+        if self.policy != "block":
+            return self.put_nowait(event)
+        await self._queue.put((time.monotonic(), event))
+        self.counts["enqueued"] += 1
+        return True
+
+    def put_nowait(self, event: dict) -> bool:
+        """Queue *event* without waiting; ``block`` acts as ``drop_oldest``.
+
+        Returns:
+            ``False`` if *event* itself was dropped.
+        """
+        item = (time.monotonic(), event)
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.counts["dropped"] += 1
+            if self.policy == "drop_newest":
+                return False
+            self._queue.get_nowait()
+            self._queue.put_nowait(item)
+        self.counts["enqueued"] += 1
+        return True
+
+    def skip(self) -> None:
+        """Count an event that was filtered out before queueing."""
+        self.counts["filtered"] += 1
+
+    async def get(self) -> dict:
+        """Wait for the next event and record how long it was queued."""
+        queued_at, event = await self._queue.get()
+        self.lag.observe(time.monotonic() - queued_at)
+        return event
+
+    def stats(self) -> dict:
+        """Return depth, drop and lag figures for the metrics endpoint."""
+        return {
+            "depth": self.qsize(),
+            "maxsize": self.maxsize,
+            "policy": self.policy,
+            "enqueued": self.counts["enqueued"],
+            "dropped": self.counts["dropped"],
+            "filtered": self.counts["filtered"],
+            "lag": self.lag.summary(),
+        }
@@ -0,0 +1,306 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""In-memory index of enabled bot rules, compiled by trigger type.
+
+Built once per rules version (see :func:`server.bot.rules.rules_version`)
+so that evaluating an event touches only the rules that can match it and
+never queries the database.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from collections import defaultdict, deque
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+
+from .conditions import ConditionCompiler, EventContext, Predicate
+
+if TYPE_CHECKING:
+    from ..models import BotRule
+
+logger = logging.getLogger(__name__)
+
+
+def decode_payload(payload_hex: Optional[str]) -> Optional[str]:
+    """Hex-decode a payload to lower-cased text for keyword matching.
+
+    Invalid UTF-8 sequences are dropped, mirroring how keyword rules have
+    always treated payloads.
+
+    Args:
+        payload_hex: Hex-encoded payload bytes.
+
+    Returns:
+        The lower-cased text, or ``None`` if the payload is empty or not
+        valid hex.
+    """
+    if not payload_hex:
+        return None
+    try:
+        return bytes.fromhex(payload_hex).decode("utf-8", errors="ignore").lower()
+    except ValueError:
+        return None
+
+
+AUTOMATON_MIN_KEYWORDS = 48
+"""Distinct keywords from which :class:`KeywordMatcher` uses the automaton.
+
+Below this, testing each keyword with ``str.find`` (C speed) beats walking
+a pure-Python automaton; above it the automaton's single pass wins (see
+``python -m benchmarks.keyword_matching``).
+"""
+
+
+def compile_pattern(value: str) -> re.Pattern[str]:
+    """Compile the trigger value of a ``regex`` rule.
+
+    Patterns are case-insensitive, like every other text trigger.
+
+    Raises:
+        re.error: If *value* is not a valid regular expression.
+    """
+    return re.compile(value, re.IGNORECASE)
+
+
+def _is_word_char(char: str) -> bool:
+    """Return whether *char* is a word character in the ``\\w`` sense."""
+    return char.isalnum() or char == "_"
+
+
+def _bounded(text: str, start: int, end: int) -> bool:
+    """Return whether ``text[start:end]`` is delimited by word boundaries."""
+    return (start == 0 or not _is_word_char(text[start - 1])) and (
+        end == len(text) or not _is_word_char(text[end])
+    )
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton reporting every occurrence of many patterns.
+
+    The trie's states are list indices; ``_fail`` holds the failure links
+    and ``_out`` the patterns ending at each state, already merged along
+    the failure chain so a lookup never has to follow it.
+
+    Attributes:
+        patterns: The non-empty patterns, indexed by their position.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns = [p for p in patterns if p]
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        out: list[list[int]] = [[]]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    out.append([])
+                state = nxt
+            out[state].append(index)
+        # Breadth-first so a state's failure target is final before its
+        # children are processed.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                out[nxt].extend(out[self._fail[nxt]])
+        self._out = [tuple(indices) for indices in out]
+
+    def iter(self, text: str) -> Iterator[tuple[int, int]]:
+        """Yield ``(end, pattern_index)`` for every occurrence in *text*.
+
+        ``end`` is exclusive, so the match is
+        ``text[end - len(pattern):end]``.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for pos, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in out[state]:
+                yield pos, index
+
+
+class KeywordMatcher:
+    """Matches every ``keyword`` and ``word`` rule against a payload.
+
+    Keywords are lower-cased and grouped, so each distinct keyword is
+    looked for once per event.  With :data:`AUTOMATON_MIN_KEYWORDS` or
+    more distinct keywords they are all found in one pass of an
+    :class:`AhoCorasick` automaton.  ``keyword`` rules match anywhere in
+    the text; ``word`` rules only where the keyword is delimited by word
+    boundaries.
+    """
+
+    def __init__(self, rules: Iterable[BotRule]) -> None:
+        self._substring: defaultdict[str, list[BotRule]] = defaultdict(list)
+        self._word: defaultdict[str, list[BotRule]] = defaultdict(list)
+        self._count = 0
+        for rule in rules:
+            target = self._word if rule.trigger_type == "word" else self._substring
+            target[rule.trigger_value.lower()].append(rule)
+            self._count += 1
+        # An empty keyword is contained in every payload but is never a word.
+        self._always = self._substring.pop("", [])
+        self._word.pop("", None)
+        self._keywords = sorted(self._substring.keys() | self._word.keys())
+        self._automaton: Optional[AhoCorasick] = None
+        if len(self._keywords) >= AUTOMATON_MIN_KEYWORDS:
+            self._automaton = AhoCorasick(self._keywords)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _occurrences(self, text: str) -> Iterator[tuple[int, str]]:
+        """Yield ``(start, keyword)`` for keyword occurrences in *text*.
+
+        Without the automaton, keywords only used by ``keyword`` rules
+        stop at their first occurrence.
+        """
+        if self._automaton is not None:
+            keywords = self._automaton.patterns
+            for end, index in self._automaton.iter(text):
+                keyword = keywords[index]
+                yield end - len(keyword), keyword
+            return
+        for keyword in self._keywords:
+            start = text.find(keyword)
+            while start != -1:
+                yield start, keyword
+                if keyword not in self._word:
+                    break
+                start = text.find(keyword, start + 1)
+
+    def match(self, text: str) -> list[BotRule]:
+        """Return rules whose keyword occurs in *text*.
+
+        Args:
+            text: Lower-cased payload text from :func:`decode_payload`.
+        """
+        found: set[str] = set()
+        words: set[str] = set()
+        for start, keyword in self._occurrences(text):
+            found.add(keyword)
+            if (
+                keyword in self._word
+                and keyword not in words
+                and _bounded(text, start, start + len(keyword))
+            ):
+                words.add(keyword)
+        matched = list(self._always)
+        for keyword in found:
+            matched.extend(self._substring.get(keyword, ()))
+        for keyword in words:
+            matched.extend(self._word[keyword])
+        return matched
+
+
+class RuleIndex:
+    """Enabled rules grouped by what they trigger on.
+
+    Attributes:
+        version: Rules version this index was built from.
+        by_packet_type: ``packet_type`` rules keyed by trigger value.
+        by_source: ``node_seen`` rules keyed by source hash.
+        keywords: Matcher over ``keyword`` and ``word`` rules.
+        patterns: Compiled ``regex`` rules.
+        conditions: Compiled ``condition`` rules; comparisons shared
+            between them are evaluated once per event.
+        scheduled: ``schedule`` rules, run by the scheduler rather than
+            matched against events.
+        size: Total number of indexed rules.
+    """
+
+    def __init__(self, rules: Iterable[BotRule], version: int = 0) -> None:
+        self.version = version
+        self.by_packet_type: defaultdict[str, list[BotRule]] = defaultdict(list)
+        self.by_source: defaultdict[str, list[BotRule]] = defaultdict(list)
+        keyword_rules: list[BotRule] = []
+        self.patterns: list[tuple[re.Pattern[str], BotRule]] = []
+        self.conditions: list[tuple[Predicate, BotRule]] = []
+        self.scheduled: list[BotRule] = []
+        self.size = 0
+        compiler = ConditionCompiler()
+        for rule in rules:
+            self.size += 1
+            if rule.trigger_type == "packet_type":
+                self.by_packet_type[rule.trigger_value].append(rule)
+            elif rule.trigger_type == "node_seen":
+                self.by_source[rule.trigger_value].append(rule)
+            elif rule.trigger_type in ("keyword", "word"):
+                keyword_rules.append(rule)
+            elif rule.trigger_type == "regex":
+                try:
+                    self.patterns.append((compile_pattern(rule.trigger_value), rule))
+                except re.error as exc:
+                    logger.warning("Skipping rule '%s': bad regex (%s)", rule.name, exc)
+            elif rule.trigger_type == "condition":
+                try:
+                    self.conditions.append((compiler.compile(rule.trigger_value), rule))
+                except ValueError as exc:
+                    logger.warning(
+                        "Skipping rule '%s': bad condition (%s)", rule.name, exc
+                    )
+            elif rule.trigger_type == "schedule":
+                self.scheduled.append(rule)
+        self.keywords = KeywordMatcher(keyword_rules)
+        self._needs_text = bool(len(self.keywords) or self.patterns)
+        self._conditions_use_text = compiler.uses_text
+
+    def may_match(self, event: dict) -> bool:
+        """Cheaply test whether any indexed rule could fire for *event*.
+
+        Used to skip events before they are queued: only the lookups are
+        done, text triggers just need a payload to be present and any
+        event may satisfy a condition.
+        """
+        data = event.get("data", {})
+        return (
+            bool(self.conditions)
+            or data.get("packet_type") in self.by_packet_type
+            or data.get("source_hash") in self.by_source
+            or bool(self._needs_text and data.get("payload_hex"))
+        )
+
+    def match(self, event: dict) -> list[BotRule]:
+        """Return the rules triggered by *event*, ordered by rule ID.
+
+        Args:
+            event: Dict with ``"type"`` and ``"data"`` keys.
+        """
+        data = event.get("data", {})
+        matched: list[BotRule] = []
+        packet_type = data.get("packet_type")
+        if packet_type is not None:
+            matched.extend(self.by_packet_type.get(packet_type, ()))
+        source_hash = data.get("source_hash")
+        if source_hash is not None:
+            matched.extend(self.by_source.get(source_hash, ()))
+        text = None
+        if self._needs_text or self._conditions_use_text:
+            # Decoded once, shared by every text trigger.
+            text = decode_payload(data.get("payload_hex"))
+        if text is not None and self._needs_text:
+            matched.extend(self.keywords.match(text))
+            matched.extend(
+                rule for pattern, rule in self.patterns if pattern.search(text)
+            )
+        if self.conditions:
+            context = EventContext(data, text)
+            matched.extend(
+                rule for predicate, rule in self.conditions if predicate(context)
+            )
+        return sorted(matched, key=lambda rule: rule.id or 0)
@@ -0,0 +1,50 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Rolling latency summaries for the bot metrics."""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Optional
+
+
+class LatencyWindow:
+    """Keeps the most recent durations and summarises them.
+
+    Attributes:
+        count: Total number of observations, including evicted ones.
+        max: Largest duration observed, in seconds.
+    """
+
+    def __init__(self, size: int = 1024) -> None:
+        self._recent: deque[float] = deque(maxlen=size)
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Record one duration in seconds."""
+        self._recent.append(seconds)
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Return the *fraction* percentile of the window, in seconds."""
+        if not self._recent:
+            return None
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self) -> dict:
+        """Return counters and recent percentiles in milliseconds."""
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            "count": self.count,
+            "p50_ms": ms(self.percentile(0.5)),
+            "p95_ms": ms(self.percentile(0.95)),
+            "max_ms": ms(self.max if self.count else None),
+        }
@@ -0,0 +1,67 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""File-lock leader election so only one process runs the bot worker.
+
+When the server runs with several worker processes, each one tries to
+take an exclusive ``flock`` on ``BOT_LOCK_PATH``.  The holder runs the
+bot; the others keep retrying, so leadership moves to a surviving
+process if the leader exits (the kernel drops the lock with the process).
+"""
+
+import fcntl
+import logging
+import os
+import tempfile
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+BOT_LOCK_PATH: str = os.getenv(
+    "BOT_LOCK_PATH", os.path.join(tempfile.gettempdir(), "meshcore-bot.lock")
+)
+BOT_LEADER_RETRY_SECONDS: float = float(os.getenv("BOT_LEADER_RETRY_SECONDS", "5"))
+
+
+class FileLock:
+    """Non-blocking exclusive lock on a file.
+
+    Attributes:
+        path: Lock file location.
+    """
+
+    def __init__(self, path: str = BOT_LOCK_PATH) -> None:
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        """Whether this instance currently holds the lock."""
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """Attempt to take the lock without blocking.
+
+        Returns:
+            ``True`` if the lock is now held by this instance.
+        """
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        """Release the lock if held."""
+        if self._fd is None:
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
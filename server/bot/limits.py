@@ -0,0 +1,161 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Per-rule cooldowns and token-bucket rate limits.
+
+Limits are read from a rule's ``action_config``::
+
+    {"cooldown": 30, "rate_limit": {"capacity": 5, "per": 60},
+     "limit_by": "source"}
+
+* ``cooldown`` — minimum seconds between two firings.
+* ``rate_limit`` — a token bucket holding ``capacity`` firings, refilled
+  continuously at ``capacity`` per ``per`` seconds.
+* ``limit_by`` — ``"rule"`` (default) shares one budget across all
+  events; ``"source"`` keeps a separate budget per ``source_hash``.
+
+:class:`RateLimiter` enforces them in memory before the action is run or
+queued; suppressed firings are counted in
+:class:`~server.bot.stats.TriggerStats`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from ..models import BotRule
+
+BOT_LIMIT_MAX_KEYS: int = int(os.getenv("BOT_LIMIT_MAX_KEYS", "10000"))
+
+LIMIT_BY = ("rule", "source")
+
+
+@dataclass(frozen=True)
+class RulePolicy:
+    """Firing limits of one rule.
+
+    Attributes:
+        cooldown: Minimum seconds between firings, or 0.
+        capacity: Token-bucket size, or 0 for no bucket.
+        refill: Tokens added per second.
+        per_source: Whether budgets are kept per ``source_hash``.
+    """
+
+    cooldown: float = 0.0
+    capacity: float = 0.0
+    refill: float = 0.0
+    per_source: bool = False
+
+
+def parse_policy(config: dict) -> Optional[RulePolicy]:
+    """Read the limit keys of a parsed ``action_config``.
+
+    Returns:
+        The policy, or ``None`` if the rule is unlimited.
+
+    Raises:
+        ValueError: If a limit key has an invalid value.
+    """
+    cooldown = float(config.get("cooldown", 0))
+    if cooldown < 0:
+        raise ValueError("cooldown must not be negative")
+    capacity = refill = 0.0
+    rate = config.get("rate_limit")
+    if rate is not None:
+        if not isinstance(rate, dict):
+            raise ValueError("rate_limit must be an object")
+        capacity = float(rate.get("capacity", 1))
+        per = float(rate.get("per", 0))
+        if capacity < 1 or per <= 0:
+            raise ValueError("rate_limit needs capacity >= 1 and per > 0")
+        refill = capacity / per
+    limit_by = config.get("limit_by", "rule")
+    if limit_by not in LIMIT_BY:
+        raise ValueError(f"limit_by must be one of {', '.join(LIMIT_BY)}")
+    if not cooldown and not capacity:
+        return None
+    return RulePolicy(cooldown, capacity, refill, limit_by == "source")
+
+
+@dataclass
+class _Budget:
+    """Mutable limit state for one rule (or rule and source)."""
+
+    last_fired: float
+    tokens: float
+    updated: float
+
+
+class RateLimiter:
+    """Decides whether a triggered rule may fire now.
+
+    Budgets are kept in an LRU map capped at ``max_keys`` entries, so
+    per-source limits cannot grow without bound on a busy mesh.
+    """
+
+    def __init__(self, max_keys: int = BOT_LIMIT_MAX_KEYS) -> None:
+        self.max_keys = max_keys
+        self._policies: dict[int, tuple[str, Optional[RulePolicy]]] = {}
+        self._budgets: OrderedDict[tuple[int, Optional[str]], _Budget] = OrderedDict()
+
+    def policy(self, rule: BotRule) -> Optional[RulePolicy]:
+        """Return *rule*'s policy, re-parsing only when its config changes.
+
+        Rules with an unreadable config are treated as unlimited; the
+        dispatcher reports the bad config when it runs the action.
+        """
+        cached = self._policies.get(rule.id or 0)
+        if cached is not None and cached[0] == rule.action_config:
+            return cached[1]
+        try:
+            policy = parse_policy(json.loads(rule.action_config))
+        except (ValueError, TypeError, AttributeError):
+            policy = None
+        self._policies[rule.id or 0] = (rule.action_config, policy)
+        return policy
+
+    def allow(self, rule: BotRule, event: dict, now: Optional[float] = None) -> bool:
+        """Consume budget for one firing of *rule* if any is left.
+
+        Args:
+            rule: The triggered rule.
+            event: The matched event; its ``source_hash`` keys per-source
+                budgets.
+            now: Monotonic time, defaulting to :func:`time.monotonic`.
+
+        Returns:
+            ``True`` if the rule may fire, ``False`` if it is suppressed.
+        """
+        policy = self.policy(rule)
+        if policy is None:
+            return True
+        now = time.monotonic() if now is None else now
+        source = event.get("data", {}).get("source_hash") if policy.per_source else None
+        key = (rule.id or 0, source)
+        budget = self._budgets.get(key)
+        if budget is None:
+            budget = _Budget(float("-inf"), policy.capacity, now)
+            self._budgets[key] = budget
+            if len(self._budgets) > self.max_keys:
+                self._budgets.popitem(last=False)
+        else:
+            self._budgets.move_to_end(key)
+
+        if now - budget.last_fired < policy.cooldown:
+            return False
+        if policy.capacity:
+            budget.tokens = min(
+                policy.capacity, budget.tokens + (now - budget.updated) * policy.refill
+            )
+            budget.updated = now
+            if budget.tokens < 1:
+                return False
+            budget.tokens -= 1
+        budget.last_fired = now
+        return True
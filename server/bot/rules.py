@@ -1,63 +1,152 @@
 # Copyright © 2025-26 l5yth & contributors
 # Licensed under BSD 3-Clause License
 
-"""Rule engine — matches incoming events against stored bot rules."""
+"""Rule engine — matches incoming events against stored bot rules.
+
+Enabled rules are compiled into a :class:`~server.bot.index.RuleIndex`
+that is rebuilt only when the rules version changes.  The rules API calls
+:func:`notify_rules_changed` after every write; the notice travels over
+the pub/sub backend so the bot worker sees it whichever process it runs in.
+"""
 
 from __future__ import annotations
 
 import logging
+import re
 from datetime import UTC, datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from sqlmodel import select
 
+from .. import pubsub
 from ..database import get_session
 from ..models import BotRule
+from .conditions import EventContext, compile_condition
+from .index import RuleIndex, compile_pattern, decode_payload
+from .limits import RateLimiter
+from .stats import TriggerStats, trigger_stats
 
 if TYPE_CHECKING:
     from .actions import ActionExecutor
+    from .dispatch import ActionDispatcher
 
 logger = logging.getLogger(__name__)
 
+RULES_CHANNEL = "rules"
+"""Pub/sub channel announcing rule changes."""
+
+_rules_version = 0
+
+
+def rules_version() -> int:
+    """Return the current rules version of this process."""
+    return _rules_version
+
+
+def bump_rules_version() -> int:
+    """Invalidate compiled rule indexes in this process.
+
+    Returns:
+        The new version number.
+    """
+    global _rules_version
+    _rules_version += 1
+    return _rules_version
+
+
+async def notify_rules_changed() -> None:
+    """Tell every process that bot rules were created, edited or deleted."""
+    await pubsub.backend.publish(RULES_CHANNEL, {})
+
+
+async def _on_rules_changed(_message: dict) -> None:
+    """Pub/sub handler bumping the local rules version."""
+    bump_rules_version()
+
+
+pubsub.backend.subscribe(RULES_CHANNEL, _on_rules_changed)
+
 
 class RuleEngine:
     """Evaluates events against all enabled :class:`BotRule` records.
 
     Each rule specifies a ``trigger_type`` and ``trigger_value``.  When an
     incoming event matches, the corresponding action is dispatched through
-    an :class:`ActionExecutor`.
+    an :class:`ActionExecutor` and the firing is tallied in :attr:`stats`.
+
+    Attributes:
+        stats: Trigger tallies, flushed to the database in batches.
+        limiter: Per-rule cooldowns and rate limits.
     """
 
-    async def evaluate(self, event: dict, executor: ActionExecutor) -> None:
-        """Check *event* against every enabled rule and fire matches.
+    def __init__(
+        self,
+        stats: TriggerStats = trigger_stats,
+        limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        self.stats = stats
+        self.limiter = limiter or RateLimiter()
+        self._index: Optional[RuleIndex] = None
+
+    def index(self) -> RuleIndex:
+        """Return the compiled rule index, rebuilding it if rules changed.
+
+        Returns:
+            A :class:`RuleIndex` for the current rules version.
+        """
+        version = rules_version()
+        if self._index is None or self._index.version != version:
+            with get_session() as session:
+                rules = list(
+                    session.exec(
+                        select(BotRule).where(BotRule.enabled == True)  # noqa: E712
+                    ).all()
+                )
+            self._index = RuleIndex(rules, version)
+            logger.info("Compiled %d enabled bot rules (v%d)", len(rules), version)
+        return self._index
+
+    async def evaluate(
+        self, event: dict, executor: ActionExecutor | ActionDispatcher
+    ) -> None:
+        """Fire every enabled rule that matches *event*.
 
         Args:
             event: Dict with ``"type"`` and ``"data"`` keys.
-            executor: Action executor used to dispatch triggered rules.
+            executor: Runs (or, for a dispatcher, queues) triggered actions.
+        """
+        for rule in self.index().match(event):
+            logger.info("Rule '%s' matched event", rule.name)
+            await self.fire(rule, event, executor)
+
+    async def fire(
+        self, rule: BotRule, event: dict, executor: ActionExecutor | ActionDispatcher
+    ) -> None:
+        """Run *rule*'s action for *event* and count the firing.
+
+        Firings over the rule's cooldown or rate limit are counted as
+        suppressed instead.
+
+        Args:
+            rule: The triggered rule.
+            event: The matched event, or a synthetic ``schedule`` event.
+            executor: Runs (or, for a dispatcher, queues) the action.
         """
-        with get_session() as session:
-            rules = list(
-                session.exec(
-                    select(BotRule).where(BotRule.enabled == True)
-                ).all()  # noqa: E712
-            )
-
-        for rule in rules:
-            if await self._matches(rule, event):
-                logger.info("Rule '%s' matched event", rule.name)
-                await executor.execute(rule, event)
-                # Update trigger statistics
-                with get_session() as session:
-                    db_rule = session.get(BotRule, rule.id)
-                    if db_rule:
-                        db_rule.last_triggered = datetime.now(UTC)
-                        db_rule.trigger_count += 1
-                        session.add(db_rule)
-                        session.commit()
+        if not self.limiter.allow(rule, event):
+            logger.debug("Rule '%s' suppressed by its limits", rule.name)
+            if rule.id is not None:
+                self.stats.suppress(rule.id)
+            return
+        await executor.execute(rule, event)
+        if rule.id is not None:
+            self.stats.record(rule.id, datetime.now(UTC))
 
     async def _matches(self, rule: BotRule, event: dict) -> bool:
         """Determine whether *rule* matches *event*.
 
+        This is the per-rule reference behaviour that :class:`RuleIndex`
+        reproduces in bulk.
+
         Args:
             rule: The bot rule to test.
             event: The incoming event dict.
@@ -72,18 +161,37 @@ class RuleEngine:
         if trigger == "packet_type":
             return data.get("packet_type") == value
 
-        if trigger == "keyword":
+        if trigger in ("keyword", "word", "regex"):
             # Only works on decrypted / cleartext payloads
             payload = data.get("payload_hex", "")
             if not payload:
                 return False
             try:
                 text = bytes.fromhex(payload).decode("utf-8", errors="ignore")
-                return value.lower() in text.lower()
             except (ValueError, UnicodeDecodeError):
                 return False
+            if trigger == "keyword":
+                return value.lower() in text.lower()
+            if trigger == "word":
+                return bool(value) and bool(
+                    re.search(rf"(?<!\w){re.escape(value)}(?!\w)", text, re.I)
+                )
+            try:
+                return compile_pattern(value).search(text.lower()) is not None
+            except re.error:
+                return False
 
         if trigger == "node_seen":
             return data.get("source_hash") == value
 
+        if trigger == "condition":
+            try:
+                predicate = compile_condition(value)
+            except ValueError:
+                return False
+            text = decode_payload(data.get("payload_hex"))
+            return predicate(EventContext(data, text))
+
+        # ``schedule`` rules fire on time (see :mod:`server.bot.schedule`),
+        # never on events.
         return False
@@ -0,0 +1,305 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Scheduler for ``schedule`` bot rules.
+
+A rule's ``trigger_value`` is either
+
+* a five-field cron expression (``minute hour day month weekday``, in
+  UTC) supporting ``*``, ranges, lists and ``/step``, or one of the
+  macros ``@hourly``, ``@daily``/``@midnight``, ``@weekly``,
+  ``@monthly`` and ``@yearly``/``@annually``; or
+* an interval such as ``every 30s``, ``every 5m`` or ``every 1h30m``
+  (units ``s``, ``m``, ``h``, ``d``).
+
+:class:`Scheduler` keeps every rule's next fire time in a heap, so a
+firing costs one heap replace, and :func:`run_scheduler` sleeps until the
+earliest deadline or until rules change, whichever comes first.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import re
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Union
+
+from .. import pubsub
+from .rules import RULES_CHANNEL, RuleEngine
+
+if TYPE_CHECKING:
+    from ..models import BotRule
+    from .dispatch import ActionDispatcher
+    from .index import RuleIndex
+
+logger = logging.getLogger(__name__)
+
+CRON_MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+_INTERVAL = re.compile(r"^every\s+((?:\d+(?:\.\d+)?[smhd])+)$", re.IGNORECASE)
+_INTERVAL_PART = re.compile(r"(\d+(?:\.\d+)?)([smhd])", re.IGNORECASE)
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# A cron expression that has not fired within this horizon never will
+# (e.g. ``0 0 30 2 *``).
+_CRON_HORIZON = timedelta(days=366 * 5)
+
+
+class IntervalSchedule:
+    """Fires at a fixed period.
+
+    Attributes:
+        period: Time between firings.
+    """
+
+    def __init__(self, seconds: float) -> None:
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.period = timedelta(seconds=seconds)
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Return the first fire time after *moment*."""
+        return moment + self.period
+
+
+def _parse_field(spec: str, low: int, high: int) -> frozenset[int]:
+    """Expand one cron field into the set of values it allows.
+
+    Raises:
+        ValueError: If the field is malformed or out of range.
+    """
+    values: set[int] = set()
+    for part in spec.split(","):
+        span, _, step_spec = part.partition("/")
+        step = int(step_spec) if step_spec else 1
+        if step < 1:
+            raise ValueError(f"Invalid step in '{part}'")
+        if span == "*":
+            start, end = low, high
+        elif "-" in span:
+            first, last = span.split("-", 1)
+            start, end = int(first), int(last)
+        else:
+            start = int(span)
+            end = high if step_spec else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"'{part}' is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    """Fires on the minutes matched by a five-field cron expression (UTC).
+
+    As in classic cron, when both day-of-month and day-of-week are
+    restricted a day matching either one qualifies.
+    """
+
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError("Cron expressions need five fields")
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        # Both 0 and 7 mean Sunday.
+        self.weekdays = frozenset(d % 7 for d in _parse_field(fields[4], 0, 7))
+        self._either_day = fields[2] != "*" and fields[4] != "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        """Return whether the date of *moment* is a firing day."""
+        in_days = moment.day in self.days
+        in_weekdays = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._either_day:
+            return in_days or in_weekdays
+        return in_days and in_weekdays
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Return the first matching minute strictly after *moment*.
+
+        Raises:
+            ValueError: If the expression never matches.
+        """
+        current = moment.astimezone(UTC).replace(second=0, microsecond=0)
+        current += timedelta(minutes=1)
+        limit = current + _CRON_HORIZON
+        while current < limit:
+            if current.month not in self.months:
+                year, month = divmod(current.month, 12)
+                current = current.replace(
+                    year=current.year + year, month=month + 1, day=1, hour=0, minute=0
+                )
+            elif not self._day_matches(current):
+                current = (current + timedelta(days=1)).replace(hour=0, minute=0)
+            elif current.hour not in self.hours:
+                current = (current + timedelta(hours=1)).replace(minute=0)
+            elif current.minute not in self.minutes:
+                current += timedelta(minutes=1)
+            else:
+                return current
+        raise ValueError("Cron expression never fires")
+
+
+Schedule = Union[CronSchedule, IntervalSchedule]
+
+
+@lru_cache(maxsize=4096)
+def parse_schedule(value: str) -> Schedule:
+    """Parse the ``trigger_value`` of a ``schedule`` rule.
+
+    Raises:
+        ValueError: If *value* is neither a valid interval nor a cron
+            expression that ever fires.
+    """
+    text = value.strip()
+    interval = _INTERVAL.match(text)
+    if interval:
+        seconds = sum(
+            float(amount) * _UNIT_SECONDS[unit.lower()]
+            for amount, unit in _INTERVAL_PART.findall(interval.group(1))
+        )
+        return IntervalSchedule(seconds)
+    schedule = CronSchedule(CRON_MACROS.get(text.lower(), text))
+    schedule.next_after(datetime.now(UTC))
+    return schedule
+
+
+@dataclass
+class _Entry:
+    """A scheduled rule and its next fire time."""
+
+    rule: BotRule
+    schedule: Schedule
+    next_fire: datetime
+
+
+class Scheduler:
+    """Heap of next fire times for the enabled ``schedule`` rules.
+
+    Attributes:
+        version: Rules version the schedule was last synced to.
+    """
+
+    def __init__(self) -> None:
+        self.version: Optional[int] = None
+        self._entries: dict[int, _Entry] = {}
+        self._heap: list[tuple[datetime, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def sync(self, index: RuleIndex, now: datetime) -> None:
+        """Rebuild from *index* if the rules changed.
+
+        Rules whose trigger value is unchanged keep their next fire time;
+        new or edited ones are scheduled from *now*.
+        """
+        if index.version == self.version:
+            return
+        entries: dict[int, _Entry] = {}
+        for rule in index.scheduled:
+            if rule.id is None:
+                continue
+            try:
+                schedule = parse_schedule(rule.trigger_value)
+            except ValueError as exc:
+                logger.warning("Skipping rule '%s': bad schedule (%s)", rule.name, exc)
+                continue
+            old = self._entries.get(rule.id)
+            if old is not None and old.rule.trigger_value == rule.trigger_value:
+                next_fire = old.next_fire
+            else:
+                next_fire = schedule.next_after(now)
+            entries[rule.id] = _Entry(rule, schedule, next_fire)
+        self._entries = entries
+        self._heap = [(entry.next_fire, rule_id) for rule_id, entry in entries.items()]
+        heapq.heapify(self._heap)
+        self.version = index.version
+
+    def next_deadline(self) -> Optional[datetime]:
+        """Return the earliest pending fire time, if any."""
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> list[tuple[BotRule, datetime]]:
+        """Return ``(rule, fire time)`` for every deadline up to *now*.
+
+        Each due rule is rescheduled from its planned fire time so
+        intervals do not drift; firings missed entirely (e.g. while the
+        process was suspended) are collapsed into one.
+        """
+        due: list[tuple[BotRule, datetime]] = []
+        while self._heap and self._heap[0][0] <= now:
+            fire, rule_id = self._heap[0]
+            entry = self._entries[rule_id]
+            next_fire = entry.schedule.next_after(fire)
+            if next_fire <= now:
+                next_fire = entry.schedule.next_after(now)
+            entry.next_fire = next_fire
+            heapq.heapreplace(self._heap, (next_fire, rule_id))
+            due.append((entry.rule, fire))
+        return due
+
+
+def schedule_event(rule: BotRule, fire: datetime) -> dict:
+    """Build the event passed to the action of a scheduled rule."""
+    return {
+        "type": "schedule",
+        "data": {"rule_id": rule.id, "scheduled_for": fire.isoformat()},
+    }
+
+
+async def run_scheduler(
+    engine: RuleEngine,
+    executor: ActionDispatcher,
+    scheduler: Optional[Scheduler] = None,
+) -> None:
+    """Fire scheduled rules until cancelled.
+
+    Sleeps until the next deadline, waking early when rules change so
+    edits take effect immediately.
+
+    Args:
+        engine: Rule engine providing the compiled index and stats.
+        executor: Dispatcher that runs the actions.
+        scheduler: Heap to use; a fresh one by default.
+    """
+    scheduler = scheduler or Scheduler()
+    wakeup = asyncio.Event()
+
+    async def on_rules_changed(_message: dict) -> None:
+        wakeup.set()
+
+    unsubscribe = pubsub.backend.subscribe(RULES_CHANNEL, on_rules_changed)
+    try:
+        while True:
+            wakeup.clear()
+            now = datetime.now(UTC)
+            try:
+                scheduler.sync(engine.index(), now)
+                for rule, fire in scheduler.pop_due(now):
+                    await engine.fire(rule, schedule_event(rule, fire), executor)
+            except Exception:
+                logger.exception("Bot scheduler error")
+            deadline = scheduler.next_deadline()
+            timeout = None
+            if deadline is not None:
+                timeout = max(0.0, (deadline - datetime.now(UTC)).total_seconds())
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout)
+            except TimeoutError:
+                pass
+    finally:
+        unsubscribe()
@@ -0,0 +1,189 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Batched bot trigger statistics.
+
+Rule firings are tallied in memory and written to ``botrule`` in one
+transaction every ``BOT_STATS_FLUSH_SECONDS`` and when the bot worker
+stops, instead of one write per match.  The rules API merges the pending
+tallies so the counts it reports are current in the process running the
+bot; other processes see them once flushed.
+
+Firings suppressed by a cooldown or rate limit (see
+:mod:`server.bot.limits`) are only counted in memory, since the process
+started.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING
+
+from sqlalchemy import bindparam, update
+
+from ..database import get_session
+from ..models import BotRule
+
+if TYPE_CHECKING:
+    from ..schemas import BotRuleResponse
+
+logger = logging.getLogger(__name__)
+
+BOT_STATS_FLUSH_SECONDS: float = float(os.getenv("BOT_STATS_FLUSH_SECONDS", "5"))
+
+_table = BotRule.__table__  # type: ignore[attr-defined]
+
+_UPDATE = (
+    update(_table)
+    .where(_table.c.id == bindparam("rule_id"))
+    .values(
+        trigger_count=_table.c.trigger_count + bindparam("fired"),
+        last_triggered=bindparam("last"),
+    )
+)
+
+
+@dataclass
+class PendingStats:
+    """Firings of one rule not yet written to the database.
+
+    Attributes:
+        count: Number of firings.
+        last: Time of the latest firing.
+    """
+
+    count: int
+    last: datetime
+
+
+class TriggerStats:
+    """In-memory trigger tallies with batched flushing.
+
+    :meth:`flush` may run in a worker thread while the event loop keeps
+    recording; tallies being written stay visible through :meth:`pending`
+    until their transaction commits.  Concurrent flushes run one after
+    the other, so a final flush at shutdown also writes what an
+    interrupted periodic flush left behind.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: dict[int, PendingStats] = {}
+        self._flushing: dict[int, PendingStats] = {}
+        self._suppressed: Counter[int] = Counter()
+
+    def record(self, rule_id: int, when: datetime) -> None:
+        """Count one firing of *rule_id* at *when* (timezone-aware)."""
+        with self._lock:
+            stats = self._pending.get(rule_id)
+            if stats is None:
+                self._pending[rule_id] = PendingStats(1, when)
+            else:
+                stats.count += 1
+                stats.last = max(stats.last, when)
+
+    def suppress(self, rule_id: int) -> None:
+        """Count one firing of *rule_id* held back by its limits."""
+        self._suppressed[rule_id] += 1
+
+    def suppressed(self, rule_id: int) -> int:
+        """Return how many firings of *rule_id* were suppressed."""
+        return self._suppressed[rule_id]
+
+    def pending(self, rule_id: int) -> PendingStats | None:
+        """Return the unwritten tallies for *rule_id*, if any."""
+        with self._lock:
+            parts = [
+                stats
+                for stats in (self._flushing.get(rule_id), self._pending.get(rule_id))
+                if stats is not None
+            ]
+        if not parts:
+            return None
+        return PendingStats(sum(p.count for p in parts), max(p.last for p in parts))
+
+    def apply(self, response: BotRuleResponse) -> BotRuleResponse:
+        """Add pending tallies to a rule as read from the database.
+
+        Args:
+            response: Rule response built from the stored record.
+
+        Returns:
+            *response*, updated in place.
+        """
+        response.suppressed_count = self.suppressed(response.id)
+        stats = self.pending(response.id)
+        if stats is not None:
+            response.trigger_count += stats.count
+            stored = response.last_triggered
+            if stored is not None and stored.tzinfo is None:
+                stored = stored.replace(tzinfo=UTC)  # SQLite drops the zone
+            if stored is None or stats.last > stored:
+                response.last_triggered = stats.last
+        return response
+
+    def flush(self) -> int:
+        """Write all pending tallies in one transaction.
+
+        Waits for a flush already running in another thread.  On failure
+        the tallies are kept for the next attempt.
+
+        Returns:
+            Number of rules updated.
+        """
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        """Write pending tallies; the caller holds ``_flush_lock``."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            self._flushing, self._pending = self._pending, {}
+        batch = self._flushing
+        try:
+            with get_session() as session:
+                session.connection().execute(
+                    _UPDATE,
+                    [
+                        {"rule_id": rid, "fired": s.count, "last": s.last}
+                        for rid, s in batch.items()
+                    ],
+                )
+                session.commit()
+        except Exception:
+            with self._lock:
+                for rule_id, stats in batch.items():
+                    current = self._pending.get(rule_id)
+                    if current is not None:
+                        stats.count += current.count
+                        stats.last = max(stats.last, current.last)
+                    self._pending[rule_id] = stats
+                self._flushing = {}
+            raise
+        with self._lock:
+            self._flushing = {}
+        return len(batch)
+
+
+async def run_stats_flusher(
+    stats: TriggerStats, interval: float = BOT_STATS_FLUSH_SECONDS
+) -> None:
+    """Flush *stats* every *interval* seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(stats.flush)
+        except Exception:
+            logger.exception("Failed to flush bot trigger stats")
+
+
+trigger_stats = TriggerStats()
+"""Process-wide tallies shared by the rule engine and the rules API."""
@@ -3,21 +3,95 @@
 
 """Async bot worker that evaluates rules against incoming events.
 
-The worker consumes from a module-level :class:`asyncio.Queue` populated
-by the ingest router.  It runs as an ``asyncio.Task`` created during
-FastAPI startup.
+The worker consumes from a module-level, bounded
+:class:`~server.bot.event_queue.BotEventQueue` fed by the bot channel of
+the :mod:`server.pubsub` backend, which the ingest router publishes to.
+Events no enabled rule could match are discarded before queueing.  The
+worker runs as an ``asyncio.Task`` created during FastAPI startup, in
+whichever worker process wins the leader lock.
 """
 
 import asyncio
 import logging
+import os
+from typing import Optional
 
-from .actions import ActionExecutor
+from .. import pubsub
+from ..pubsub import BOT_CHANNEL, MemoryBackend
+from . import actions
+from .dispatch import ActionDispatcher
+from .event_queue import BotEventQueue
+from .leader import BOT_LEADER_RETRY_SECONDS, FileLock
 from .rules import RuleEngine
+from .schedule import run_scheduler
+from .stats import run_stats_flusher
 
 logger = logging.getLogger(__name__)
 
-event_queue: asyncio.Queue = asyncio.Queue()
-"""Module-level queue shared with the ingest router."""
+event_queue: BotEventQueue = BotEventQueue()
+"""Module-level queue of events awaiting rule evaluation."""
+
+engine: Optional[RuleEngine] = None
+"""Rule engine of the running bot worker, if any."""
+
+dispatcher: Optional[ActionDispatcher] = None
+"""Action dispatcher of the running bot worker, if any."""
+
+
+async def _receive(message: dict) -> None:
+    """Move events published on the bot channel onto :data:`event_queue`.
+
+    Once the worker is running, events that no enabled rule could match
+    are counted and dropped here instead of queued.  Only the in-memory
+    backend may wait for space under the ``block`` policy; any other
+    backend calls this from its shared reader, which must not stall.
+    """
+    index = engine.index() if engine is not None else None
+    block = event_queue.policy == "block" and isinstance(
+        pubsub.backend, MemoryBackend
+    )
+    for event in message["events"]:
+        if index is not None and not index.may_match(event):
+            event_queue.skip()
+        elif block:
+            await event_queue.put(event)
+        else:
+            event_queue.put_nowait(event)
+
+
+async def run_bot_leader(
+    lock: Optional[FileLock] = None,
+    retry_seconds: float = BOT_LEADER_RETRY_SECONDS,
+) -> None:
+    """Run the bot worker once this process holds the leader lock.
+
+    Retries every *retry_seconds* until the lock is free, then subscribes
+    to the bot channel and runs :func:`start_bot_worker` until cancelled.
+
+    Args:
+        lock: Leader lock; defaults to a :class:`FileLock` on
+            ``BOT_LOCK_PATH``.
+        retry_seconds: Delay between acquisition attempts.
+    """
+    lock = lock or FileLock()
+    if not lock.try_acquire():
+        logger.info("Bot worker standing by; another process holds %s", lock.path)
+        while not lock.try_acquire():
+            await asyncio.sleep(retry_seconds)
+    logger.info("Bot leader lock acquired (pid %d)", os.getpid())
+    if event_queue.policy == "block" and not isinstance(
+        pubsub.backend, MemoryBackend
+    ):
+        logger.warning(
+            "BOT_OVERFLOW_POLICY=block needs the memory backend; "
+            "dropping the oldest events instead"
+        )
+    unsubscribe = pubsub.backend.subscribe(BOT_CHANNEL, _receive)
+    try:
+        await start_bot_worker()
+    finally:
+        unsubscribe()
+        lock.release()
 
 
 async def start_bot_worker() -> None:
@@ -25,17 +99,43 @@ async def start_bot_worker() -> None:
 
     Pulls events from :data:`event_queue`, evaluates them against all
     enabled :class:`~server.models.BotRule` records, and dispatches
-    matching actions via :class:`ActionExecutor`.
+    matching actions to an :class:`ActionDispatcher` that runs them
+    concurrently on the shared :data:`~server.bot.actions.executor`.
+    ``schedule`` rules are fired by a companion scheduler task.  Trigger
+    statistics are flushed periodically and once more when the worker is
+    cancelled.
     """
+    global dispatcher, engine
     engine = RuleEngine()
-    executor = ActionExecutor()
+    dispatcher = ActionDispatcher(actions.executor)
+    flusher = asyncio.create_task(run_stats_flusher(engine.stats))
+    scheduler = asyncio.create_task(run_scheduler(engine, dispatcher))
     logger.info("Bot worker started")
 
-    while True:
+    try:
+        while True:
+            event = await event_queue.get()
+            try:
+                await engine.evaluate(event, dispatcher)
+            except Exception:
+                logger.exception("Bot worker error")
+    finally:
+        scheduler.cancel()
+        flusher.cancel()
+        await asyncio.gather(scheduler, flusher, return_exceptions=True)
+        await dispatcher.close()
+        dispatcher = None
         try:
-            event = await asyncio.wait_for(event_queue.get(), timeout=1.0)
-            await engine.evaluate(event, executor)
-        except asyncio.TimeoutError:
-            pass  # Normal — no events in the last second
+            engine.stats.flush()
         except Exception:
-            logger.exception("Bot worker error")
+            logger.exception("Failed to flush bot trigger stats on shutdown")
+        engine = None
+
+
+def stats() -> dict:
+    """Return bot worker counters for the metrics endpoint."""
+    return {
+        "queue": event_queue.stats(),
+        "actions": dispatcher.stats() if dispatcher is not None else None,
+        "webhooks": actions.executor.stats(),
+    }
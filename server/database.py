@@ -7,8 +7,11 @@ import os
 from contextlib import contextmanager
 from typing import Generator
 
+from sqlalchemy import inspect
 from sqlmodel import Session, SQLModel, create_engine
 
+from .search import backfill_index
+
 DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./meshcore_monitor.db")
 
 engine = create_engine(
@@ -19,8 +22,17 @@ engine = create_engine(
 
 
 def create_db() -> None:
-    """Create all tables defined in :mod:`server.models`."""
+    """Create all tables defined in :mod:`server.models`.
+
+    When this creates the full-text index on a database that already
+    holds packets, those packets are indexed too.
+    """
+    had_index = inspect(engine).has_table("packet_fts")
     SQLModel.metadata.create_all(engine)
+    if not had_index:
+        with Session(engine) as session:
+            backfill_index(session)
+            session.commit()
 
 
 @contextmanager
@@ -18,10 +18,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
+from . import pubsub
+from .bot import actions
 from .bot.built_in_rules.seed import seed_builtin_rules
-from .bot.worker import start_bot_worker
+from .bot.worker import run_bot_leader
 from .database import create_db
-from .routers import bot_rules, ingest, nodes, packets, telemetry, ws
+from .routers import bot_rules, ingest, metrics, nodes, packets, telemetry, ws
 
 logger = logging.getLogger(__name__)
 
@@ -31,19 +33,25 @@ logger = logging.getLogger(__name__)
 # ---------------------------------------------------------------------------
 @asynccontextmanager
 async def lifespan(_app: FastAPI) -> AsyncGenerator[None, None]:
-    """Initialise database, seed rules, and launch the bot worker."""
+    """Initialise database, seed rules, connect pub/sub and launch the bot."""
     create_db()
     seed_builtin_rules()
+    await pubsub.backend.start()
+    await actions.executor.start()
     bot_enabled = os.getenv("BOT_ENABLED", "true").lower() in ("1", "true", "yes")
     bot_task = None
     if bot_enabled:
-        bot_task = asyncio.create_task(start_bot_worker())
+        bot_task = asyncio.create_task(run_bot_leader())
         logger.info("Bot worker task created")
     else:
         logger.info("Bot worker disabled via BOT_ENABLED")
     yield
     if bot_task:
         bot_task.cancel()
+        # Let the worker flush trigger stats and drain before the client closes.
+        await asyncio.gather(bot_task, return_exceptions=True)
+    await actions.executor.stop()
+    await pubsub.backend.stop()
 
 
 app = FastAPI(
@@ -72,6 +80,7 @@ app.include_router(nodes.router, prefix="/api")
 app.include_router(packets.router, prefix="/api")
 app.include_router(telemetry.router, prefix="/api")
 app.include_router(bot_rules.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
 app.include_router(ws.router)
 
 # ---------------------------------------------------------------------------
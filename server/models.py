@@ -11,6 +11,7 @@ varied data pyMC_Repeater may return at different times.
 from datetime import UTC, datetime
 from typing import Optional
 
+from sqlalchemy import DDL, event
 from sqlmodel import Field, SQLModel
 
 
@@ -138,8 +139,11 @@ class BotRule(SQLModel, table=True):
     Attributes:
         name: Human-readable rule name.
         enabled: Whether the rule is active.
-        trigger_type: One of ``"packet_type"``, ``"keyword"``, ``"node_seen"``,
-            ``"schedule"``.
+        trigger_type: One of ``"packet_type"``, ``"keyword"``, ``"word"``
+            (keyword on word boundaries), ``"regex"``, ``"node_seen"``,
+            ``"schedule"`` (cron or ``every <interval>``, see
+            :mod:`server.bot.schedule`), ``"condition"`` (expression over
+            packet fields, see :mod:`server.bot.conditions`).
         trigger_value: Value to match against (e.g. ``"ADVERT"``, ``"ping"``).
         action_type: One of ``"send_message"``, ``"log"``, ``"webhook"``,
             ``"telemetry_request"``.
@@ -157,3 +161,34 @@ class BotRule(SQLModel, table=True):
     action_config: str = "{}"
     last_triggered: Optional[datetime] = None
     trigger_count: int = 0
+
+
+# ------------------------------------------------------------------
+# Full-text index (SQLite FTS5)
+# ------------------------------------------------------------------
+# ``packet_fts`` holds the cleartext of decodable payloads, keyed by
+# ``rowid = packet.id``.  Rows are written at ingest (see
+# :mod:`server.search`); the trigger below removes them whenever a packet
+# is deleted, so any pruning of the ``packet`` table keeps the index in
+# sync without extra bookkeeping.  Other dialects skip these statements.
+event.listen(
+    SQLModel.metadata,
+    "after_create",
+    DDL(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS packet_fts "
+        "USING fts5(body, tokenize='unicode61')"
+    ).execute_if(dialect="sqlite"),
+)
+event.listen(
+    SQLModel.metadata,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER IF NOT EXISTS packet_fts_delete AFTER DELETE ON packet "
+        "BEGIN DELETE FROM packet_fts WHERE rowid = old.id; END"
+    ).execute_if(dialect="sqlite"),
+)
+event.listen(
+    SQLModel.metadata,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS packet_fts").execute_if(dialect="sqlite"),
+)
@@ -0,0 +1,251 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Pluggable publish/subscribe backends for cross-process event fan-out.
+
+WebSocket broadcasts and bot events are published on named channels and
+delivered to every subscribed handler.  The backend is chosen with
+``BROADCAST_URL``:
+
+* ``memory://`` (default) — in-process delivery; correct for a single
+  worker.
+* ``redis://host:port/db`` or ``unix:///path/to/redis.sock`` — any
+  Redis-compatible server, so several ``uvicorn --workers`` processes see
+  each other's events.  Requires the optional ``redis`` package.
+
+Backends also hand out the global event sequence numbers used for
+WebSocket replay, so numbering stays consistent across workers.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_URL: str = os.getenv("BROADCAST_URL", "memory://")
+
+WS_CHANNEL = "ws"
+"""Channel carrying WebSocket broadcast events."""
+
+BOT_CHANNEL = "bot"
+"""Channel carrying events for the bot worker."""
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+class BroadcastBackend:
+    """Base class holding local channel subscriptions.
+
+    Subclasses implement :meth:`publish` and :meth:`next_seq` and call
+    :meth:`_dispatch` for every message that arrives on a channel.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: defaultdict[str, list[Handler]] = defaultdict(list)
+
+    def subscribe(self, channel: str, handler: Handler) -> Callable[[], None]:
+        """Register *handler* for messages published on *channel*.
+
+        Args:
+            channel: Channel name.
+            handler: Coroutine function called with each message dict.
+
+        Returns:
+            A callable that removes the subscription.
+        """
+        self._handlers[channel].append(handler)
+
+        def unsubscribe() -> None:
+            if handler in self._handlers[channel]:
+                self._handlers[channel].remove(handler)
+
+        return unsubscribe
+
+    async def start(self) -> None:
+        """Open connections; called from the application lifespan."""
+
+    async def stop(self) -> None:
+        """Close connections; called from the application lifespan."""
+
+    async def publish(self, channel: str, message: dict) -> None:
+        """Deliver *message* to subscribers of *channel* in every process.
+
+        Args:
+            channel: Channel name.
+            message: JSON-serializable payload.
+        """
+        raise NotImplementedError
+
+    async def next_seq(self, count: int = 1) -> int:
+        """Reserve *count* consecutive sequence numbers.
+
+        Args:
+            count: Number of sequence numbers needed.
+
+        Returns:
+            The last number of the reserved block.
+        """
+        raise NotImplementedError
+
+    async def _dispatch(self, channel: str, message: dict) -> None:
+        """Invoke every local handler of *channel*, isolating failures."""
+        for handler in list(self._handlers.get(channel, ())):
+            try:
+                await handler(message)
+            except Exception:
+                logger.exception("Handler for channel '%s' failed", channel)
+
+
+class MemoryBackend(BroadcastBackend):
+    """Delivers messages to handlers in the current process only.
+
+    Sequence numbers are seeded from the wall clock in milliseconds so
+    they keep increasing across restarts.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._seq = int(time.time() * 1000)
+
+    async def publish(self, channel: str, message: dict) -> None:
+        """Deliver *message* to local subscribers of *channel*."""
+        await self._dispatch(channel, message)
+
+    async def next_seq(self, count: int = 1) -> int:
+        """Reserve *count* sequence numbers from the local counter."""
+        self._seq += count
+        return self._seq
+
+
+class RedisBackend(BroadcastBackend):
+    """Fans messages out through Redis pub/sub to every worker process.
+
+    Attributes:
+        url: Redis connection URL (``redis://``, ``rediss://`` or ``unix://``).
+        prefix: Key and channel namespace.
+        retry_min: First delay (seconds) before resubscribing after an error.
+        retry_max: Longest delay between resubscription attempts.
+    """
+
+    retry_min: float = 0.5
+    retry_max: float = 30.0
+
+    def __init__(self, url: str, prefix: str = "meshcore") -> None:
+        super().__init__()
+        try:
+            import redis.asyncio as aioredis  # noqa: WPS433
+        except ImportError as exc:
+            raise RuntimeError(
+                f"BROADCAST_URL={url} requires the 'redis' package"
+            ) from exc
+        self.url = url
+        self.prefix = prefix
+        self._redis: Any = aioredis.from_url(url)
+        self._pubsub: Any = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Seed the sequence counter and start the subscription reader."""
+        await self._redis.set(
+            f"{self.prefix}:seq", int(time.time() * 1000), nx=True
+        )
+        await self._subscribe()
+        self._reader = asyncio.create_task(self._read())
+        logger.info("Redis broadcast backend connected to %s", self.url)
+
+    async def stop(self) -> None:
+        """Stop the reader and close the connection."""
+        if self._reader:
+            self._reader.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        await self._redis.aclose()
+
+    async def publish(self, channel: str, message: dict) -> None:
+        """Publish *message* on *channel* for all workers, including this one."""
+        await self._redis.publish(f"{self.prefix}:chan:{channel}", json.dumps(message))
+
+    async def next_seq(self, count: int = 1) -> int:
+        """Reserve *count* sequence numbers with an atomic ``INCRBY``."""
+        return int(await self._redis.incrby(f"{self.prefix}:seq", count))
+
+    async def _subscribe(self) -> None:
+        """Open a pub/sub connection subscribed to every channel."""
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.psubscribe(f"{self.prefix}:chan:*")
+
+    async def _read(self) -> None:
+        """Dispatch incoming pub/sub messages to local handlers.
+
+        If the subscription fails, it is reopened with exponential backoff
+        (``retry_min`` to ``retry_max`` seconds).  Messages published
+        while it is down are lost, as Redis pub/sub does not buffer them.
+        """
+        channel_prefix = f"{self.prefix}:chan:"
+        delay = 0.0
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    logger.info("Redis subscription restored")
+                async for raw in self._pubsub.listen():
+                    delay = 0.0
+                    if raw.get("type") != "pmessage":
+                        continue
+                    channel = raw["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    try:
+                        message = json.loads(raw["data"])
+                    except ValueError:
+                        logger.warning("Dropping malformed message on %s", channel)
+                        continue
+                    await self._dispatch(channel.removeprefix(channel_prefix), message)
+                raise ConnectionError("subscription closed")
+            except Exception as exc:
+                delay = min(self.retry_max, max(self.retry_min, delay * 2))
+                logger.warning(
+                    "Redis subscription lost (%s); resubscribing in %.1fs", exc, delay
+                )
+                await self._close_pubsub()
+                await asyncio.sleep(delay)
+
+    async def _close_pubsub(self) -> None:
+        """Discard the current pub/sub connection, ignoring errors."""
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is not None:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+
+def create_backend(url: str = BROADCAST_URL) -> BroadcastBackend:
+    """Build the backend selected by *url*.
+
+    Args:
+        url: ``memory://`` or a Redis-compatible URL.
+
+    Returns:
+        An unstarted :class:`BroadcastBackend`.
+
+    Raises:
+        ValueError: If the URL scheme is not supported.
+    """
+    scheme = url.split("://", 1)[0]
+    if scheme == "memory":
+        return MemoryBackend()
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported BROADCAST_URL scheme '{scheme}'")
+
+
+backend: BroadcastBackend = create_backend()
+"""Process-wide backend shared by the WebSocket manager and bot worker."""
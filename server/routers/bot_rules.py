@@ -1,36 +1,169 @@
 # Copyright © 2025-26 l5yth & contributors
 # Licensed under BSD 3-Clause License
 
-"""CRUD endpoints for bot automation rules."""
+"""CRUD endpoints for bot automation rules.
 
-from fastapi import APIRouter, Depends, HTTPException
+Every write announces itself with
+:func:`~server.bot.rules.notify_rules_changed` so the bot worker recompiles
+its rule index; write handlers stay synchronous so their database work
+runs in the threadpool, and hand the announcement back to the event loop.
+Reads add the trigger tallies the bot has not flushed yet (see
+:mod:`server.bot.stats`).  Saved and draft rules can be backtested against
+stored packets (see :mod:`server.bot.backtest`).
+"""
+
+import json
+import re
+from datetime import UTC, datetime, timedelta
+from typing import Optional
+
+import anyio.from_thread
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
 
+from ..bot.backtest import backtest
+from ..bot.conditions import compile_condition
+from ..bot.dispatch import parse_retry_policy
+from ..bot.index import compile_pattern
+from ..bot.limits import parse_policy
+from ..bot.rules import notify_rules_changed
+from ..bot.schedule import parse_schedule
+from ..bot.stats import trigger_stats
 from ..database import get_session_dep
 from ..models import BotRule
-from ..schemas import BotRuleCreate, BotRuleResponse
+from ..schemas import (
+    BacktestHour,
+    BacktestResponse,
+    BotRuleCreate,
+    BotRuleResponse,
+    PacketResponse,
+)
 
 router = APIRouter(tags=["bot"])
 
+BACKTEST_DEFAULT_WINDOW = timedelta(days=7)
+"""Window replayed by a backtest when no ``since`` is given."""
+
+
+def _with_pending(rule: BotRule) -> BotRuleResponse:
+    """Build the response for *rule* including unflushed trigger stats."""
+    return trigger_stats.apply(BotRuleResponse.model_validate(rule))
+
+
+def _validate_action(body: BotRuleCreate) -> None:
+    """Reject action configs whose limits or retry policy are malformed.
+
+    Raises:
+        HTTPException: 422 if ``action_config`` is not a JSON object or
+            one of its limit, timeout or retry keys is invalid.
+    """
+    try:
+        config = json.loads(body.action_config)
+        if not isinstance(config, dict):
+            raise ValueError("action_config must be a JSON object")
+        parse_policy(config)
+        parse_retry_policy(config)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(
+            status_code=422, detail=f"Invalid action_config: {exc}"
+        ) from exc
+
+
+def _validate_trigger(body: BotRuleCreate) -> None:
+    """Reject trigger values the rule engine could not compile.
+
+    Raises:
+        HTTPException: 422 if a ``regex`` trigger is not a valid pattern,
+            a ``schedule`` trigger is not a valid interval or cron
+            expression, or a ``condition`` trigger does not compile.
+    """
+    if body.trigger_type == "schedule":
+        try:
+            parse_schedule(body.trigger_value)
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=422, detail=f"Invalid schedule trigger: {exc}"
+            ) from exc
+    if body.trigger_type == "regex":
+        try:
+            compile_pattern(body.trigger_value)
+        except re.error as exc:
+            raise HTTPException(
+                status_code=422, detail=f"Invalid regex trigger: {exc}"
+            ) from exc
+    if body.trigger_type == "condition":
+        try:
+            compile_condition(body.trigger_value)
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=422, detail=f"Invalid condition trigger: {exc}"
+            ) from exc
+
+
+def _backtest(
+    rule: BotRule,
+    since: Optional[datetime],
+    until: Optional[datetime],
+    cursor: int,
+    samples: int,
+) -> BacktestResponse:
+    """Run :func:`~server.bot.backtest.backtest` and shape its response.
+
+    Naive bounds are taken as UTC; ``until`` defaults to now and
+    ``since`` to :data:`BACKTEST_DEFAULT_WINDOW` before ``until``.
+
+    Raises:
+        HTTPException: 422 if *rule* cannot match packets.
+    """
+    if until is None:
+        until = datetime.now(UTC)
+    elif until.tzinfo is None:
+        until = until.replace(tzinfo=UTC)
+    if since is None:
+        since = until - BACKTEST_DEFAULT_WINDOW
+    elif since.tzinfo is None:
+        since = since.replace(tzinfo=UTC)
+    try:
+        result = backtest(rule, since, until, cursor=cursor, samples=samples)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    return BacktestResponse(
+        since=since,
+        until=until,
+        scanned=result.scanned,
+        matched=result.matched,
+        would_fire=result.would_fire,
+        hours=[
+            BacktestHour(hour=hour, matches=count)
+            for hour, count in sorted(result.hours.items())
+        ],
+        samples=[PacketResponse.model_validate(row) for row in result.samples],
+        pushdown=result.pushdown,
+        complete=result.cursor is None,
+        cursor=result.cursor,
+    )
+
 
 @router.get("/bot/rules", response_model=list[BotRuleResponse])
-def list_rules(session: Session = Depends(get_session_dep)) -> list[BotRule]:
+def list_rules(
+    session: Session = Depends(get_session_dep),
+) -> list[BotRuleResponse]:
     """Return all bot rules.
 
     Args:
         session: Injected database session.
 
     Returns:
-        List of :class:`BotRule` records.
+        Every rule, with pending trigger counts merged in.
     """
-    return list(session.exec(select(BotRule)).all())
+    return [_with_pending(rule) for rule in session.exec(select(BotRule)).all()]
 
 
 @router.get("/bot/rules/{rule_id}", response_model=BotRuleResponse)
 def get_rule(
     rule_id: int,
     session: Session = Depends(get_session_dep),
-) -> BotRule:
+) -> BotRuleResponse:
     """Return a single bot rule by ID.
 
     Args:
@@ -38,7 +171,7 @@ def get_rule(
         session: Injected database session.
 
     Returns:
-        The matching :class:`BotRule`.
+        The matching rule, with pending trigger counts merged in.
 
     Raises:
         HTTPException: 404 if the rule is not found.
@@ -46,14 +179,14 @@ def get_rule(
     rule = session.get(BotRule, rule_id)
     if not rule:
         raise HTTPException(status_code=404, detail="Rule not found")
-    return rule
+    return _with_pending(rule)
 
 
 @router.post("/bot/rules", response_model=BotRuleResponse)
 def create_rule(
     body: BotRuleCreate,
     session: Session = Depends(get_session_dep),
-) -> BotRule:
+) -> BotRuleResponse:
     """Create a new bot rule.
 
     Args:
@@ -62,12 +195,82 @@ def create_rule(
 
     Returns:
         The newly created :class:`BotRule`.
+
+    Raises:
+        HTTPException: 422 if the trigger value or action config is
+            invalid.
     """
+    _validate_trigger(body)
+    _validate_action(body)
     rule = BotRule(**body.model_dump())
     session.add(rule)
     session.commit()
     session.refresh(rule)
-    return rule
+    anyio.from_thread.run(notify_rules_changed)
+    return _with_pending(rule)
+
+
+@router.post("/bot/rules/backtest", response_model=BacktestResponse)
+def backtest_draft_rule(
+    body: BotRuleCreate,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: int = Query(default=0, ge=0),
+    samples: int = Query(default=10, ge=0, le=100),
+) -> BacktestResponse:
+    """Backtest a rule that has not been saved.
+
+    Args:
+        body: The draft rule.
+        since: Inclusive lower bound on ``received_at`` (default: 7 days
+            before ``until``).
+        until: Exclusive upper bound on ``received_at`` (default: now).
+        cursor: Resume an incomplete backtest after this packet ``id``.
+        samples: Maximum number of matched packets to return.
+
+    Returns:
+        Match counts per hour and sample matches.
+
+    Raises:
+        HTTPException: 422 if the trigger is invalid or cannot match
+            packets.
+    """
+    _validate_trigger(body)
+    rule = BotRule(**body.model_dump())
+    return _backtest(rule, since, until, cursor, samples)
+
+
+@router.get("/bot/rules/{rule_id}/backtest", response_model=BacktestResponse)
+def backtest_rule(
+    rule_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: int = Query(default=0, ge=0),
+    samples: int = Query(default=10, ge=0, le=100),
+    session: Session = Depends(get_session_dep),
+) -> BacktestResponse:
+    """Replay stored packets through a saved rule, enabled or not.
+
+    Args:
+        rule_id: Primary key of the rule.
+        since: Inclusive lower bound on ``received_at`` (default: 7 days
+            before ``until``).
+        until: Exclusive upper bound on ``received_at`` (default: now).
+        cursor: Resume an incomplete backtest after this packet ``id``.
+        samples: Maximum number of matched packets to return.
+        session: Injected database session.
+
+    Returns:
+        Match counts per hour and sample matches.
+
+    Raises:
+        HTTPException: 404 if the rule is not found, 422 if it cannot
+            match packets.
+    """
+    rule = session.get(BotRule, rule_id)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    return _backtest(rule, since, until, cursor, samples)
 
 
 @router.put("/bot/rules/{rule_id}", response_model=BotRuleResponse)
@@ -75,7 +278,7 @@ def update_rule(
     rule_id: int,
     body: BotRuleCreate,
     session: Session = Depends(get_session_dep),
-) -> BotRule:
+) -> BotRuleResponse:
     """Update an existing bot rule.
 
     Args:
@@ -87,17 +290,21 @@ def update_rule(
         The updated :class:`BotRule`.
 
     Raises:
-        HTTPException: 404 if the rule is not found.
+        HTTPException: 404 if the rule is not found, 422 if the trigger
+            value or action config is invalid.
     """
     rule = session.get(BotRule, rule_id)
     if not rule:
         raise HTTPException(status_code=404, detail="Rule not found")
+    _validate_trigger(body)
+    _validate_action(body)
     for key, val in body.model_dump().items():
         setattr(rule, key, val)
     session.add(rule)
     session.commit()
     session.refresh(rule)
-    return rule
+    anyio.from_thread.run(notify_rules_changed)
+    return _with_pending(rule)
 
 
 @router.delete("/bot/rules/{rule_id}")
@@ -122,4 +329,5 @@ def delete_rule(
         raise HTTPException(status_code=404, detail="Rule not found")
     session.delete(rule)
     session.commit()
+    anyio.from_thread.run(notify_rules_changed)
     return {"ok": True}
@@ -13,10 +13,13 @@ from typing import TYPE_CHECKING
 from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlmodel import Session, select
 
+from .. import pubsub
 from ..database import get_session_dep
 from ..models import Neighbor, Node, Packet
+from ..pubsub import BOT_CHANNEL
 from ..routers.ws import manager
-from ..schemas import IngestResult, NeighborIngest, PacketIngest
+from ..schemas import IngestResult, NeighborDelta, NeighborIngest, PacketIngest
+from ..search import index_packets
 
 if TYPE_CHECKING:
     pass
@@ -73,7 +76,8 @@ async def ingest_packets(
     """Receive a batch of packets from the ingestor and persist them.
 
     Duplicate packets (same ``packet_hash``) are silently skipped.
-    New source nodes are auto-created via upsert.
+    New source nodes are auto-created via upsert, and printable payloads
+    are added to the full-text index.
 
     Args:
         packets: List of packet payloads from the ingestor.
@@ -82,9 +86,6 @@ async def ingest_packets(
     Returns:
         :class:`IngestResult` with the count of newly saved packets.
     """
-    # Import here to avoid circular import at module level
-    from ..bot.worker import event_queue  # noqa: WPS433
-
     saved: list[Packet] = []
     for pkt_in in packets:
         pkt_data = pkt_in.model_dump(exclude_none=True)
@@ -106,17 +107,31 @@ async def ingest_packets(
 
         saved.append(packet)
 
-    session.commit()
-
-    # Broadcast each new packet over WebSocket and push to bot queue
+    session.flush()
+    index_packets(session, saved)
+    # Serialize before commit — committing expires the instances' attributes.
+    packet_dicts: list[dict] = []
     for packet in saved:
         packet_dict = packet.model_dump()
         # Convert datetime objects for JSON serialization
         for key, val in packet_dict.items():
             if isinstance(val, datetime):
                 packet_dict[key] = val.isoformat()
-        await manager.broadcast("packet", packet_dict)
-        await event_queue.put({"type": "packet", "data": packet_dict})
+        packet_dicts.append(packet_dict)
+    session.commit()
+
+    # Broadcast the batch over WebSocket and hand each packet to the bot.
+    # The batch is already committed: a publish failure must not make the
+    # ingestor re-send packets that would then be skipped as duplicates.
+    try:
+        await manager.broadcast_many("packet", packet_dicts)
+        if packet_dicts:
+            await pubsub.backend.publish(
+                BOT_CHANNEL,
+                {"events": [{"type": "packet", "data": d} for d in packet_dicts]},
+            )
+    except Exception:
+        logger.exception("Could not publish %d ingested packets", len(packet_dicts))
 
     logger.info("Ingested %d new packets", len(saved))
     return IngestResult(saved=len(saved))
@@ -156,3 +171,73 @@ async def ingest_neighbors(
     session.commit()
     await manager.broadcast("neighbors_updated", {})
     return {"ok": True}
+
+
+@router.post("/neighbors/delta", dependencies=[Depends(verify_api_key)])
+async def ingest_neighbor_deltas(
+    deltas: list[NeighborDelta],
+    session: Session = Depends(get_session_dep),
+) -> dict:
+    """Apply neighbor table deltas from the ingestor, in order.
+
+    Unlike ``POST /ingest/neighbors``, which appends an observation per
+    neighbor per poll, deltas keep one current row per edge: an upsert
+    updates that row (bumping ``observation_count``) or creates it, and
+    a removal deletes it.  A ``full`` delta also removes every edge of
+    its node that it does not list.  Only upserted neighbors touch their
+    :class:`Node`.
+
+    Args:
+        deltas: Delta payloads from the ingestor.
+        session: Injected database session.
+
+    Returns:
+        ``{"ok": True}`` with the number of ``upserted`` and ``removed``
+        edges.
+    """
+    upserted = removed = 0
+    now = datetime.now(UTC)
+    for delta in deltas:
+        edges: dict[str, list[Neighbor]] = {}
+        for row in session.exec(
+            select(Neighbor)
+            .where(Neighbor.node_hash == delta.node_hash)
+            .order_by(Neighbor.id.desc())
+        ):
+            edges.setdefault(row.neighbor_hash, []).append(row)
+
+        listed: set[str] = set()
+        for nbr_in in delta.upserts:
+            nbr_data = nbr_in.model_dump(exclude_none=True)
+            neighbor_hash = nbr_data.get("neighbor_hash") or nbr_data.get("hash")
+            if not neighbor_hash:
+                continue
+            listed.add(neighbor_hash)
+            rows = edges.pop(neighbor_hash, [])
+            if rows:
+                # Keep the newest row; older ones predate delta uploads.
+                neighbor = rows[0]
+                for stale in rows[1:]:
+                    session.delete(stale)
+                neighbor.observation_count += 1
+                neighbor.observed_at = now
+            else:
+                neighbor = Neighbor(
+                    node_hash=delta.node_hash, neighbor_hash=neighbor_hash
+                )
+            neighbor.rssi = nbr_data.get("rssi")
+            neighbor.snr = nbr_data.get("snr")
+            session.add(neighbor)
+            _upsert_node(session, neighbor_hash, nbr_data)
+            upserted += 1
+
+        gone = set(edges) if delta.full else set(delta.removed) - listed
+        for neighbor_hash in gone & edges.keys():
+            for row in edges[neighbor_hash]:
+                session.delete(row)
+            removed += 1
+
+    session.commit()
+    if upserted or removed:
+        await manager.broadcast("neighbors_updated", {})
+    return {"ok": True, "upserted": upserted, "removed": removed}
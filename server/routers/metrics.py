@@ -0,0 +1,21 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Runtime metrics for the in-process broadcast and bot components."""
+
+from fastapi import APIRouter
+
+from ..bot import worker
+from .ws import manager
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+def get_metrics() -> dict:
+    """Return counters from the running server process.
+
+    Returns:
+        Dict keyed by component name.
+    """
+    return {"ws": manager.stats(), "bot": worker.stats()}
@@ -3,16 +3,131 @@
 
 """REST endpoints for querying received packets."""
 
-from typing import Optional
+import csv
+import io
+import json
+from datetime import UTC, datetime
+from typing import Any, Generator, Iterator, Literal, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 
-from ..database import get_session_dep
+from ..database import get_session, get_session_dep
 from ..models import Packet
+from ..schemas import PacketResponse, PacketSearchHit
+from ..search import SearchUnavailable, search_packets
 
 router = APIRouter(tags=["packets"])
 
+EXPORT_CHUNK_SIZE: int = 1000
+"""Rows fetched per keyset page while streaming an export."""
+
+EXPORT_COLUMNS: list[str] = list(Packet.__table__.columns.keys())
+"""Column order used for CSV headers and NDJSON records."""
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Treat naive query datetimes as UTC so they compare against stored values.
+
+    Args:
+        value: Parsed query parameter, possibly naive.
+
+    Returns:
+        A timezone-aware datetime, or ``None``.
+    """
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
+def iter_packet_chunks(
+    cursor: int = 0,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    packet_type: Optional[str] = None,
+    source_hash: Optional[str] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+    has_payload: bool = False,
+) -> Generator[list[dict[str, Any]], None, None]:
+    """Yield packet rows in ascending ``id`` order, one page at a time.
+
+    Pages are fetched with keyset pagination (``id > last_id``) using a
+    short-lived session per page, so memory and lock time stay constant
+    regardless of how many rows match.  Rows are plain dicts built from
+    column tuples — no ORM objects are materialised.
+
+    Args:
+        cursor: Only rows with ``id`` greater than this are returned.
+        since: Inclusive lower bound on ``received_at``.
+        until: Exclusive upper bound on ``received_at``.
+        packet_type: Filter by packet type.
+        source_hash: Filter by originating node hash.
+        chunk_size: Maximum rows per yielded page.
+        has_payload: Only return rows with a non-empty payload.
+
+    Yields:
+        Lists of row dicts keyed by :data:`EXPORT_COLUMNS`.
+    """
+    since, until = _as_utc(since), _as_utc(until)
+    columns = [Packet.__table__.c[name] for name in EXPORT_COLUMNS]
+    last_id = cursor
+    while True:
+        query = (
+            select(*columns)
+            .where(Packet.id > last_id)
+            .order_by(Packet.id)
+            .limit(chunk_size)
+        )
+        if since:
+            query = query.where(Packet.received_at >= since)
+        if until:
+            query = query.where(Packet.received_at < until)
+        if packet_type:
+            query = query.where(Packet.packet_type == packet_type)
+        if source_hash:
+            query = query.where(Packet.source_hash == source_hash)
+        if has_payload:
+            query = query.where(
+                Packet.payload_hex.is_not(None), Packet.payload_hex != ""
+            )
+        with get_session() as session:
+            rows = [dict(row._mapping) for row in session.exec(query)]
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def _jsonable(value: Any) -> Any:
+    """Convert datetimes to ISO-8601 strings for serialization."""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _encode_ndjson(chunks: Iterator[list[dict[str, Any]]]) -> Iterator[str]:
+    """Render row pages as newline-delimited JSON, one string per page."""
+    for rows in chunks:
+        yield "".join(
+            json.dumps({k: _jsonable(v) for k, v in row.items()}) + "\n"
+            for row in rows
+        )
+
+
+def _encode_csv(chunks: Iterator[list[dict[str, Any]]]) -> Iterator[str]:
+    """Render row pages as CSV, emitting the header before the first page."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for rows in chunks:
+        writer.writerows({k: _jsonable(v) for k, v in row.items()} for row in rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
 
 @router.get("/packets")
 def get_packets(
@@ -38,3 +153,87 @@ def get_packets(
     if source_hash:
         query = query.where(Packet.source_hash == source_hash)
     return list(session.exec(query).all())
+
+
+@router.get("/packets/search", response_model=list[PacketSearchHit])
+def search(
+    q: str = Query(min_length=1),
+    limit: int = Query(default=50, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    session: Session = Depends(get_session_dep),
+) -> list[PacketSearchHit]:
+    """Full-text search over decoded cleartext payloads.
+
+    Args:
+        q: Whitespace-separated terms; all must match.  A trailing ``*``
+            makes a term a prefix match.
+        limit: Maximum number of hits to return (default 50).
+        offset: Number of hits to skip, for pagination.
+        session: Injected database session.
+
+    Returns:
+        Matching packets with a highlighted snippet, best match first.
+
+    Raises:
+        HTTPException: 501 if the database has no full-text index.
+    """
+    try:
+        hits = search_packets(session, q, limit=limit, offset=offset)
+    except SearchUnavailable as exc:
+        raise HTTPException(status_code=501, detail=str(exc)) from exc
+    return [
+        PacketSearchHit(
+            **PacketResponse.model_validate(pkt).model_dump(),
+            snippet=snippet,
+            rank=rank,
+        )
+        for pkt, snippet, rank in hits
+    ]
+
+
+@router.get("/packets/export")
+def export_packets(
+    fmt: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    packet_type: Optional[str] = None,
+    source_hash: Optional[str] = None,
+    cursor: int = Query(default=0, ge=0),
+    chunk_size: int = Query(default=EXPORT_CHUNK_SIZE, ge=1, le=10_000),
+) -> StreamingResponse:
+    """Stream matching packets as NDJSON or CSV in ascending ``id`` order.
+
+    Rows are read in fixed-size keyset pages and written to the response
+    as they are fetched, so memory use does not grow with the export size.
+    Every row carries its ``id``; to resume an interrupted export, pass the
+    last ``id`` received as ``cursor``.
+
+    Args:
+        fmt: ``"ndjson"`` (default) or ``"csv"``, passed as ``?format=``.
+        since: Inclusive lower bound on ``received_at`` (naive = UTC).
+        until: Exclusive upper bound on ``received_at`` (naive = UTC).
+        packet_type: Filter by packet type (e.g. ``"ADVERT"``).
+        source_hash: Filter by originating node hash.
+        cursor: Resume after this packet ``id`` (default 0 = from start).
+        chunk_size: Rows fetched per database round-trip.
+
+    Returns:
+        A :class:`StreamingResponse` with the encoded rows.
+    """
+    chunks = iter_packet_chunks(
+        cursor=cursor,
+        since=since,
+        until=until,
+        packet_type=packet_type,
+        source_hash=source_hash,
+        chunk_size=chunk_size,
+    )
+    if fmt == "csv":
+        body, media_type = _encode_csv(chunks), "text/csv"
+    else:
+        body, media_type = _encode_ndjson(chunks), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="packets.{fmt}"'},
+    )
@@ -1,82 +1,831 @@
 # Copyright © 2025-26 l5yth & contributors
 # Licensed under BSD 3-Clause License
 
-"""WebSocket broadcast endpoint for live event streaming."""
+"""WebSocket broadcast endpoint for live event streaming.
 
+Every connection gets its own bounded outbound queue drained by a
+dedicated sender task, so :meth:`ConnectionManager.broadcast` never waits
+on a client.  When a client's queue is full the configured overflow
+policy applies: ``drop_oldest`` discards the oldest queued frame, while
+``disconnect`` closes the slow consumer.
+
+Protocol versions are selected with the ``v`` query parameter:
+
+* ``/ws`` (v1) — one ``{"type": "packet", "data": {...}}`` frame per event.
+* ``/ws?v=2`` — consecutive packet events are coalesced into a single
+  ``{"type": "packets", "data": [...]}`` frame.  Events are grouped per
+  ingest batch, or across a time window when ``WS_COALESCE_MS`` is set.
+
+Clients may narrow what they receive by sending a subscription message::
+
+    {"type": "subscribe", "events": ["packet"],
+     "packet_types": ["ADVERT"], "source_hashes": ["FA"]}
+
+Omitted or empty lists match everything; ``{"type": "unsubscribe"}``
+restores the default of receiving every event.  Packet filters only
+apply to ``packet`` events.
+
+Every event carries a ``seq`` number (array frames carry the ``seq`` of
+their last item) and recent events are kept in a bounded ring buffer.  A
+reconnecting client sends ``{"type": "resume", "last_seq": N,
+"last_packet_id": M}`` after subscribing; the gap is replayed from memory
+when it is still buffered, otherwise packets with ``id > M`` are reloaded
+from the database.  Either way a ``replay_complete`` frame follows.  Live
+delivery starts at connect, so replay stops short of the first event sent
+live and may arrive after newer live frames; database replays carry the
+``seq`` just before the first live event.
+
+Each distinct frame is serialized once and shared by every client that
+receives it.
+
+Binary encodings are negotiated with the WebSocket subprotocol header:
+``meshcore.msgpack`` (needs ``msgpack``) or ``meshcore.cbor`` (needs
+``cbor2``); ``meshcore.json`` or no subprotocol gives JSON text frames.
+Frames keep the same structure in every encoding, and control messages
+may be sent as text (JSON) or as binary frames in the negotiated codec.
+Per-message deflate
+is negotiated by the ASGI server (on by default in uvicorn, see
+``--ws-per-message-deflate``) and applies on top of any encoding.
+
+Events travel through the :mod:`server.pubsub` backend, which also assigns
+their sequence numbers, so with a shared backend every worker process
+delivers every event with the same ``seq``.
+"""
+
+import asyncio
+import itertools
 import json
 import logging
+import os
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Any, Callable, Iterable, NamedTuple, Optional, Union
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
+from .. import pubsub
+from ..pubsub import WS_CHANNEL, BroadcastBackend, MemoryBackend
+from .packets import iter_packet_chunks
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+WS_QUEUE_SIZE: int = int(os.getenv("WS_QUEUE_SIZE", "256"))
+WS_OVERFLOW_POLICY: str = os.getenv("WS_OVERFLOW_POLICY", "drop_oldest")
+WS_COALESCE_MS: int = int(os.getenv("WS_COALESCE_MS", "0"))
+WS_REPLAY_BUFFER: int = int(os.getenv("WS_REPLAY_BUFFER", "1000"))
+WS_REPLAY_DB_LIMIT: int = int(os.getenv("WS_REPLAY_DB_LIMIT", "1000"))
+
+OVERFLOW_POLICIES = ("drop_oldest", "disconnect")
+
+PROTOCOL_VERSIONS = (1, 2)
+
+COALESCED_TYPES: dict[str, str] = {"packet": "packets"}
+"""Event types merged into array frames for v2 clients, and the frame type."""
+
+PACKET_EVENT = "packet"
+"""Event type whose payload is subject to packet-level subscription filters."""
+
+Frame = Union[str, bytes]
+
+
+def _load_codecs() -> tuple[
+    dict[str, Callable[[Any], Frame]], dict[str, Callable[[Frame], Any]]
+]:
+    """Return the frame encoders and decoders available in this environment."""
+    codecs: dict[str, Callable[[Any], Frame]] = {"json": json.dumps}
+    decoders: dict[str, Callable[[Frame], Any]] = {"json": json.loads}
+    try:
+        import msgpack  # noqa: WPS433
+
+        codecs["msgpack"] = msgpack.packb
+        decoders["msgpack"] = msgpack.unpackb
+    except ImportError:
+        pass
+    try:
+        import cbor2  # noqa: WPS433
+
+        codecs["cbor"] = cbor2.dumps
+        decoders["cbor"] = cbor2.loads
+    except ImportError:
+        pass
+    return codecs, decoders
+
+
+CODECS, DECODERS = _load_codecs()
+"""Frame encoders and decoders by name; binary ones only if installed."""
+
+SUBPROTOCOLS: dict[str, str] = {
+    f"meshcore.{name}": name for name in ("json", "msgpack", "cbor")
+}
+"""WebSocket subprotocol names mapped to codec names."""
+
+
+def negotiate_encoding(offered: Iterable[str]) -> tuple[str, Optional[str]]:
+    """Pick the first offered subprotocol whose codec is available.
+
+    Args:
+        offered: Subprotocols listed by the client, in preference order.
+
+    Returns:
+        ``(codec, subprotocol)``; ``("json", None)`` if none match.
+    """
+    for subprotocol in offered:
+        codec = SUBPROTOCOLS.get(subprotocol)
+        if codec in CODECS:
+            return codec, subprotocol
+    return "json", None
+
+
+class BroadcastEvent(NamedTuple):
+    """A sequenced event awaiting delivery or held for replay."""
+
+    seq: int
+    type: str
+    data: dict
+
+
+class ClientConnection:
+    """A connected client with its own outbound queue and sender task.
+
+    Attributes:
+        id: Process-unique connection number, used in metrics.
+        ws: The underlying WebSocket.
+        protocol: Negotiated protocol version (1 or 2).
+        encoding: Frame codec name (``"json"``, ``"msgpack"`` or ``"cbor"``).
+        queue: Bounded queue of frames awaiting delivery.
+        sent: Frames delivered so far.
+        dropped: Frames discarded because the queue was full.
+        task: Sender task draining :attr:`queue`.
+        first_live_seq: ``seq`` of the first event delivered live; older
+            events can only reach the client by replay.
+        first_live_packet_id: ``id`` of the first packet broadcast after
+            the client connected, or ``None`` if none yet.
+    """
+
+    def __init__(
+        self,
+        client_id: int,
+        ws: WebSocket,
+        queue_size: int,
+        protocol: int = 1,
+        encoding: str = "json",
+    ) -> None:
+        self.id = client_id
+        self.ws = ws
+        self.protocol = protocol
+        self.encoding = encoding
+        self.queue: asyncio.Queue[Frame] = asyncio.Queue(maxsize=queue_size)
+        self.sent = 0
+        self.dropped = 0
+        self.task: Optional[asyncio.Task] = None
+        self.first_live_seq = 0
+        self.first_live_packet_id: Optional[int] = None
+
+    def stats(self) -> dict:
+        """Return per-client delivery counters."""
+        peer = self.ws.client
+        return {
+            "id": self.id,
+            "peer": f"{peer.host}:{peer.port}" if peer else None,
+            "protocol": self.protocol,
+            "encoding": self.encoding,
+            "queued": self.queue.qsize(),
+            "sent": self.sent,
+            "dropped": self.dropped,
+        }
+
+
+class SubscriptionIndex:
+    """Maps subscription topics to clients for filtered event routing.
+
+    A subscription has three dimensions: event type, packet type and
+    source hash.  For each dimension a client is either filed under every
+    value it asked for or, if it gave none, in that dimension's wildcard
+    set.  Routing an event is then a handful of set lookups and
+    intersections rather than a filter check per connection.
+    """
+
+    DIMENSIONS = ("events", "packet_types", "source_hashes")
+
+    def __init__(self) -> None:
+        self._topics: dict[str, defaultdict[str, set[ClientConnection]]] = {
+            dim: defaultdict(set) for dim in self.DIMENSIONS
+        }
+        self._wildcard: dict[str, set[ClientConnection]] = {
+            dim: set() for dim in self.DIMENSIONS
+        }
+        self._subscriptions: dict[ClientConnection, dict[str, frozenset[str]]] = {}
+
+    def add(
+        self,
+        client: ClientConnection,
+        events: Iterable[str] = (),
+        packet_types: Iterable[str] = (),
+        source_hashes: Iterable[str] = (),
+    ) -> None:
+        """Register (or replace) *client*'s subscription.
+
+        Args:
+            client: Subscribing client.
+            events: Event types to receive; empty means all.
+            packet_types: Packet types to receive; empty means all.
+            source_hashes: Source node hashes to receive; empty means all.
+        """
+        self.remove(client)
+        subscription = {
+            "events": frozenset(events),
+            "packet_types": frozenset(packet_types),
+            "source_hashes": frozenset(source_hashes),
+        }
+        for dim, values in subscription.items():
+            if not values:
+                self._wildcard[dim].add(client)
+            for value in values:
+                self._topics[dim][value].add(client)
+        self._subscriptions[client] = subscription
+
+    def remove(self, client: ClientConnection) -> None:
+        """Drop *client* from every topic."""
+        subscription = self._subscriptions.pop(client, None)
+        if subscription is None:
+            return
+        for dim, values in subscription.items():
+            self._wildcard[dim].discard(client)
+            for value in values:
+                subscribers = self._topics[dim][value]
+                subscribers.discard(client)
+                if not subscribers:
+                    del self._topics[dim][value]
+
+    def subscription(self, client: ClientConnection) -> dict[str, list[str]]:
+        """Return *client*'s current subscription as sorted lists."""
+        subscription = self._subscriptions.get(client, {})
+        return {dim: sorted(subscription.get(dim, ())) for dim in self.DIMENSIONS}
+
+    def recipients(self, event_type: str, data: dict) -> set[ClientConnection]:
+        """Return the clients subscribed to an event.
+
+        Args:
+            event_type: Event classification string.
+            data: Event payload; packet fields are read for packet events.
+        """
+        result = self._match("events", event_type)
+        if event_type == PACKET_EVENT:
+            if result:
+                result &= self._match("packet_types", data.get("packet_type"))
+            if result:
+                result &= self._match("source_hashes", data.get("source_hash"))
+        return result
+
+    def _match(self, dim: str, value: Optional[str]) -> set[ClientConnection]:
+        """Return wildcard subscribers of *dim* plus those filed under *value*."""
+        specific = self._topics[dim].get(value) if value is not None else None
+        if specific:
+            return self._wildcard[dim] | specific
+        return set(self._wildcard[dim])
+
 
 class ConnectionManager:
     """Manages active WebSocket connections and broadcasts events.
 
     Attributes:
-        active: List of currently connected WebSocket clients.
+        clients: Connected clients keyed by their WebSocket.
+        subscriptions: Topic index used to route events.
+        queue_size: Per-client outbound queue capacity.
+        overflow_policy: ``"drop_oldest"`` or ``"disconnect"``.
+        coalesce_ms: Window over which events are merged; ``0`` flushes
+            after every :meth:`broadcast` / :meth:`broadcast_many` call.
+        history: Ring buffer of recently delivered events for replay.
+        seq: Highest sequence number received by this process.
+        backend: Pub/sub backend events are published through.
+        dropped_total: Frames dropped across all clients, past and present.
+        slow_disconnects: Clients closed by the ``disconnect`` policy.
     """
 
-    def __init__(self) -> None:
-        self.active: list[WebSocket] = []
+    def __init__(
+        self,
+        queue_size: int = WS_QUEUE_SIZE,
+        overflow_policy: str = WS_OVERFLOW_POLICY,
+        coalesce_ms: int = WS_COALESCE_MS,
+        replay_buffer: int = WS_REPLAY_BUFFER,
+        replay_db_limit: int = WS_REPLAY_DB_LIMIT,
+        backend: Optional[BroadcastBackend] = None,
+    ) -> None:
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown WebSocket overflow policy '{overflow_policy}'")
+        self.clients: dict[WebSocket, ClientConnection] = {}
+        self.subscriptions = SubscriptionIndex()
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.coalesce_ms = coalesce_ms
+        self.history: deque[BroadcastEvent] = deque(maxlen=replay_buffer)
+        self.replay_db_limit = replay_db_limit
+        self.seq = 0
+        self.backend = backend or MemoryBackend()
+        self.backend.subscribe(WS_CHANNEL, self._receive)
+        self.replays = {"buffer": 0, "db": 0, "unavailable": 0}
+        self.encoding_stats: defaultdict[str, dict[str, int]] = defaultdict(
+            lambda: {"frames": 0, "bytes": 0, "packets": 0}
+        )
+        self.dropped_total = 0
+        self.slow_disconnects = 0
+        self._ids = itertools.count(1)
+        self._closing: set[asyncio.Task] = set()
+        self._pending: list[BroadcastEvent] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._awaiting_packet_id: set[ClientConnection] = set()
 
-    async def connect(self, ws: WebSocket) -> None:
+    @property
+    def active(self) -> list[WebSocket]:
+        """Currently connected WebSocket clients."""
+        return list(self.clients)
+
+    async def connect(
+        self,
+        ws: WebSocket,
+        protocol: int = 1,
+        encoding: str = "json",
+        subprotocol: Optional[str] = None,
+    ) -> ClientConnection:
         """Accept and register a new WebSocket connection.
 
         Args:
             ws: Incoming WebSocket to accept.
+            protocol: Protocol version requested by the client.
+            encoding: Codec name from :func:`negotiate_encoding`.
+            subprotocol: Subprotocol to confirm in the handshake, if any.
+
+        Returns:
+            The registered :class:`ClientConnection`.
         """
-        await ws.accept()
-        self.active.append(ws)
-        logger.info("WebSocket connected (%d total)", len(self.active))
+        if subprotocol:
+            await ws.accept(subprotocol=subprotocol)
+        else:
+            await ws.accept()
+        client = ClientConnection(
+            next(self._ids), ws, self.queue_size, protocol, encoding
+        )
+        # Events not yet flushed will still be delivered to this client live.
+        client.first_live_seq = self._pending[0].seq if self._pending else self.seq + 1
+        self._awaiting_packet_id.add(client)
+        client.task = asyncio.create_task(self._sender(client))
+        self.clients[ws] = client
+        self.subscriptions.add(client)
+        logger.info("WebSocket connected (%d total)", len(self.clients))
+        return client
 
     def disconnect(self, ws: WebSocket) -> None:
-        """Remove a WebSocket from the active list.
+        """Remove a WebSocket and stop its sender task.
 
         Args:
             ws: WebSocket to remove.
         """
-        if ws in self.active:
-            self.active.remove(ws)
-        logger.info("WebSocket disconnected (%d remaining)", len(self.active))
+        client = self.clients.pop(ws, None)
+        if client is None:
+            return
+        self.subscriptions.remove(client)
+        self._awaiting_packet_id.discard(client)
+        if client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+        logger.info("WebSocket disconnected (%d remaining)", len(self.clients))
+
+    def subscribe(
+        self,
+        ws: WebSocket,
+        events: Iterable[str] = (),
+        packet_types: Iterable[str] = (),
+        source_hashes: Iterable[str] = (),
+    ) -> None:
+        """Replace a client's subscription and acknowledge it.
+
+        Args:
+            ws: Subscribing WebSocket.
+            events: Event types to receive; empty means all.
+            packet_types: Packet types to receive; empty means all.
+            source_hashes: Source node hashes to receive; empty means all.
+        """
+        client = self.clients.get(ws)
+        if client is None:
+            return
+        self.subscriptions.add(client, events, packet_types, source_hashes)
+        ack = {"type": "subscribed", "data": self.subscriptions.subscription(client)}
+        self._enqueue(client, CODECS[client.encoding](ack))
+
+    async def handle_message(self, ws: WebSocket, frame: Frame) -> None:
+        """Apply a control message received from a client.
+
+        Text frames are JSON; binary frames are decoded with the client's
+        negotiated codec.  Unknown or malformed messages (including plain
+        keep-alives) are ignored.
+
+        Args:
+            ws: Sending WebSocket.
+            frame: Raw text or binary frame.
+        """
+        client = self.clients.get(ws)
+        codec = "json"
+        if isinstance(frame, bytes) and client is not None:
+            codec = client.encoding
+        try:
+            message = DECODERS[codec](frame)
+        except Exception:
+            return
+        if not isinstance(message, dict):
+            return
+        if message.get("type") == "subscribe":
+            self.subscribe(
+                ws,
+                events=_str_list(message.get("events")),
+                packet_types=_str_list(message.get("packet_types")),
+                source_hashes=_str_list(message.get("source_hashes")),
+            )
+        elif message.get("type") == "unsubscribe":
+            self.subscribe(ws)
+        elif message.get("type") == "resume":
+            await self.resume(
+                ws,
+                last_seq=_as_int(message.get("last_seq")),
+                last_packet_id=_as_int(message.get("last_packet_id")),
+            )
+
+    async def resume(
+        self,
+        ws: WebSocket,
+        last_seq: Optional[int],
+        last_packet_id: Optional[int] = None,
+    ) -> None:
+        """Replay events a reconnecting client missed, then mark completion.
+
+        Events after *last_seq* are served from :attr:`history` when the
+        buffer still reaches back that far.  Otherwise, if the client gave
+        *last_packet_id*, newer packets are reloaded from the database (up
+        to ``replay_db_limit``) followed by one ``neighbors_updated``; with
+        neither, the client is told to resync on its own.  Replayed events
+        honour the client's subscription, and events the client already
+        received live since connecting are not sent again.
+
+        Args:
+            ws: Reconnected WebSocket.
+            last_seq: Highest ``seq`` the client received before dropping.
+            last_packet_id: Highest packet ``id`` the client received.
+        """
+        client = self.clients.get(ws)
+        if client is None or last_seq is None:
+            return
+        oldest = self.history[0].seq if self.history else self.seq + 1
+        truncated = False
+        live = client.first_live_seq
+        if oldest - 1 <= last_seq <= self.seq:
+            source = "buffer"
+            events = [
+                event for event in self.history if last_seq < event.seq < live
+            ]
+        elif last_packet_id is not None:
+            source = "db"
+            events, truncated = await asyncio.to_thread(
+                self._load_packets,
+                last_packet_id,
+                client.first_live_packet_id,
+                live - 1,
+            )
+            events.append(BroadcastEvent(live - 1, "neighbors_updated", {}))
+        else:
+            source, events = "unavailable", []
+        self.replays[source] += 1
+        events = [
+            event
+            for event in events
+            if client in self.subscriptions.recipients(event.type, event.data)
+        ]
+        if events:
+            encoder = _FrameEncoder(events)
+            indices = tuple(range(len(events)))
+            for msg, _ in encoder.frames(indices, client.protocol, client.encoding):
+                self._enqueue(client, msg)
+        done = {
+            "source": source,
+            "seq": self.seq,
+            "replayed": len(events),
+            "resync": source == "unavailable" or truncated,
+        }
+        frame = {"type": "replay_complete", "data": done}
+        self._enqueue(client, CODECS[client.encoding](frame))
+
+    def _load_packets(
+        self, last_packet_id: int, before_id: Optional[int], seq: int
+    ) -> tuple[list[BroadcastEvent], bool]:
+        """Read packets newer than *last_packet_id* for a database replay.
+
+        Args:
+            last_packet_id: Highest packet ``id`` the client received.
+            before_id: Exclusive upper bound on ``id`` (packets from here
+                on were delivered live), or ``None``.
+            seq: Sequence number to give the replayed events.
+
+        Returns:
+            The packets as events and whether more rows remained beyond
+            ``replay_db_limit``.
+        """
+        rows: list[dict] = []
+        for chunk in iter_packet_chunks(
+            cursor=last_packet_id, chunk_size=self.replay_db_limit + 1
+        ):
+            rows = chunk
+            break
+        if before_id is not None:
+            rows = [row for row in rows if row["id"] < before_id]
+        truncated = len(rows) > self.replay_db_limit
+        events = [
+            BroadcastEvent(
+                seq,
+                PACKET_EVENT,
+                {
+                    k: v.isoformat() if isinstance(v, datetime) else v
+                    for k, v in row.items()
+                },
+            )
+            for row in rows[: self.replay_db_limit]
+        ]
+        return events, truncated
 
     async def broadcast(self, event_type: str, data: dict) -> None:
-        """Send a JSON event to all connected clients.
+        """Queue a JSON event for every connected client.
 
-        Dead connections are silently pruned.
+        Frames are enqueued without waiting on any client, so a slow
+        consumer cannot delay the caller.
 
         Args:
             event_type: Event classification string (e.g. ``"packet"``).
             data: Payload dict to serialize as JSON.
         """
-        msg = json.dumps({"type": event_type, "data": data})
-        dead: list[WebSocket] = []
-        for ws in self.active:
-            try:
-                await ws.send_text(msg)
-            except Exception:
-                dead.append(ws)
-        for ws in dead:
-            if ws in self.active:
-                self.active.remove(ws)
+        await self.broadcast_many(event_type, [data])
+
+    async def broadcast_many(self, event_type: str, items: list[dict]) -> None:
+        """Publish several events of one type, e.g. an ingest batch.
+
+        The events are sequenced and published as one backend message;
+        every process's manager then queues them for its own clients.
+        v2 clients receive coalescable types as a single array frame.
+
+        Args:
+            event_type: Event classification string shared by all *items*.
+            items: Payload dicts, in order.
+        """
+        if not items:
+            return
+        last = await self.backend.next_seq(len(items))
+        first = last - len(items) + 1
+        events = [[first + i, event_type, data] for i, data in enumerate(items)]
+        await self.backend.publish(WS_CHANNEL, {"events": events})
+
+    async def _receive(self, message: dict) -> None:
+        """Queue events delivered by the backend for local clients."""
+        for seq, event_type, data in message["events"]:
+            self.seq = max(self.seq, seq)
+            self._pending.append(BroadcastEvent(seq, event_type, data))
+        if self.coalesce_ms <= 0:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.coalesce_ms / 1000, self._flush
+            )
+
+    def stats(self) -> dict:
+        """Return broadcast counters for the metrics endpoint."""
+        return {
+            "clients": len(self.clients),
+            "queue_size": self.queue_size,
+            "overflow_policy": self.overflow_policy,
+            "coalesce_ms": self.coalesce_ms,
+            "seq": self.seq,
+            "buffered_events": len(self.history),
+            "replays": dict(self.replays),
+            "encodings": {
+                name: {
+                    **counts,
+                    "bytes_per_packet": (
+                        round(counts["bytes"] / counts["packets"], 1)
+                        if counts["packets"]
+                        else None
+                    ),
+                }
+                for name, counts in self.encoding_stats.items()
+            },
+            "dropped_total": self.dropped_total,
+            "slow_disconnects": self.slow_disconnects,
+            "per_client": [
+                {
+                    **client.stats(),
+                    "subscription": self.subscriptions.subscription(client),
+                }
+                for client in self.clients.values()
+            ],
+        }
+
+    def _flush(self) -> None:
+        """Route pending events and enqueue the encoded frames.
+
+        Clients that receive the same events under the same protocol and
+        codec share one encoding, so in the common unfiltered case each
+        frame is serialized once per protocol and codec.  Bytes handed to
+        the socket are tallied per codec before any per-message deflate.
+        """
+        self._flush_handle = None
+        events, self._pending = self._pending, []
+        self.history.extend(events)
+        if self._awaiting_packet_id:
+            ids = [
+                event.data["id"]
+                for event in events
+                if event.type == PACKET_EVENT and isinstance(event.data.get("id"), int)
+            ]
+            if ids:
+                for client in self._awaiting_packet_id:
+                    client.first_live_packet_id = min(ids)
+                self._awaiting_packet_id.clear()
+        if not events or not self.clients:
+            return
+        per_client: dict[ClientConnection, list[int]] = {}
+        for idx, event in enumerate(events):
+            for client in self.subscriptions.recipients(event.type, event.data):
+                per_client.setdefault(client, []).append(idx)
+        encoder = _FrameEncoder(events)
+        for client, indices in per_client.items():
+            counts = self.encoding_stats[client.encoding]
+            frames = encoder.frames(tuple(indices), client.protocol, client.encoding)
+            for msg, packets in frames:
+                counts["frames"] += 1
+                counts["bytes"] += len(msg)
+                counts["packets"] += packets
+                self._enqueue(client, msg)
+
+    def _enqueue(self, client: ClientConnection, msg: Frame) -> None:
+        """Put *msg* on *client*'s queue, applying the overflow policy."""
+        try:
+            client.queue.put_nowait(msg)
+            return
+        except asyncio.QueueFull:
+            pass
+        client.dropped += 1
+        self.dropped_total += 1
+        if self.overflow_policy == "disconnect":
+            self.slow_disconnects += 1
+            logger.warning("Closing slow WebSocket client #%d", client.id)
+            self.disconnect(client.ws)
+            task = asyncio.create_task(self._close(client.ws))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+            return
+        client.queue.get_nowait()
+        client.queue.put_nowait(msg)
+
+    async def _sender(self, client: ClientConnection) -> None:
+        """Drain *client*'s queue onto its socket until it fails."""
+        try:
+            while True:
+                msg = await client.queue.get()
+                if isinstance(msg, bytes):
+                    await client.ws.send_bytes(msg)
+                else:
+                    await client.ws.send_text(msg)
+                client.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.disconnect(client.ws)
+
+    @staticmethod
+    async def _close(ws: WebSocket) -> None:
+        """Close *ws* with "try again later", ignoring already-closed sockets."""
+        try:
+            await ws.close(code=1013)
+        except Exception:
+            pass
+
+
+class _FrameEncoder:
+    """Serializes one flush worth of events, caching every encoded frame."""
+
+    def __init__(self, events: list[BroadcastEvent]) -> None:
+        self.events = events
+        self._single: dict[tuple[str, int], Frame] = {}
+        self._batches: dict[tuple[str, tuple[int, ...]], Frame] = {}
+        self._frames: dict[tuple, list[tuple[Frame, int]]] = {}
+
+    def frames(
+        self, indices: tuple[int, ...], protocol: int, encoding: str = "json"
+    ) -> list[tuple[Frame, int]]:
+        """Return the frames for the events at *indices*.
+
+        v2 merges each run of consecutive coalescable events into one array
+        frame; everything else is one frame per event.
+
+        Args:
+            indices: Positions in :attr:`events`, in order.
+            protocol: Client protocol version.
+            encoding: Codec name.
+
+        Returns:
+            ``(frame, packet_count)`` pairs.
+        """
+        key = (encoding, protocol, indices)
+        if key in self._frames:
+            return self._frames[key]
+        if protocol < 2:
+            frames = [self._one(encoding, i) for i in indices]
+        else:
+            frames = []
+            run: list[int] = []
+            for i in indices:
+                event_type = self.events[i].type
+                if run and self.events[run[0]].type == event_type:
+                    run.append(i)
+                    continue
+                if run:
+                    frames.append(self._batch(encoding, tuple(run)))
+                    run = []
+                if event_type in COALESCED_TYPES:
+                    run = [i]
+                else:
+                    frames.append(self._one(encoding, i))
+            if run:
+                frames.append(self._batch(encoding, tuple(run)))
+        self._frames[key] = frames
+        return frames
+
+    def _one(self, encoding: str, i: int) -> tuple[Frame, int]:
+        """Encode the single event at index *i*."""
+        seq, event_type, data = self.events[i]
+        if (encoding, i) not in self._single:
+            frame = {"type": event_type, "seq": seq, "data": data}
+            self._single[(encoding, i)] = CODECS[encoding](frame)
+        return self._single[(encoding, i)], int(event_type == PACKET_EVENT)
+
+    def _batch(self, encoding: str, run: tuple[int, ...]) -> tuple[Frame, int]:
+        """Encode a run of same-typed coalescable events as one array frame."""
+        event_type = self.events[run[0]].type
+        if (encoding, run) not in self._batches:
+            frame = {
+                "type": COALESCED_TYPES[event_type],
+                "seq": self.events[run[-1]].seq,
+                "data": [self.events[i].data for i in run],
+            }
+            self._batches[(encoding, run)] = CODECS[encoding](frame)
+        packets = len(run) if event_type == PACKET_EVENT else 0
+        return self._batches[(encoding, run)], packets
 
 
-manager = ConnectionManager()
+def _as_int(value: object) -> Optional[int]:
+    """Coerce a control-message field to ``int``, or ``None`` if invalid."""
+    try:
+        return int(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+
+
+def _str_list(value: object) -> list[str]:
+    """Coerce a subscription field to a list of strings, ignoring junk."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [str(item) for item in value if item is not None]
+    return []
+
+
+manager = ConnectionManager(backend=pubsub.backend)
 
 
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket) -> None:
     """Accept a WebSocket connection and keep it alive until the client disconnects.
 
+    Clients opt into batched ``packets`` frames with ``?v=2`` and into a
+    binary codec by offering its subprotocol.
+
     Args:
         websocket: The incoming WebSocket connection.
     """
-    await manager.connect(websocket)
+    try:
+        protocol = int(websocket.query_params.get("v", "1"))
+    except ValueError:
+        protocol = 1
+    if protocol not in PROTOCOL_VERSIONS:
+        protocol = 1
+    encoding, subprotocol = negotiate_encoding(websocket.scope.get("subprotocols", ()))
+    await manager.connect(websocket, protocol, encoding, subprotocol)
     try:
         while True:
-            await websocket.receive_text()  # keep-alive
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            frame = message.get("text")
+            if frame is None:
+                frame = message.get("bytes")
+            if frame is not None:
+                await manager.handle_message(websocket, frame)
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
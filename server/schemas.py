@@ -69,6 +69,23 @@ class NeighborIngest(BaseModel):
     hash: Optional[str] = None
 
 
+class NeighborDelta(BaseModel):
+    """Changes to one node's neighbor table since the last upload.
+
+    Attributes:
+        node_hash: Observing node (defaults to ``"local"``).
+        full: ``True`` if ``upserts`` is the complete table; neighbors
+            missing from it are then removed.
+        upserts: Neighbors that are new or whose signal changed.
+        removed: Hashes of neighbors no longer in the table.
+    """
+
+    node_hash: str = "local"
+    full: bool = False
+    upserts: list[NeighborIngest] = []
+    removed: list[str] = []
+
+
 # ------------------------------------------------------------------
 # API response schemas
 # ------------------------------------------------------------------
@@ -138,6 +155,18 @@ class PacketResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PacketSearchHit(PacketResponse):
+    """A full-text search result.
+
+    Attributes:
+        snippet: Matching excerpt with hits wrapped in ``[`` / ``]``.
+        rank: BM25 relevance score (lower is better).
+    """
+
+    snippet: str
+    rank: float
+
+
 class BotRuleResponse(BaseModel):
     """Public representation of a bot automation rule.
 
@@ -151,6 +180,8 @@ class BotRuleResponse(BaseModel):
         action_config: JSON action parameters.
         last_triggered: Last firing timestamp.
         trigger_count: Cumulative firing count.
+        suppressed_count: Firings held back by the rule's cooldown or rate
+            limit since the server started.
     """
 
     id: int
@@ -162,6 +193,7 @@ class BotRuleResponse(BaseModel):
     action_config: str
     last_triggered: Optional[datetime] = None
     trigger_count: int
+    suppressed_count: int = 0
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -186,6 +218,48 @@ class BotRuleCreate(BaseModel):
     action_config: str = "{}"
 
 
+class BacktestHour(BaseModel):
+    """Backtest matches within one hour.
+
+    Attributes:
+        hour: Start of the hour (UTC).
+        matches: Packets the rule matched in that hour.
+    """
+
+    hour: datetime
+    matches: int
+
+
+class BacktestResponse(BaseModel):
+    """Result of replaying stored packets through a bot rule.
+
+    Attributes:
+        since: Inclusive lower bound of the replayed window.
+        until: Exclusive upper bound of the replayed window.
+        scanned: Packets read after SQL push-down filters.
+        matched: Packets the rule's trigger matched.
+        would_fire: Matched packets left after the rule's cooldown and
+            rate limit, replayed on their ``received_at`` times.
+        hours: Non-zero per-hour match counts, oldest first.
+        samples: A random sample of matched packets, oldest first.
+        pushdown: Filters applied in SQL rather than by the matcher.
+        complete: ``False`` if the scan stopped at its time budget.
+        cursor: Packet ``id`` to pass as ``cursor`` to continue an
+            incomplete scan.
+    """
+
+    since: datetime
+    until: datetime
+    scanned: int
+    matched: int
+    would_fire: int
+    hours: list[BacktestHour]
+    samples: list[PacketResponse]
+    pushdown: dict[str, str | bool]
+    complete: bool
+    cursor: Optional[int] = None
+
+
 class IngestResult(BaseModel):
     """Response returned by ingest endpoints.
 
@@ -0,0 +1,179 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Full-text search over decoded cleartext packet payloads.
+
+Payloads are hex-decoded once at ingest and written to the ``packet_fts``
+FTS5 table declared in :mod:`server.models`; packets stored before that
+table existed are indexed by :func:`backfill_index` when it is created.
+Only payloads that decode to printable UTF-8 are indexed; encrypted
+payloads are skipped.  The index is SQLite-only — on other databases
+indexing is a no-op and searching raises :class:`SearchUnavailable`.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+BACKFILL_CHUNK_SIZE = 1000
+"""Packets read per query while backfilling the index."""
+
+from sqlalchemy import column, literal_column, table, text
+from sqlmodel import Session, select
+
+from .models import Packet
+
+_fts = table("packet_fts", column("rowid"), column("body"))
+
+
+class SearchUnavailable(RuntimeError):
+    """Raised when the active database has no full-text index."""
+
+
+def fts_enabled(session: Session) -> bool:
+    """Return ``True`` if *session* is bound to a database with ``packet_fts``.
+
+    Args:
+        session: Active database session.
+    """
+    return session.get_bind().dialect.name == "sqlite"
+
+
+def decode_cleartext(payload_hex: Optional[str]) -> Optional[str]:
+    """Decode a hex payload to text if it is printable UTF-8.
+
+    Args:
+        payload_hex: Hex-encoded payload bytes.
+
+    Returns:
+        The decoded text, or ``None`` for empty, malformed or binary
+        (typically encrypted) payloads.
+    """
+    if not payload_hex:
+        return None
+    try:
+        decoded = bytes.fromhex(payload_hex).decode("utf-8").strip("\x00 \t\r\n")
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not decoded or not all(ch.isprintable() or ch.isspace() for ch in decoded):
+        return None
+    return decoded
+
+
+def index_packets(session: Session, packets: Iterable[Packet]) -> int:
+    """Add the cleartext of flushed *packets* to the full-text index.
+
+    Must be called after the packets have IDs (i.e. after a flush) and
+    before the surrounding transaction commits.
+
+    Args:
+        session: Session that owns the packets.
+        packets: Newly persisted packets.
+
+    Returns:
+        Number of packets indexed.
+    """
+    if not fts_enabled(session):
+        return 0
+    return _insert(session, ((pkt.id, pkt.payload_hex) for pkt in packets))
+
+
+def backfill_index(session: Session, chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+    """Index stored packets that are missing from ``packet_fts``.
+
+    Meant to run once, right after the index is created on a database
+    that already holds packets; the caller commits.
+
+    Args:
+        session: Active database session.
+        chunk_size: Packets read per query.
+
+    Returns:
+        Number of packets indexed.
+    """
+    if not fts_enabled(session):
+        return 0
+    indexed = select(_fts.c.rowid)
+    last_id = total = 0
+    while True:
+        rows = session.exec(
+            select(Packet.id, Packet.payload_hex)
+            .where(
+                Packet.id > last_id,
+                Packet.payload_hex.is_not(None),
+                Packet.id.not_in(indexed),
+            )
+            .order_by(Packet.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return total
+        total += _insert(session, rows)
+        last_id = rows[-1][0]
+
+
+def _insert(session: Session, packets: Iterable[tuple[int, Optional[str]]]) -> int:
+    """Write ``(id, payload_hex)`` pairs that decode to text into the index."""
+    rows = [
+        {"rowid": packet_id, "body": body}
+        for packet_id, payload_hex in packets
+        if (body := decode_cleartext(payload_hex)) is not None
+    ]
+    if rows:
+        session.execute(
+            text("INSERT INTO packet_fts (rowid, body) VALUES (:rowid, :body)"), rows
+        )
+    return len(rows)
+
+
+def _match_expression(query: str) -> str:
+    """Turn free text into an FTS5 expression that ANDs each quoted term.
+
+    Quoting stops punctuation from being parsed as FTS5 operators; a
+    trailing ``*`` on a term is kept as a prefix match.
+    """
+    terms = []
+    for token in query.split():
+        prefix = token.endswith("*") and len(token) > 1
+        word = token.rstrip("*") if prefix else token
+        terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def search_packets(
+    session: Session, query: str, limit: int = 50, offset: int = 0
+) -> list[tuple[Packet, str, float]]:
+    """Return packets whose cleartext matches *query*, best match first.
+
+    Args:
+        session: Active database session.
+        query: Whitespace-separated search terms (all must match).
+        limit: Maximum number of hits.
+        offset: Number of hits to skip, for pagination.
+
+    Returns:
+        ``(packet, snippet, rank)`` tuples ordered by BM25 rank (lower is
+        better).
+
+    Raises:
+        SearchUnavailable: If the database has no full-text index.
+    """
+    if not fts_enabled(session):
+        raise SearchUnavailable("Full-text search requires SQLite FTS5")
+    expression = _match_expression(query)
+    if not expression:
+        return []
+    rank = literal_column("bm25(packet_fts)").label("rank")
+    stmt = (
+        select(
+            Packet,
+            literal_column("snippet(packet_fts, 0, '[', ']', '…', 12)"),
+            rank,
+        )
+        .join(_fts, _fts.c.rowid == Packet.id)
+        .where(literal_column("packet_fts").op("MATCH")(expression))
+        .order_by(rank, Packet.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+    return [(pkt, snippet, score) for pkt, snippet, score in session.exec(stmt)]
@@ -0,0 +1,81 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""In-process stand-in for the pyMC_Repeater HTTP API.
+
+Serves ``GET /api/packets`` and ``GET /api/neighbors`` through an
+:class:`httpx.MockTransport`, so ingestor tests run without a network.
+Like the real repeater it only keeps the most recent packets.
+"""
+
+from datetime import UTC, datetime, timedelta
+
+import httpx
+
+EPOCH = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+class FakeRepeater:
+    """A repeater with a bounded packet log and a neighbor table.
+
+    Attributes:
+        packets: Packets currently held, oldest first.
+        neighbors: The neighbor table.
+        requests: Every request received.
+        supports_since: Whether ``?since=`` filters packets; when
+            ``False`` the parameter is ignored, as older firmware does.
+    """
+
+    def __init__(self, supports_since: bool = True, keep: int = 100) -> None:
+        self.supports_since = supports_since
+        self.keep = keep
+        self.packets: list[dict] = []
+        self.neighbors: list[dict] = []
+        self.requests: list[httpx.Request] = []
+        self._emitted = 0
+
+    def emit(self, count: int = 1, **fields) -> list[dict]:
+        """Receive *count* packets one second apart.
+
+        Returns:
+            The new packets in raw repeater format.
+        """
+        new = []
+        for _ in range(count):
+            self._emitted += 1
+            n = self._emitted
+            new.append(
+                {
+                    "hash": f"pkt{n:06d}",
+                    "type": "TXT_MSG",
+                    "route_type": "FLOOD",
+                    "path": ["AB", "CD"],
+                    "rssi": -80,
+                    "snr": 5.0,
+                    "timestamp": (EPOCH + timedelta(seconds=n)).isoformat(),
+                    **fields,
+                }
+            )
+        self.packets = (self.packets + new)[-self.keep :]
+        return new
+
+    def packet_requests(self) -> list[httpx.Request]:
+        """Return the ``/api/packets`` requests received so far."""
+        return [r for r in self.requests if r.url.path == "/api/packets"]
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        """Answer one request."""
+        self.requests.append(request)
+        if request.url.path == "/api/packets":
+            packets = self.packets
+            since = request.url.params.get("since")
+            if since and self.supports_since:
+                packets = [p for p in packets if p["timestamp"] >= since]
+            return httpx.Response(200, json=packets)
+        if request.url.path == "/api/neighbors":
+            return httpx.Response(200, json=self.neighbors)
+        return httpx.Response(404)
+
+    def transport(self) -> httpx.MockTransport:
+        """Return a transport routing requests to :meth:`handler`."""
+        return httpx.MockTransport(self.handler)
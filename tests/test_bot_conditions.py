@@ -0,0 +1,132 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Tests for ``condition`` rules and the condition compiler."""
+
+import pytest
+
+from server.bot.conditions import ConditionCompiler, EventContext, compile_condition
+from server.bot.index import RuleIndex
+from server.models import BotRule
+
+PACKET = {
+    "packet_type": "ADVERT",
+    "route_type": "FLOOD",
+    "source_hash": "FA",
+    "hop_count": 4,
+    "rssi": -115,
+    "snr": -3.5,
+}
+
+
+def _evaluate(source: str, data: dict = PACKET, text: str | None = None) -> bool:
+    """Compile *source* and evaluate it against *data*."""
+    return compile_condition(source)(EventContext(data, text))
+
+
+class TestConditionCompiler:
+    """Tests for :class:`ConditionCompiler`."""
+
+    @pytest.mark.parametrize(
+        "source, expected",
+        [
+            ('packet_type == "ADVERT" and source_hash == "FA" and rssi < -110', True),
+            ("hop_count > 3 and snr >= -4", True),
+            ("-120 < rssi <= -116", False),
+            ('packet_type in ["ACK", "TRACE"] or route_type != "FLOOD"', False),
+            ('not (packet_type == "ACK") and source_hash not in ("AA", "BB")', True),
+            ("dest_hash or hop_count == 0", False),
+            ('"ping" in text', True),
+            ('"pong" in text', False),
+            ("True", True),
+        ],
+    )
+    def test_evaluates(self, source: str, expected: bool):
+        """Conditions should follow Python comparison and boolean rules."""
+        assert _evaluate(source, text="a ping from afar") is expected
+
+    def test_missing_fields_are_false(self):
+        """Comparisons with absent fields or payloads should not match."""
+        assert not _evaluate("rssi < -100", {})
+        assert not _evaluate('"ping" in text', {})
+        assert _evaluate("rssi == None", {})
+        assert not _evaluate('rssi > "x"')
+
+    @pytest.mark.parametrize(
+        "source",
+        [
+            "",
+            "rssi <",
+            "battery > 3",
+            "rssi + 3 > 0",
+            "len(text) > 3",
+            "rssi is None",
+            '__import__("os")',
+            "packet_type == source_hash.lower()",
+            "x" * 3000,
+        ],
+    )
+    def test_rejects(self, source: str):
+        """Anything outside the condition language should be refused."""
+        with pytest.raises(ValueError):
+            compile_condition(source)
+
+    def test_shared_comparisons_evaluate_once(self):
+        """Rules repeating a comparison should share it within an event."""
+        compiler = ConditionCompiler()
+        first = compiler.compile('rssi < -110 and packet_type == "ADVERT"')
+        second = compiler.compile('packet_type == "ADVERT" or hop_count > 5')
+        assert compiler.atoms == 3
+
+        context = EventContext(PACKET)
+        assert first(context) and second(context)
+        assert len(context.memo) == 2
+
+    def test_tracks_text_use(self):
+        """The compiler should report whether payloads need decoding."""
+        compiler = ConditionCompiler()
+        compiler.compile("rssi < 0")
+        assert not compiler.uses_text
+        compiler.compile('"x" in text')
+        assert compiler.uses_text
+
+
+class TestConditionRules:
+    """Tests for ``condition`` rules in the index and API."""
+
+    @staticmethod
+    def _rule(rule_id: int, value: str) -> BotRule:
+        """Return an unsaved ``condition`` rule."""
+        return BotRule(
+            id=rule_id,
+            name=f"c{rule_id}",
+            trigger_type="condition",
+            trigger_value=value,
+            action_type="log",
+        )
+
+    def test_index_matches_and_skips_bad_conditions(self):
+        """Valid conditions should match; uncompilable ones are skipped."""
+        index = RuleIndex(
+            [
+                self._rule(1, "rssi < -110"),
+                self._rule(2, "battery < 10"),
+                self._rule(3, '"hello" in text'),
+            ]
+        )
+        assert len(index.conditions) == 2
+        event = {"data": {**PACKET, "payload_hex": b"Hello".hex()}}
+        assert index.may_match(event)
+        assert [rule.id for rule in index.match(event)] == [1, 3]
+
+    def test_invalid_condition_rejected_by_api(self, client):
+        """The rules API should refuse conditions that do not compile."""
+        body = {
+            "name": "Weak",
+            "trigger_type": "condition",
+            "trigger_value": "rssi < -110 and",
+            "action_type": "log",
+        }
+        assert client.post("/api/bot/rules", json=body).status_code == 422
+        body["trigger_value"] = "rssi < -110"
+        assert client.post("/api/bot/rules", json=body).status_code == 200
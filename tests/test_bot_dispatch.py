@@ -0,0 +1,402 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Tests for concurrent bot action dispatch."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from server.bot import actions
+from server.bot.actions import ActionExecutor
+from server.bot.dispatch import ActionDispatcher, parse_limits
+from server.main import app
+from server.models import BotRule
+
+
+def _run(coro):
+    """Helper to run a coroutine synchronously."""
+    return asyncio.run(coro)
+
+
+def _rule(action: str, name: str = "r", **config) -> BotRule:
+    """Return an unsaved rule with the given action and config."""
+    return BotRule(
+        name=name,
+        trigger_type="packet_type",
+        trigger_value="ACK",
+        action_type=action,
+        action_config=json.dumps(config),
+    )
+
+
+class ScriptedExecutor:
+    """Executor stand-in whose behaviour per rule name is scripted.
+
+    Attributes:
+        calls: ``(rule name, event)`` pairs in start order.
+        active: Currently running actions.
+        peak: Highest value of :attr:`active` seen.
+    """
+
+    def __init__(self, delays=None, failures=None) -> None:
+        self.delays = delays or {}
+        self.failures = failures or {}
+        self.calls: list[tuple[str, dict]] = []
+        self.finished: list[str] = []
+        self.active = 0
+        self.peak = 0
+
+    async def execute(self, rule: BotRule, event: dict) -> None:
+        """Record the call, wait the scripted delay, maybe raise."""
+        self.calls.append((rule.name, event))
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delays.get(rule.name, 0))
+            failures = self.failures.get(rule.name)
+            if failures:
+                raise failures.pop(0)
+        finally:
+            self.active -= 1
+        self.finished.append(rule.name)
+
+
+class TestActionDispatcher:
+    """Tests for :class:`ActionDispatcher`."""
+
+    def test_slow_action_does_not_block_others(self):
+        """A stalled webhook should not hold up a log action behind it."""
+        executor = ScriptedExecutor(delays={"slow": 0.2})
+
+        async def scenario():
+            dispatcher = ActionDispatcher(executor, retries=0)
+            await dispatcher.submit(_rule("webhook", "slow"), {})
+            await dispatcher.submit(_rule("log", "fast"), {})
+            await asyncio.sleep(0.05)
+            assert executor.finished == ["fast"]
+            await dispatcher.drain()
+            await dispatcher.close()
+
+        _run(scenario())
+        assert executor.finished == ["fast", "slow"]
+
+    def test_per_type_limit_caps_concurrency(self):
+        """No more actions of a type should run at once than its limit."""
+        executor = ScriptedExecutor(delays={"hook": 0.02})
+
+        async def scenario():
+            dispatcher = ActionDispatcher(executor, limits={"webhook": 2})
+            for _ in range(6):
+                await dispatcher.submit(_rule("webhook", "hook"), {})
+            await dispatcher.drain()
+            await dispatcher.close()
+
+        _run(scenario())
+        assert len(executor.finished) == 6
+        assert executor.peak == 2
+
+    def test_retries_with_backoff_then_succeeds(self):
+        """Transient errors should be retried until an attempt succeeds."""
+        request = httpx.Request("POST", "http://hook")
+        executor = ScriptedExecutor(
+            failures={"flaky": [httpx.ConnectError("down", request=request)] * 2}
+        )
+
+        async def scenario():
+            dispatcher = ActionDispatcher(executor, retries=3, backoff=0.001)
+            await dispatcher.submit(_rule("webhook", "flaky"), {})
+            await dispatcher.drain()
+            await dispatcher.close()
+            return dispatcher.stats()["actions"]["webhook"]
+
+        stats = _run(scenario())
+        assert len(executor.calls) == 3
+        assert stats["retried"] == 2
+        assert stats["succeeded"] == 1
+        assert stats["latency"]["count"] == 1
+        assert stats["queue_wait"]["count"] == 1
+
+    def test_client_errors_are_not_retried(self):
+        """A 4xx response should fail immediately."""
+        request = httpx.Request("POST", "http://hook")
+        response = httpx.Response(404, request=request)
+        error = httpx.HTTPStatusError("missing", request=request, response=response)
+        executor = ScriptedExecutor(failures={"gone": [error]})
+
+        async def scenario():
+            dispatcher = ActionDispatcher(executor, retries=3, backoff=0.001)
+            await dispatcher.submit(_rule("webhook", "gone"), {})
+            await dispatcher.drain()
+            await dispatcher.close()
+            return dispatcher.stats()["actions"]["webhook"]
+
+        stats = _run(scenario())
+        assert len(executor.calls) == 1
+        assert stats["failed"] == 1
+
+    def test_send_message_retried_only_on_connect_error(self):
+        """A message that may have been sent should never be sent again."""
+        request = httpx.Request("POST", "http://repeater/api/send")
+        executor = ScriptedExecutor(
+            delays={"slow": 10},
+            failures={
+                "refused": [httpx.ConnectError("refused", request=request)],
+                "lost": [httpx.ReadTimeout("no reply", request=request)],
+            },
+        )
+
+        async def scenario():
+            dispatcher = ActionDispatcher(
+                executor, limits={"send_message": 3}, retries=2, backoff=0.001
+            )
+            for name in ("refused", "lost"):
+                await dispatcher.submit(
+                    _rule("send_message", name, destination=name, message="hi"), {}
+                )
+            slow = _rule("send_message", "slow", message="hi", timeout=0.01)
+            await dispatcher.submit(slow, {})
+            await dispatcher.drain()
+            await dispatcher.close()
+            return dispatcher.stats()["actions"]["send_message"]
+
+        stats = _run(scenario())
+        assert sorted(name for name, _ in executor.calls) == [
+            "lost",
+            "refused",
+            "refused",
+            "slow",
+        ]
+        assert stats["retried"] == 1
+        assert stats["failed"] == 2
+
+    def test_rule_timeout_overrides_default(self):
+        """Each attempt should be cut off at the rule's own timeout."""
+        executor = ScriptedExecutor(delays={"stuck": 10})
+
+        async def scenario():
+            dispatcher = ActionDispatcher(executor, timeout=60, backoff=0.001)
+            rule = _rule("webhook", "stuck", timeout=0.01, retries=1)
+            await dispatcher.submit(rule, {})
+            await dispatcher.drain()
+            await dispatcher.close()
+            return dispatcher.stats()["actions"]["webhook"]
+
+        stats = _run(scenario())
+        assert stats["timed_out"] == 2
+        assert stats["failed"] == 1
+
+    def test_send_message_order_kept_per_destination(self):
+        """Messages to one destination should run in submission order."""
+        executor = ScriptedExecutor(delays={"a1": 0.03, "a2": 0.01, "b1": 0})
+
+        async def scenario():
+            dispatcher = ActionDispatcher(executor, limits={"send_message": 4})
+            for name, dest in [("a1", "AA"), ("a2", "AA"), ("b1", "BB"), ("a3", "AA")]:
+                rule = _rule("send_message", name, destination=dest, message="hi")
+                await dispatcher.submit(rule, {})
+            await dispatcher.drain()
+            await dispatcher.close()
+            return dispatcher.stats()
+
+        stats = _run(scenario())
+        assert [n for n in executor.finished if n.startswith("a")] == ["a1", "a2", "a3"]
+        assert executor.finished.index("b1") < executor.finished.index("a1")
+        assert stats["ordered_lanes"] == 0
+
+    def test_bad_retry_settings_do_not_kill_the_worker(self):
+        """A rule with an unparsable timeout should fail alone."""
+        executor = ScriptedExecutor()
+
+        async def scenario():
+            dispatcher = ActionDispatcher(executor, limits={"send_message": 1})
+            bad = _rule("send_message", "bad", message="hi", timeout="soon")
+            good = _rule("send_message", "good", message="hi", destination="BB")
+            await dispatcher.submit(bad, {})
+            await dispatcher.submit(good, {})
+            await asyncio.wait_for(dispatcher.drain(), 1)
+            await dispatcher.close()
+            return dispatcher.stats()["actions"]["send_message"]
+
+        stats = _run(scenario())
+        assert executor.finished == ["good"]
+        assert stats["failed"] == 1
+        assert stats["succeeded"] == 1
+
+    def test_invalid_config_counts_as_failure(self):
+        """A rule with malformed JSON config should not reach the executor."""
+        executor = ScriptedExecutor()
+        rule = _rule("log", "bad")
+        rule.action_config = "{oops"
+
+        async def scenario():
+            dispatcher = ActionDispatcher(executor)
+            await dispatcher.submit(rule, {})
+            return dispatcher.stats()["actions"]["log"]
+
+        stats = _run(scenario())
+        assert executor.calls == []
+        assert stats["failed"] == 1
+
+    def test_non_object_config_counts_as_failure(self):
+        """A JSON array config should be refused, not crash the bot."""
+        executor = ScriptedExecutor()
+        rule = _rule("send_message", "array")
+        rule.action_config = "[1, 2]"
+
+        async def scenario():
+            dispatcher = ActionDispatcher(executor)
+            await dispatcher.submit(rule, {})
+            return dispatcher.stats()["actions"]["send_message"]
+
+        stats = _run(scenario())
+        assert executor.calls == []
+        assert stats["failed"] == 1
+
+    def test_ordered_lane_is_bounded(self):
+        """Messages piling up for one destination should be dropped."""
+        executor = ScriptedExecutor(delays={"m0": 0.05})
+
+        async def scenario():
+            dispatcher = ActionDispatcher(executor, lane_size=2)
+            for n in range(5):
+                rule = _rule("send_message", f"m{n}", destination="AA", message="hi")
+                await dispatcher.submit(rule, {})
+            await dispatcher.drain()
+            await dispatcher.close()
+            return dispatcher.stats()["actions"]["send_message"]
+
+        stats = _run(scenario())
+        assert executor.finished == ["m0", "m1", "m2"]
+        assert stats["dropped"] == 2
+
+    def test_parse_limits(self):
+        """Limit specs should parse into per-type counts."""
+        assert parse_limits("send_message=1, webhook=4,") == {
+            "send_message": 1,
+            "webhook": 4,
+        }
+
+
+class RecordingTransport(httpx.MockTransport):
+    """Mock transport that records request bodies and answers 200."""
+
+    def __init__(self) -> None:
+        self.bodies: list[tuple[str, object]] = []
+        super().__init__(self._handle)
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.bodies.append((str(request.url), json.loads(request.content)))
+        return httpx.Response(200)
+
+
+class TestActionExecutor:
+    """Tests for the pooled client and webhook batching."""
+
+    def test_client_is_shared_until_stopped(self):
+        """Requests should reuse one client; stop should close it."""
+        transport = RecordingTransport()
+        executor = ActionExecutor(transport=transport)
+
+        async def scenario():
+            await executor.start()
+            client = executor.client
+            for n in range(3):
+                await executor.execute(_rule("webhook", url="http://hook/a"), {"n": n})
+            assert executor.client is client
+            await executor.stop()
+            return client
+
+        client = _run(scenario())
+        assert client.is_closed
+        assert [body for _, body in transport.bodies] == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+    def test_batch_mode_posts_arrays_per_url(self):
+        """Batched webhooks should send one array per URL per window."""
+        transport = RecordingTransport()
+        executor = ActionExecutor(transport=transport)
+        hook_a = _rule("webhook", url="http://hook/a", batch=True, batch_window=0.05)
+        hook_b = _rule("webhook", url="http://hook/b", batch=True, batch_max=2)
+
+        async def scenario():
+            for n in range(3):
+                await executor.execute(hook_a, {"n": n})
+                await executor.execute(hook_b, {"n": n})
+            await asyncio.sleep(0.1)
+            assert executor.stats()["batched_pending"] == 1
+            await executor.stop()
+
+        _run(scenario())
+        assert sorted(transport.bodies, key=lambda item: (item[0], len(item[1]))) == [
+            ("http://hook/a", [{"n": 0}, {"n": 1}, {"n": 2}]),
+            ("http://hook/b", [{"n": 2}]),
+            ("http://hook/b", [{"n": 0}, {"n": 1}]),
+        ]
+        assert executor.stats()["batches"] == 3
+
+    def test_batch_post_is_retried(self):
+        """A batch POST should get the same retries as a dispatched action."""
+        statuses = [503, 200, 503, 503]
+        bodies: list[object] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            bodies.append(json.loads(request.content))
+            return httpx.Response(statuses.pop(0))
+
+        executor = ActionExecutor(transport=httpx.MockTransport(handler))
+        flaky = _rule(
+            "webhook", url="http://hook/a", batch=True, batch_max=1, backoff=0.001
+        )
+        once = _rule(
+            "webhook",
+            url="http://hook/b",
+            batch=True,
+            batch_max=1,
+            retries=1,
+            backoff=0.001,
+        )
+
+        async def scenario():
+            await executor.execute(flaky, {"n": 1})
+            await executor.stop()
+            await executor.start()
+            await executor.execute(once, {"n": 2})
+            await executor.stop()
+
+        _run(scenario())
+        assert bodies == [[{"n": 1}]] * 2 + [[{"n": 2}]] * 2
+        assert executor.stats()["retried"] == 2
+        assert executor.stats()["batches"] == 1
+        assert executor.stats()["failed"] == 1
+
+    def test_stop_waits_for_timer_driven_send(self):
+        """A batch whose window closed should finish before the client does."""
+        delivered: list[object] = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(0.05)
+            delivered.append(json.loads(request.content))
+            return httpx.Response(200)
+
+        executor = ActionExecutor(transport=httpx.MockTransport(handler))
+        hook = _rule("webhook", url="http://hook/a", batch=True, batch_window=0.01)
+
+        async def scenario():
+            await executor.execute(hook, {"n": 1})
+            await asyncio.sleep(0.03)  # window closed, POST in flight
+            await executor.stop()
+            with pytest.raises(RuntimeError):
+                executor.client
+
+        _run(scenario())
+        assert delivered == [[{"n": 1}]]
+        assert executor.stats()["batches"] == 1
+
+    def test_lifespan_opens_and_closes_client(self):
+        """The shared executor's client should follow the app lifespan."""
+        with TestClient(app):
+            assert actions.executor._client is not None
+        assert actions.executor._client is None
@@ -4,13 +4,35 @@
 """Tests for the bot rule engine trigger matching logic."""
 
 import asyncio
+import json
+import threading
+from datetime import UTC, datetime, timedelta
 
 import pytest
+from sqlalchemy import event as sa_event
+from sqlmodel import Session
 
-from server.bot.rules import RuleEngine
+from server.bot import index as bot_index
+from server.bot.index import AhoCorasick, RuleIndex
+from server.bot.limits import RateLimiter
+from server.bot.rules import RuleEngine, rules_version
+from server.bot.stats import TriggerStats
+from server.routers import bot_rules as bot_rules_router
+from server.database import engine as db_engine
 from server.models import BotRule
 
 
+class RecordingExecutor:
+    """Executor stand-in that records fired rule names."""
+
+    def __init__(self) -> None:
+        self.fired: list[str] = []
+
+    async def execute(self, rule: BotRule, event: dict) -> None:
+        """Record *rule* instead of running its action."""
+        self.fired.append(rule.name)
+
+
 class TestRuleMatching:
     """Tests for :meth:`RuleEngine._matches`."""
 
@@ -103,6 +125,339 @@ class TestRuleMatching:
         assert self._run(engine._matches(rule, event)) is False
 
 
+class TestRuleIndex:
+    """Tests for the compiled :class:`RuleIndex`."""
+
+    RULES = [
+        ("adverts", "packet_type", "ADVERT"),
+        ("acks", "packet_type", "ACK"),
+        ("fa", "node_seen", "FA"),
+        ("ping", "keyword", "PING"),
+        ("pong", "keyword", "pong"),
+        ("ping word", "word", "ping"),
+        ("channel", "regex", r"\bch\d+\b"),
+        ("sched", "schedule", "* * * * *"),
+        ("weak fa", "condition", 'source_hash == "FA" and not packet_type'),
+        ("pinged", "condition", '"ping" in text and packet_type != "ACK"'),
+    ]
+
+    EVENTS = [
+        {"data": {"packet_type": "ADVERT", "source_hash": "FA"}},
+        {"data": {"packet_type": "TXT_MSG", "payload_hex": b"a Ping".hex()}},
+        {"data": {"packet_type": "ACK", "payload_hex": "zz"}},
+        {"data": {"source_hash": "BB", "payload_hex": b"ping pong".hex()}},
+        {"data": {"payload_hex": b"pinging on CH42".hex()}},
+        {"data": {"payload_hex": b"ch4x, ping_me".hex()}},
+        {"data": {}},
+    ]
+
+    @pytest.fixture()
+    def rules(self) -> list[BotRule]:
+        """Return unsaved rules with stable IDs."""
+        return [
+            BotRule(id=i, name=name, trigger_type=t, trigger_value=v, action_type="log")
+            for i, (name, t, v) in enumerate(self.RULES, start=1)
+        ]
+
+    @pytest.mark.parametrize("automaton", [False, True])
+    def test_matches_reference_behaviour(
+        self, rules: list[BotRule], automaton: bool, monkeypatch
+    ):
+        """The index should fire exactly the rules ``_matches`` accepts."""
+        if automaton:
+            monkeypatch.setattr(bot_index, "AUTOMATON_MIN_KEYWORDS", 1)
+        index = RuleIndex(rules)
+        reference = RuleEngine()
+        for event in self.EVENTS:
+            expected = [
+                r.name for r in rules if asyncio.run(reference._matches(r, event))
+            ]
+            assert [r.name for r in index.match(event)] == expected
+
+    def test_evaluate_uses_no_queries_until_rules_change(self, client):
+        """Evaluation should hit the DB only to rebuild after a rules write."""
+        client.post(
+            "/api/bot/rules",
+            json={
+                "name": "acks",
+                "trigger_type": "packet_type",
+                "trigger_value": "ACK",
+                "action_type": "log",
+            },
+        )
+        rule_engine, executor = RuleEngine(), RecordingExecutor()
+        event = {"type": "packet", "data": {"packet_type": "ADVERT"}}
+        asyncio.run(rule_engine.evaluate(event, executor))
+
+        statements: list[str] = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        sa_event.listen(db_engine, "before_cursor_execute", record)
+        try:
+            for _ in range(5):
+                asyncio.run(rule_engine.evaluate(event, executor))
+            assert statements == []
+
+            version = rules_version()
+            client.post(
+                "/api/bot/rules",
+                json={
+                    "name": "adverts",
+                    "trigger_type": "packet_type",
+                    "trigger_value": "ADVERT",
+                    "action_type": "log",
+                },
+            )
+            assert rules_version() == version + 1
+            statements.clear()
+            asyncio.run(rule_engine.evaluate(event, executor))
+        finally:
+            sa_event.remove(db_engine, "before_cursor_execute", record)
+        assert any("FROM botrule" in s for s in statements)
+        assert executor.fired == ["adverts"]
+
+    def test_automaton_reports_overlapping_occurrences(self):
+        """Every occurrence should be found, including nested patterns."""
+        automaton = AhoCorasick(["he", "she", "hers", "his", ""])
+        found = {
+            (end, automaton.patterns[i]) for end, i in automaton.iter("ushers")
+        }
+        assert found == {(4, "he"), (4, "she"), (6, "hers")}
+
+    def test_word_rule_checks_every_occurrence(self, monkeypatch):
+        """A bounded occurrence after an unbounded one should still match."""
+        monkeypatch.setattr(bot_index, "AUTOMATON_MIN_KEYWORDS", 1)
+        rule = BotRule(
+            id=1,
+            name="w",
+            trigger_type="word",
+            trigger_value="ping",
+            action_type="log",
+        )
+        event = {"data": {"payload_hex": b"pinging... ping!".hex()}}
+        assert RuleIndex([rule]).match(event) == [rule]
+
+    def test_disabled_rules_are_not_indexed(self):
+        """Disabled rules should never fire."""
+        with Session(db_engine) as session:
+            session.add(
+                BotRule(
+                    name="off",
+                    enabled=False,
+                    trigger_type="packet_type",
+                    trigger_value="ADVERT",
+                    action_type="log",
+                )
+            )
+            session.commit()
+        executor = RecordingExecutor()
+        event = {"data": {"packet_type": "ADVERT"}}
+        asyncio.run(RuleEngine().evaluate(event, executor))
+        assert executor.fired == []
+
+
+class TestTriggerStats:
+    """Tests for batched trigger statistics."""
+
+    @staticmethod
+    def _add_rule(name: str = "acks") -> int:
+        with Session(db_engine) as session:
+            rule = BotRule(
+                name=name,
+                trigger_type="packet_type",
+                trigger_value="ACK",
+                action_type="log",
+            )
+            session.add(rule)
+            session.commit()
+            return rule.id
+
+    def test_firings_are_written_in_one_flush(self):
+        """Matches should only reach the database when flushed."""
+        rule_id = self._add_rule()
+        stats = TriggerStats()
+        engine = RuleEngine(stats=stats)
+        event = {"data": {"packet_type": "ACK"}}
+        for _ in range(3):
+            asyncio.run(engine.evaluate(event, RecordingExecutor()))
+        with Session(db_engine) as session:
+            assert session.get(BotRule, rule_id).trigger_count == 0
+
+        assert stats.flush() == 1
+        assert stats.pending(rule_id) is None
+        with Session(db_engine) as session:
+            rule = session.get(BotRule, rule_id)
+            assert rule.trigger_count == 3
+            assert rule.last_triggered is not None
+        assert stats.flush() == 0
+
+    def test_api_merges_pending_counts(self, client, monkeypatch):
+        """The rules API should report flushed plus pending firings."""
+        rule_id = self._add_rule()
+        stats = TriggerStats()
+        monkeypatch.setattr(bot_rules_router, "trigger_stats", stats)
+        first = datetime(2026, 1, 1, tzinfo=UTC)
+        stats.record(rule_id, first)
+        stats.flush()
+        stats.record(rule_id, first + timedelta(minutes=1))
+        stats.record(rule_id, first + timedelta(minutes=2))
+
+        listed = client.get("/api/bot/rules").json()[0]
+        assert listed["trigger_count"] == 3
+        assert datetime.fromisoformat(listed["last_triggered"]) == first + timedelta(
+            minutes=2
+        )
+        single = client.get(f"/api/bot/rules/{rule_id}").json()
+        assert single["trigger_count"] == 3
+
+    def test_failed_flush_keeps_tallies(self, monkeypatch):
+        """Tallies should survive a failed write and merge with new ones."""
+        stats = TriggerStats()
+        now = datetime.now(UTC)
+        stats.record(1, now)
+
+        def locked():
+            raise RuntimeError("database is locked")
+
+        monkeypatch.setattr("server.bot.stats.get_session", locked)
+        with pytest.raises(RuntimeError):
+            stats.flush()
+        stats.record(1, now)
+        assert stats.pending(1).count == 2
+
+
+    def test_flush_waits_for_running_flush(self, monkeypatch):
+        """A flush should write tallies recorded during an earlier one."""
+        from server.bot import stats as stats_module
+
+        rule_id = self._add_rule()
+        stats = TriggerStats()
+        now = datetime.now(UTC)
+        stats.record(rule_id, now)
+        started, release = threading.Event(), threading.Event()
+        real_get_session = stats_module.get_session
+
+        def slow_session():
+            started.set()
+            release.wait(5)
+            return real_get_session()
+
+        monkeypatch.setattr(stats_module, "get_session", slow_session)
+        first = threading.Thread(target=stats.flush)
+        first.start()
+        started.wait(5)
+        stats.record(rule_id, now)
+        monkeypatch.setattr(stats_module, "get_session", real_get_session)
+        threading.Timer(0.05, release.set).start()
+        assert stats.flush() == 1
+        first.join()
+        with Session(db_engine) as session:
+            assert session.get(BotRule, rule_id).trigger_count == 2
+
+
+class TestRateLimits:
+    """Tests for per-rule cooldowns and token buckets."""
+
+    @staticmethod
+    def _rule(**config) -> BotRule:
+        """Return an unsaved rule with the given limit settings."""
+        return BotRule(
+            id=7,
+            name="limited",
+            trigger_type="packet_type",
+            trigger_value="ADVERT",
+            action_type="send_message",
+            action_config=json.dumps({"message": "hi", **config}),
+        )
+
+    @staticmethod
+    def _event(source: str = "AA") -> dict:
+        """Return an ADVERT event from *source*."""
+        return {"data": {"packet_type": "ADVERT", "source_hash": source}}
+
+    def test_cooldown(self):
+        """A rule should not fire again within its cooldown."""
+        limiter, rule = RateLimiter(), self._rule(cooldown=10)
+        fired = [limiter.allow(rule, self._event(), now=t) for t in (0, 5, 10, 11)]
+        assert fired == [True, False, True, False]
+
+    def test_token_bucket_refills(self):
+        """A burst up to capacity should pass, then one per refill period."""
+        limiter = RateLimiter()
+        rule = self._rule(rate_limit={"capacity": 2, "per": 10})
+        fired = [limiter.allow(rule, self._event(), now=t) for t in (0, 0, 0, 4, 5)]
+        assert fired == [True, True, False, False, True]
+
+    def test_per_source_budgets(self):
+        """With ``limit_by: source`` each node should get its own budget."""
+        limiter = RateLimiter()
+        rule = self._rule(cooldown=60, limit_by="source")
+        assert limiter.allow(rule, self._event("AA"), now=0)
+        assert limiter.allow(rule, self._event("BB"), now=1)
+        assert not limiter.allow(rule, self._event("AA"), now=2)
+
+    def test_budget_map_is_bounded(self):
+        """The least recently used budgets should be evicted past the cap."""
+        limiter = RateLimiter(max_keys=2)
+        rule = self._rule(cooldown=60, limit_by="source")
+        for source in ("AA", "BB", "CC"):
+            limiter.allow(rule, self._event(source), now=0)
+        assert limiter.allow(rule, self._event("AA"), now=1)
+
+    def test_suppressed_firings_are_reported(self, client, monkeypatch):
+        """Suppressed firings should skip the action and show in the API."""
+        resp = client.post(
+            "/api/bot/rules",
+            json={
+                "name": "Adverts",
+                "trigger_type": "packet_type",
+                "trigger_value": "ADVERT",
+                "action_type": "log",
+                "action_config": json.dumps({"cooldown": 3600}),
+            },
+        )
+        stats = TriggerStats()
+        monkeypatch.setattr(bot_rules_router, "trigger_stats", stats)
+        executor = RecordingExecutor()
+        rule_engine = RuleEngine(stats=stats)
+        for _ in range(3):
+            asyncio.run(rule_engine.evaluate(self._event(), executor))
+        assert executor.fired == ["Adverts"]
+
+        data = client.get(f"/api/bot/rules/{resp.json()['id']}").json()
+        assert data["trigger_count"] == 1
+        assert data["suppressed_count"] == 2
+
+    @pytest.mark.parametrize(
+        "config",
+        [
+            '{"cooldown": -1}',
+            '{"rate_limit": {"per": 0}}',
+            '{"limit_by": "x"}',
+            "[]",
+            '{"timeout": "soon"}',
+            '{"timeout": 0}',
+            '{"retries": -1}',
+            '{"backoff": [1]}',
+        ],
+    )
+    def test_invalid_limits_rejected(self, client, config: str):
+        """Malformed limit or retry settings should be refused with 422."""
+        resp = client.post(
+            "/api/bot/rules",
+            json={
+                "name": "Bad",
+                "trigger_type": "packet_type",
+                "trigger_value": "ADVERT",
+                "action_type": "log",
+                "action_config": config,
+            },
+        )
+        assert resp.status_code == 422
+
+
 class TestBotRulesAPI:
     """Tests for the ``/api/bot/rules`` CRUD endpoints."""
 
@@ -174,6 +529,20 @@ class TestBotRulesAPI:
         get_resp = client.get(f"/api/bot/rules/{rule_id}")
         assert get_resp.status_code == 404
 
+    def test_invalid_regex_rejected(self, client):
+        """A regex trigger that does not compile should be refused."""
+        resp = client.post(
+            "/api/bot/rules",
+            json={
+                "name": "Broken",
+                "trigger_type": "regex",
+                "trigger_value": "ch(",
+                "action_type": "log",
+            },
+        )
+        assert resp.status_code == 422
+        assert client.get("/api/bot/rules").json() == []
+
     def test_get_nonexistent_rule(self, client):
         """Requesting a non-existent rule should return 404."""
         resp = client.get("/api/bot/rules/9999")
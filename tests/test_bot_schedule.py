@@ -0,0 +1,191 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Tests for the ``schedule`` trigger and the bot scheduler."""
+
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlmodel import Session
+
+from server.bot.index import RuleIndex
+from server.bot.rules import RuleEngine, notify_rules_changed
+from server.bot.schedule import Scheduler, parse_schedule, run_scheduler
+from server.bot.stats import TriggerStats
+from server.database import engine as db_engine
+from server.models import BotRule
+
+NOON = datetime(2026, 3, 14, 12, 0, 30, tzinfo=UTC)  # a Saturday
+
+
+def _at(*args: int) -> datetime:
+    """Return a UTC datetime."""
+    return datetime(*args, tzinfo=UTC)
+
+
+def _scheduled(rule_id: int, value: str) -> BotRule:
+    """Return an unsaved ``schedule`` rule."""
+    return BotRule(
+        id=rule_id,
+        name=f"s{rule_id}",
+        trigger_type="schedule",
+        trigger_value=value,
+        action_type="log",
+    )
+
+
+class RecordingExecutor:
+    """Executor stand-in that records the events it receives."""
+
+    def __init__(self) -> None:
+        self.events: list[dict] = []
+
+    async def execute(self, rule: BotRule, event: dict) -> None:
+        """Record *event* instead of running the action."""
+        self.events.append(event)
+
+
+class TestParseSchedule:
+    """Tests for :func:`parse_schedule`."""
+
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("*/15 * * * *", _at(2026, 3, 14, 12, 15)),
+            ("0 9 * * *", _at(2026, 3, 15, 9, 0)),
+            ("30 8 * * 1-5", _at(2026, 3, 16, 8, 30)),
+            ("0 0 1 * *", _at(2026, 4, 1)),
+            ("0 12 13 * 0", _at(2026, 3, 15, 12, 0)),
+            ("@hourly", _at(2026, 3, 14, 13, 0)),
+            ("@yearly", _at(2027, 1, 1)),
+            ("0 0 29 2 *", _at(2028, 2, 29)),
+        ],
+    )
+    def test_cron_next_fire(self, value: str, expected: datetime):
+        """Cron expressions should fire at the next matching minute."""
+        assert parse_schedule(value).next_after(NOON) == expected
+
+    def test_intervals(self):
+        """Interval expressions should add their period."""
+        assert parse_schedule("every 1h30m").next_after(NOON) == NOON + timedelta(
+            minutes=90
+        )
+        assert parse_schedule("EVERY 0.5s").next_after(NOON) == NOON + timedelta(
+            milliseconds=500
+        )
+
+    @pytest.mark.parametrize(
+        "value", ["", "every", "every 5x", "* * *", "61 * * * *", "0 0 30 2 *"]
+    )
+    def test_invalid(self, value: str):
+        """Malformed or never-firing expressions should be rejected."""
+        with pytest.raises(ValueError):
+            parse_schedule(value)
+
+
+class TestScheduler:
+    """Tests for :class:`Scheduler`."""
+
+    def test_fires_in_deadline_order(self):
+        """Due rules should come out earliest first and be rescheduled."""
+        scheduler = Scheduler()
+        rules = [_scheduled(1, "every 10s"), _scheduled(2, "every 3s")]
+        scheduler.sync(RuleIndex(rules, version=1), NOON)
+        assert scheduler.next_deadline() == NOON + timedelta(seconds=3)
+
+        fired = []
+        for second in range(11):
+            now = NOON + timedelta(seconds=second)
+            fired += [(r.id, f - NOON) for r, f in scheduler.pop_due(now)]
+        assert fired == [
+            (2, timedelta(seconds=3)),
+            (2, timedelta(seconds=6)),
+            (2, timedelta(seconds=9)),
+            (1, timedelta(seconds=10)),
+        ]
+        assert scheduler.next_deadline() == NOON + timedelta(seconds=12)
+
+    def test_missed_firings_collapse(self):
+        """A long pause should yield one firing, not a burst."""
+        scheduler = Scheduler()
+        scheduler.sync(RuleIndex([_scheduled(1, "every 1s")], version=1), NOON)
+        due = scheduler.pop_due(NOON + timedelta(hours=1))
+        assert len(due) == 1
+        assert scheduler.next_deadline() == NOON + timedelta(hours=1, seconds=1)
+
+    def test_edits_reschedule_only_changed_rules(self):
+        """Unchanged rules should keep their deadline across a rebuild."""
+        scheduler = Scheduler()
+        scheduler.sync(
+            RuleIndex([_scheduled(1, "every 10s"), _scheduled(2, "every 20s")], 1),
+            NOON,
+        )
+        later = NOON + timedelta(seconds=5)
+        scheduler.sync(
+            RuleIndex([_scheduled(1, "every 10s"), _scheduled(2, "every 1s")], 2),
+            later,
+        )
+        assert scheduler.next_deadline() == later + timedelta(seconds=1)
+        fired = []
+        for second in range(6, 11):
+            now = NOON + timedelta(seconds=second)
+            fired += [(r.id, f) for r, f in scheduler.pop_due(now)]
+        assert (1, NOON + timedelta(seconds=10)) in fired
+        assert [f for rule_id, f in fired if rule_id == 2] == [
+            later + timedelta(seconds=n) for n in range(1, 6)
+        ]
+
+        scheduler.sync(RuleIndex([], 3), later)
+        assert len(scheduler) == 0
+        assert scheduler.next_deadline() is None
+
+
+class TestRunScheduler:
+    """Tests for the scheduler task."""
+
+    def test_fires_and_picks_up_new_rules(self):
+        """Rules added while running should be scheduled without a restart."""
+        executor = RecordingExecutor()
+        stats = TriggerStats()
+
+        async def scenario():
+            task = asyncio.create_task(
+                run_scheduler(RuleEngine(stats=stats), executor)
+            )
+            await asyncio.sleep(0.05)
+            assert executor.events == []
+            with Session(db_engine) as session:
+                rule = BotRule(
+                    name="tick",
+                    trigger_type="schedule",
+                    trigger_value="every 0.05s",
+                    action_type="log",
+                )
+                session.add(rule)
+                session.commit()
+                rule_id = rule.id
+            await notify_rules_changed()
+            await asyncio.sleep(0.18)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return rule_id
+
+        rule_id = asyncio.run(scenario())
+        assert 2 <= len(executor.events) <= 4
+        assert executor.events[0]["type"] == "schedule"
+        assert executor.events[0]["data"]["rule_id"] == rule_id
+        assert stats.pending(rule_id).count == len(executor.events)
+
+    def test_invalid_schedule_rejected_by_api(self, client):
+        """The rules API should refuse schedules that cannot be parsed."""
+        resp = client.post(
+            "/api/bot/rules",
+            json={
+                "name": "Never",
+                "trigger_type": "schedule",
+                "trigger_value": "0 0 31 4 *",
+                "action_type": "log",
+            },
+        )
+        assert resp.status_code == 422
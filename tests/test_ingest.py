@@ -31,6 +31,21 @@ class TestIngestPackets:
         assert resp.status_code == 200
         assert resp.json()["saved"] == 1
 
+    def test_publish_failure_after_commit_is_not_an_error(
+        self, client: TestClient, auth_headers: dict, monkeypatch
+    ):
+        """A committed batch should be acknowledged even if fan-out fails."""
+        from server import pubsub
+
+        async def broken(channel, message):
+            raise ConnectionError("broker down")
+
+        monkeypatch.setattr(pubsub.backend, "publish", broken)
+        packet = {"packet_hash": "pub001", "packet_type": "ADVERT"}
+        resp = client.post("/ingest/packets", json=[packet], headers=auth_headers)
+        assert resp.status_code == 200
+        assert resp.json()["saved"] == 1
+
     def test_dedup_packets(self, client: TestClient, auth_headers: dict):
         """Duplicate packet_hash values should be silently skipped."""
         payload = [
@@ -111,3 +126,73 @@ class TestIngestNeighbors:
         )
         resp = client.get("/api/nodes/DD")
         assert resp.status_code == 200
+
+
+class TestIngestNeighborDeltas:
+    """Tests for ``POST /ingest/neighbors/delta``."""
+
+    @staticmethod
+    def _edges() -> dict[str, tuple]:
+        """Return stored edges of ``local`` as ``{hash: (rssi, count)}``."""
+        from sqlmodel import Session, select
+
+        from server.database import engine
+        from server.models import Neighbor
+
+        with Session(engine) as session:
+            rows = session.exec(
+                select(Neighbor).where(Neighbor.node_hash == "local")
+            ).all()
+            return {r.neighbor_hash: (r.rssi, r.observation_count) for r in rows}
+
+    def test_deltas_update_one_row_per_edge(
+        self, client: TestClient, auth_headers: dict
+    ):
+        """Upserts update edges in place and removals delete them."""
+        client.post(
+            "/ingest/neighbors",
+            json=[{"neighbor_hash": "AA", "rssi": -70}] * 2,
+            headers=auth_headers,
+        )
+        resp = client.post(
+            "/ingest/neighbors/delta",
+            json=[
+                {
+                    "upserts": [
+                        {"neighbor_hash": "AA", "rssi": -60},
+                        {"hash": "BB", "rssi": -90, "snr": 3.0},
+                    ]
+                },
+                {"upserts": [{"hash": "BB", "rssi": -80}], "removed": ["AA", "ZZ"]},
+            ],
+            headers=auth_headers,
+        )
+        assert resp.json() == {"ok": True, "upserted": 3, "removed": 1}
+        assert self._edges() == {"BB": (-80, 2)}
+        assert client.get("/api/nodes/BB").json()["last_rssi"] == -80
+
+    def test_full_sync_removes_unlisted_edges(
+        self, client: TestClient, auth_headers: dict
+    ):
+        """A full delta should leave exactly the listed neighbors."""
+        client.post(
+            "/ingest/neighbors/delta",
+            json=[{"upserts": [{"hash": "AA"}, {"hash": "BB"}, {"hash": "CC"}]}],
+            headers=auth_headers,
+        )
+        resp = client.post(
+            "/ingest/neighbors/delta",
+            json=[{"full": True, "upserts": [{"hash": "BB", "rssi": -75}]}],
+            headers=auth_headers,
+        )
+        assert resp.json()["removed"] == 2
+        assert self._edges() == {"BB": (-75, 2)}
+
+    def test_requires_api_key(self, client: TestClient):
+        """Deltas should be refused without the ingest key."""
+        resp = client.post(
+            "/ingest/neighbors/delta",
+            json=[],
+            headers={"X-API-Key": "wrong"},
+        )
+        assert resp.status_code == 403
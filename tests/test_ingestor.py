@@ -0,0 +1,626 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Tests for the pyMC_Repeater ingestor."""
+
+import asyncio
+import functools
+import json
+import sqlite3
+import time
+
+import httpx
+import pytest
+
+from ingestor import mc_ingestor
+from ingestor.mc_ingestor import (
+    AdaptiveInterval,
+    BatchQueue,
+    MCIngestor,
+    NeighborTracker,
+    SeenPackets,
+    Spool,
+)
+
+from .fake_repeater import FakeRepeater
+
+CONFIG = {
+    "repeater": {"url": "http://repeater"},
+    "monitor": {"url": "http://monitor", "api_key": "testkey"},
+}
+
+
+def _run(coro):
+    """Run *coro* to completion on a fresh event loop."""
+    return asyncio.run(coro)
+
+
+class TestBatchQueue:
+    """Tests for :class:`BatchQueue`."""
+
+    def test_full_batch_is_released_immediately(self):
+        """A batch should be ready as soon as it reaches ``max_size``."""
+
+        async def scenario():
+            queue = BatchQueue(max_size=3, max_age=60)
+            for i in range(4):
+                queue.put("packets", {"n": i})
+            return await asyncio.wait_for(queue.get_batch(), 1), len(queue)
+
+        (endpoint, batch), remaining = _run(scenario())
+        assert endpoint == "packets"
+        assert [r["n"] for r in batch] == [0, 1, 2]
+        assert remaining == 1
+
+    def test_partial_batch_is_released_by_age(self):
+        """A partial batch should be sent once its oldest record is old enough."""
+
+        async def scenario():
+            queue = BatchQueue(max_size=100, max_age=0.05)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            queue.put("neighbors", {"n": 1})
+            endpoint, batch = await asyncio.wait_for(queue.get_batch(), 1)
+            return endpoint, batch, loop.time() - start
+
+        endpoint, batch, waited = _run(scenario())
+        assert (endpoint, batch) == ("neighbors", [{"n": 1}])
+        assert 0.04 <= waited < 0.5
+
+    def test_overflow_drops_oldest_of_same_endpoint(self):
+        """A full queue should drop the oldest record of the growing endpoint."""
+        queue = BatchQueue(capacity=3)
+        queue.put("neighbors", {"n": "a"})
+        for i in range(4):
+            queue.put("packets", {"n": i})
+        assert len(queue) == 3
+        assert queue.dropped == 2
+        assert [r["n"] for r in queue._take("packets")] == [2, 3]
+        assert [r["n"] for r in queue._take("neighbors")] == ["a"]
+
+    def test_overflow_reports_dropped_endpoint(self):
+        """``on_drop`` should hear about every discarded record."""
+        dropped: list[str] = []
+        queue = BatchQueue(capacity=1, on_drop=dropped.append)
+        queue.put("neighbors/delta", {"n": 1})
+        queue.put("neighbors/delta", {"n": 2})
+        assert dropped == ["neighbors/delta"]
+
+
+class TestSeenPackets:
+    """Tests for the bounded :class:`SeenPackets` dedup filter."""
+
+    def test_no_false_negatives_and_fp_rate_near_target(self):
+        """Seen keys are always caught; unseen ones rarely are."""
+        seen = SeenPackets(memory_bytes=64 * 1024, fp_rate=0.01)
+        keys = [f"pkt-{i}" for i in range(seen.capacity)]
+        added = [key for key in keys if seen.add_if_new(key)]
+        assert len(added) > 0.99 * len(keys)
+        assert not any(seen.add_if_new(key) for key in added)
+        trials = 20000
+        false_hits = sum(not seen.add_if_new(f"new-{i}") for i in range(trials))
+        assert false_hits / trials < 0.03
+
+    def test_memory_is_bounded_by_rotation(self):
+        """Keys should be forgotten after two rotations, never accumulated."""
+        seen = SeenPackets(memory_bytes=1024, fp_rate=0.01)
+        assert seen.add_if_new("old")
+        for i in range(3 * seen.capacity):
+            seen.add_if_new(f"filler-{i}")
+        assert seen.add_if_new("old")
+
+    def test_window_expiry(self, monkeypatch):
+        """A key should be remembered for one window and expire after two."""
+        now = [1000.0]
+        monkeypatch.setattr(mc_ingestor.time, "time", lambda: now[0])
+        seen = SeenPackets(memory_bytes=1024, window=60)
+        assert seen.add_if_new("a")
+        now[0] += 61
+        assert not seen.add_if_new("a")
+        now[0] += 61
+        assert seen.add_if_new("a")
+
+    def test_persists_across_restarts(self, tmp_path):
+        """Saved filters should be restored, and ignored if resized."""
+        path = str(tmp_path / "seen.bin")
+        seen = SeenPackets(memory_bytes=4096, path=path)
+        seen.add_if_new("abc")
+        seen.save()
+        assert not SeenPackets(memory_bytes=4096, path=path).add_if_new("abc")
+        assert SeenPackets(memory_bytes=8192, path=path).add_if_new("abc")
+
+    def test_stale_state_expires_on_load(self, tmp_path, monkeypatch):
+        """State older than two windows should not suppress packets."""
+        path = str(tmp_path / "seen.bin")
+        seen = SeenPackets(memory_bytes=4096, window=60, path=path)
+        seen.add_if_new("abc")
+        seen.save()
+        later = time.time() + 121
+        monkeypatch.setattr(mc_ingestor.time, "time", lambda: later)
+        assert SeenPackets(memory_bytes=4096, window=60, path=path).add_if_new("abc")
+
+    def test_rejects_bad_fp_rate(self):
+        """A false-positive target outside (0, 1) should be refused."""
+        with pytest.raises(ValueError):
+            SeenPackets(fp_rate=1.5)
+
+
+class TestIncrementalPolling:
+    """Tests for cursor-based packet polling."""
+
+    @staticmethod
+    def _poll(ingestor: MCIngestor, repeater: FakeRepeater) -> list[dict]:
+        """Run one packet poll against *repeater*."""
+
+        async def poll():
+            async with httpx.AsyncClient(transport=repeater.transport()) as client:
+                return await ingestor.poll_packets(client)
+
+        return _run(poll())
+
+    def test_requests_only_newer_packets(self):
+        """After the first poll only packets from the cursor on are fetched."""
+        repeater = FakeRepeater()
+        ingestor = MCIngestor(CONFIG)
+        repeater.emit(50)
+        assert len(self._poll(ingestor, repeater)) == 50
+        assert "since" not in repeater.packet_requests()[-1].url.params
+        cursor = ingestor.repeaters[0].cursor
+        assert cursor == repeater.packets[-1]["timestamp"]
+
+        new_hashes = [p["hash"] for p in repeater.emit(3)]
+        new = self._poll(ingestor, repeater)
+        assert [p["packet_hash"] for p in new] == new_hashes
+        assert repeater.packet_requests()[-1].url.params["since"] == cursor
+        assert ingestor.repeaters[0].incremental is True
+        assert self._poll(ingestor, repeater) == []
+
+    def test_falls_back_when_cursor_is_ignored(self):
+        """A repeater ignoring the cursor should get plain full fetches."""
+        repeater = FakeRepeater(supports_since=False)
+        ingestor = MCIngestor(CONFIG)
+        repeater.emit(5)
+        self._poll(ingestor, repeater)
+        repeater.emit(2)
+        assert len(self._poll(ingestor, repeater)) == 2
+        assert ingestor.repeaters[0].incremental is False
+        self._poll(ingestor, repeater)
+        assert "since" not in repeater.packet_requests()[-1].url.params
+
+    def test_falls_back_when_cursor_is_rejected(self):
+        """A 4xx answer to the cursor should be retried as a full fetch."""
+        repeater = FakeRepeater()
+        ingestor = MCIngestor(CONFIG)
+        repeater.emit(2)
+        self._poll(ingestor, repeater)
+        handler = repeater.handler
+
+        def strict(request: httpx.Request) -> httpx.Response:
+            if "since" in request.url.params:
+                repeater.requests.append(request)
+                return httpx.Response(400)
+            return handler(request)
+
+        repeater.handler = strict
+        repeater.emit(1)
+        assert len(self._poll(ingestor, repeater)) == 1
+        assert ingestor.repeaters[0].incremental is False
+
+    def test_adaptive_interval(self):
+        """Busy polls should shorten the interval, idle ones lengthen it."""
+        interval = AdaptiveInterval(5, 1, 30)
+        assert [interval.update(n) for n in (3, 3, 3)] == [2.5, 1.25, 1]
+        for _ in range(20):
+            interval.update(0)
+        assert interval.current == 30
+        with pytest.raises(ValueError):
+            AdaptiveInterval(5, 0, 30)
+
+
+class TestMultipleRepeaters:
+    """Tests for polling several repeaters from one ingestor."""
+
+    CONFIG = {
+        "repeaters": [
+            {"name": "lobby", "url": "http://lobby", "node_hash": "A1"},
+            {"name": "roof", "url": "http://roof", "node_hash": "B2"},
+        ],
+        "monitor": CONFIG["monitor"],
+    }
+
+    @staticmethod
+    def _client(repeaters: dict[str, FakeRepeater]) -> httpx.AsyncClient:
+        """Return a client routing each host to its fake repeater."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return repeaters[request.url.host].handler(request)
+
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    def test_packets_are_merged_deduped_and_tagged(self):
+        """Packets heard by both repeaters should be forwarded once."""
+        lobby, roof = FakeRepeater(), FakeRepeater()
+        lobby.emit(3)
+        roof.emit(5)
+        ingestor = MCIngestor(self.CONFIG)
+
+        async def poll():
+            async with self._client({"lobby": lobby, "roof": roof}) as client:
+                return await ingestor.poll_packets(client)
+
+        packets = _run(poll())
+        assert [p["packet_hash"] for p in packets] == [
+            f"pkt{n:06d}" for n in range(1, 6)
+        ]
+        tags = [json.loads(p["raw_json"])["repeater"] for p in packets]
+        assert tags == ["lobby"] * 3 + ["roof"] * 2
+        assert [r.cursor for r in ingestor.repeaters] == [
+            lobby.packets[-1]["timestamp"],
+            roof.packets[-1]["timestamp"],
+        ]
+
+    def test_failing_repeater_does_not_block_others(self):
+        """An unreachable repeater should be skipped for the cycle."""
+        roof = FakeRepeater()
+        roof.emit(2)
+        roof.neighbors = [{"hash": "CC", "rssi": -70}]
+        ingestor = MCIngestor(self.CONFIG)
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "lobby":
+                raise httpx.ConnectError("unreachable", request=request)
+            return roof.handler(request)
+
+        async def poll():
+            async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)
+            ) as client:
+                return (
+                    await ingestor.poll_packets(client),
+                    await ingestor.poll_neighbor_delta(client),
+                )
+
+        packets, deltas = _run(poll())
+        assert len(packets) == 2
+        assert [d["node_hash"] for d in deltas] == ["B2"]
+
+    def test_neighbor_deltas_per_repeater(self):
+        """Each repeater's neighbor table should be tracked separately."""
+        lobby, roof = FakeRepeater(), FakeRepeater()
+        lobby.neighbors = [{"hash": "CC", "rssi": -70}]
+        roof.neighbors = [{"hash": "CC", "rssi": -95}]
+        ingestor = MCIngestor(self.CONFIG)
+
+        async def poll():
+            async with self._client({"lobby": lobby, "roof": roof}) as client:
+                first = await ingestor.poll_neighbor_delta(client)
+                roof.neighbors = []
+                return first, await ingestor.poll_neighbor_delta(client)
+
+        first, second = _run(poll())
+        assert [(d["node_hash"], d["full"]) for d in first] == [
+            ("A1", True),
+            ("B2", True),
+        ]
+        assert second == [
+            {"node_hash": "B2", "full": False, "upserts": [], "removed": ["CC"]}
+        ]
+
+    def test_rejects_shared_node_hash(self):
+        """Repeaters must not report neighbors under the same node."""
+        config = {
+            **self.CONFIG,
+            "repeaters": [
+                {"name": "lobby", "url": "http://lobby"},
+                {"name": "roof", "url": "http://roof"},
+            ],
+        }
+        with pytest.raises(ValueError, match="node_hash"):
+            MCIngestor(config)
+
+
+class TestNeighborTracker:
+    """Tests for delta neighbor uploads."""
+
+    def test_sends_only_material_changes(self, monkeypatch):
+        """Small signal jitter is ignored; changes, arrivals and losses are not."""
+        now = [0.0]
+        monkeypatch.setattr(mc_ingestor.time, "monotonic", lambda: now[0])
+        tracker = NeighborTracker(rssi_threshold=5, snr_threshold=2, full_sync=600)
+        table = [
+            {"hash": "AA", "rssi": -80, "snr": 5.0},
+            {"hash": "BB", "rssi": -90, "snr": 1.0},
+        ]
+        first = tracker.diff(table)
+        assert first["full"] and len(first["upserts"]) == 2
+
+        jitter = [
+            {"hash": "AA", "rssi": -83, "snr": 6.0},
+            {"hash": "BB", "rssi": -90, "snr": 2.5},
+        ]
+        assert tracker.diff(jitter) is None
+
+        drifted = [
+            {"hash": "AA", "rssi": -85, "snr": 6.0},
+            {"hash": "CC", "rssi": -70},
+        ]
+        delta = tracker.diff(drifted)
+        assert not delta["full"]
+        assert [n["hash"] for n in delta["upserts"]] == ["AA", "CC"]
+        assert delta["removed"] == ["BB"]
+        assert tracker.diff(drifted) is None
+
+        now[0] += 600
+        resync = tracker.diff(drifted)
+        assert resync["full"] and len(resync["upserts"]) == 2
+
+    def test_drift_is_measured_from_last_upload(self, monkeypatch):
+        """Slow drift should be sent once it adds up past the threshold."""
+        monkeypatch.setattr(mc_ingestor.time, "monotonic", lambda: 0.0)
+        tracker = NeighborTracker(rssi_threshold=5, full_sync=600)
+        tracker.diff([{"hash": "AA", "rssi": -80}])
+        assert tracker.diff([{"hash": "AA", "rssi": -83}]) is None
+        assert tracker.diff([{"hash": "AA", "rssi": -85}]) is not None
+
+    def test_lost_delta_forces_full_sync(self):
+        """A delta the monitor rejects should be followed by the full table."""
+        repeater = FakeRepeater()
+        posted: list[dict] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "repeater":
+                return repeater.handler(request)
+            posted.extend(json.loads(request.content))
+            return httpx.Response(400 if len(posted) == 2 else 200)
+
+        async def scenario():
+            ingestor = MCIngestor(CONFIG)
+            async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)
+            ) as client:
+                for table in ([{"hash": "AA", "rssi": -80}], [], []):
+                    repeater.neighbors = table
+                    for delta in await ingestor.poll_neighbor_delta(client):
+                        await ingestor._send_batch(client, "neighbors/delta", [delta])
+
+        _run(scenario())
+        assert [(d["full"], d["removed"]) for d in posted] == [
+            (True, []),
+            (False, ["AA"]),
+            (True, []),
+        ]
+
+
+class TestSpool:
+    """Tests for the on-disk :class:`Spool`."""
+
+    def test_fifo_per_endpoint_and_ack(self, tmp_path):
+        """Records come back oldest first, grouped by endpoint, until acked."""
+        spool = Spool(str(tmp_path / "spool.db"))
+        spool.append("packets", [{"n": 1}, {"n": 2}])
+        spool.append("neighbors", [{"n": "a"}])
+        spool.append("packets", [{"n": 3}])
+        endpoint, last_id, records = spool.oldest(2)
+        assert (endpoint, records) == ("packets", [{"n": 1}, {"n": 2}])
+        spool.ack(endpoint, last_id)
+        assert spool.oldest(10)[::2] == ("neighbors", [{"n": "a"}])
+        assert len(spool) == 2
+
+    def test_survives_reopen(self, tmp_path):
+        """Unacknowledged records should still be there after a restart."""
+        path = str(tmp_path / "spool.db")
+        spool = Spool(path)
+        spool.append("packets", [{"n": 1}])
+        spool.close()
+        reopened = Spool(path)
+        assert len(reopened) == 1 and reopened.bytes == len('{"n": 1}')
+        assert reopened.oldest(5)[2] == [{"n": 1}]
+
+    def test_disk_budget_drops_oldest(self, tmp_path):
+        """Exceeding ``max_bytes`` should discard the oldest records."""
+        spool = Spool(str(tmp_path / "spool.db"), max_bytes=100)
+        for i in range(20):
+            spool.append("packets", [{"n": i}])
+        assert spool.bytes <= 100
+        assert spool.dropped == 20 - len(spool)
+        records = spool.oldest(100)[2]
+        assert records[-1] == {"n": 19}
+        assert records[0] == {"n": 20 - len(spool)}
+
+
+class TestIngestorLoops:
+    """Tests for the decoupled poll and send loops."""
+
+    def test_slow_monitor_does_not_delay_polling(self):
+        """Polls should keep their own intervals while a POST is stalled."""
+        calls = {"packets": 0, "neighbors": 0}
+        posted: list[str] = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "repeater":
+                kind = request.url.path.rsplit("/", 1)[-1]
+                calls[kind] += 1
+                n = calls[kind]
+                if kind == "packets":
+                    return httpx.Response(200, json=[{"hash": f"p{n}"}])
+                return httpx.Response(200, json=[{"hash": "AB", "rssi": -80}])
+            await asyncio.sleep(0.2)
+            posted.append(request.url.path)
+            return httpx.Response(200, json={"ok": True})
+
+        async def scenario():
+            ingestor = MCIngestor(
+                {
+                    **CONFIG,
+                    "poll_interval_seconds": 0.02,
+                    "neighbor_interval_seconds": 0.1,
+                    "batch": {"max_size": 50, "max_age_seconds": 0.01},
+                }
+            )
+            async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)
+            ) as client:
+                tasks = [
+                    asyncio.create_task(
+                        ingestor.poll_loop(
+                            "packets",
+                            lambda: ingestor.poll_packets(client),
+                            ingestor.poll_interval,
+                        )
+                    ),
+                    asyncio.create_task(
+                        ingestor.poll_loop(
+                            "neighbors/delta",
+                            lambda: ingestor.poll_neighbor_delta(client),
+                            ingestor.neighbor_interval,
+                        )
+                    ),
+                    asyncio.create_task(ingestor.send_loop(client)),
+                ]
+                await asyncio.sleep(0.3)
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        _run(scenario())
+        # One stalled POST at a time, yet packet polls kept their pace.
+        assert calls["packets"] >= 10
+        assert 2 <= calls["neighbors"] <= 4
+        assert 1 <= len(posted) <= 2
+
+    def test_outage_is_spooled_and_drained(self, tmp_path):
+        """Records polled while the monitor is down should arrive later, in order."""
+        repeater = FakeRepeater()
+        received: list[str] = []
+        monitor_up = False
+        sizes: list[int] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "repeater":
+                return repeater.handler(request)
+            if not monitor_up:
+                return httpx.Response(503)
+            batch = json.loads(request.content)
+            sizes.append(len(batch))
+            received.extend(p["packet_hash"] for p in batch)
+            return httpx.Response(200, json={"saved": len(batch)})
+
+        async def scenario():
+            nonlocal monitor_up
+            ingestor = MCIngestor(
+                {
+                    **CONFIG,
+                    "poll_interval_seconds": 0.01,
+                    "neighbor_interval_seconds": 60,
+                    "batch": {"max_size": 5, "max_age_seconds": 0.01},
+                    "spool": {"path": str(tmp_path / "spool.db")},
+                }
+            )
+            async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)
+            ) as client:
+                tasks = [
+                    asyncio.create_task(
+                        ingestor.poll_loop(
+                            "packets",
+                            lambda: ingestor.poll_packets(client),
+                            ingestor.poll_interval,
+                        )
+                    ),
+                    asyncio.create_task(ingestor.send_loop(client)),
+                ]
+                for _ in range(10):
+                    repeater.emit(4)
+                    await asyncio.sleep(0.02)
+                await asyncio.sleep(0.05)
+                backlog = len(ingestor.spool)
+                monitor_up = True
+                ingestor._retry_at = 0
+                for _ in range(100):
+                    await asyncio.sleep(0.01)
+                    if len(received) == 40:
+                        break
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                return backlog
+
+        backlog = _run(scenario())
+        assert backlog == 40
+        assert received == [f"pkt{n:06d}" for n in range(1, 41)]
+        assert max(sizes) == 40
+
+    def test_spool_errors_do_not_stop_sending(self, tmp_path):
+        """A failing spool should fall back to direct sends, not exit."""
+        received: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            received.extend(p["packet_hash"] for p in json.loads(request.content))
+            return httpx.Response(200, json={"saved": 0})
+
+        async def scenario():
+            ingestor = MCIngestor(
+                {
+                    **CONFIG,
+                    "batch": {"max_size": 2, "max_age_seconds": 0.01},
+                    "spool": {"path": str(tmp_path / "spool.db")},
+                }
+            )
+
+            def disk_full(*args):
+                raise sqlite3.OperationalError("database or disk is full")
+
+            ingestor.spool.append = disk_full
+            ingestor.spool.oldest = disk_full
+            async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)
+            ) as client:
+                task = asyncio.create_task(ingestor.send_loop(client))
+                ingestor.outbox.put("packets", {"packet_hash": "a"})
+                ingestor.outbox.put("packets", {"packet_hash": "b"})
+                await asyncio.sleep(0.05)
+                alive = not task.done()
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                return alive, ingestor._retry_delay
+
+        alive, retry_delay = _run(scenario())
+        assert alive
+        assert received == ["a", "b"]
+        assert retry_delay >= 1.0
+
+    def test_partial_batch_survives_restart(self, tmp_path, monkeypatch):
+        """Records queued in memory at shutdown should be spooled, not lost."""
+        repeater = FakeRepeater()
+        repeater.emit(3)
+        config = {
+            **CONFIG,
+            "batch": {"max_size": 100, "max_age_seconds": 60},
+            "dedup": {"path": str(tmp_path / "seen.bin")},
+            "spool": {"path": str(tmp_path / "spool.db")},
+        }
+        monkeypatch.setattr(
+            mc_ingestor.httpx,
+            "AsyncClient",
+            functools.partial(httpx.AsyncClient, transport=repeater.transport()),
+        )
+
+        async def scenario():
+            ingestor = MCIngestor(config)
+            task = asyncio.create_task(ingestor.run())
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if len(ingestor.outbox) == 3:
+                    break
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        _run(scenario())
+        restarted = MCIngestor(config)
+        endpoint, _, records = restarted.spool.oldest(10)
+        assert endpoint == "packets"
+        assert [r["packet_hash"] for r in records] == [
+            p["hash"] for p in repeater.packets
+        ]
+        assert not restarted.seen_packets.add_if_new(repeater.packets[0]["hash"])
+        restarted.spool.close()
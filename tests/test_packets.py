@@ -0,0 +1,151 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Tests for the packet query and export endpoints."""
+
+import csv
+import io
+import json
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from server.database import create_db, engine
+from server.models import Packet
+
+
+@pytest.fixture()
+def stored_packets() -> list[int]:
+    """Persist a small mixed set of packets one hour apart.
+
+    Returns:
+        The packet IDs in insertion order.
+    """
+    base = datetime(2026, 1, 1, tzinfo=UTC)
+    with Session(engine) as session:
+        packets = [
+            Packet(
+                packet_hash=f"p{i}",
+                packet_type="ADVERT" if i % 2 == 0 else "TXT_MSG",
+                source_hash="FA",
+                received_at=base + timedelta(hours=i),
+            )
+            for i in range(5)
+        ]
+        session.add_all(packets)
+        session.commit()
+        return [pkt.id for pkt in packets]
+
+
+class TestExportPackets:
+    """Tests for ``GET /api/packets/export``."""
+
+    def test_ndjson_streams_all_rows_in_chunks(
+        self, client: TestClient, stored_packets: list[int]
+    ):
+        """NDJSON export should return every row in id order across chunks."""
+        resp = client.get("/api/packets/export", params={"chunk_size": 2})
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in resp.text.splitlines()]
+        assert [r["id"] for r in rows] == stored_packets
+
+    def test_filters_and_cursor(self, client: TestClient, stored_packets: list[int]):
+        """Type, time-range and cursor filters should combine."""
+        resp = client.get(
+            "/api/packets/export",
+            params={
+                "packet_type": "ADVERT",
+                "since": "2026-01-01T01:00:00Z",
+                "cursor": stored_packets[2],
+            },
+        )
+        rows = [json.loads(line) for line in resp.text.splitlines()]
+        assert [r["packet_hash"] for r in rows] == ["p4"]
+
+    def test_csv_has_header(self, client: TestClient, stored_packets: list[int]):
+        """CSV export should include a header row followed by each packet."""
+        resp = client.get(
+            "/api/packets/export", params={"format": "csv", "chunk_size": 3}
+        )
+        assert resp.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(resp.text)))
+        assert len(rows) == len(stored_packets)
+        assert rows[0]["packet_hash"] == "p0"
+
+    def test_csv_empty_export(self, client: TestClient):
+        """An empty export should still contain the CSV header."""
+        resp = client.get("/api/packets/export", params={"format": "csv"})
+        assert resp.text.strip().startswith("id,")
+
+
+class TestSearchPackets:
+    """Tests for ``GET /api/packets/search``."""
+
+    @pytest.fixture()
+    def ingested(self, client: TestClient, auth_headers: dict) -> None:
+        """Ingest a few packets with cleartext and binary payloads."""
+        payloads = {
+            "s1": "ping from the hilltop",
+            "s2": "weather report: ping ok",
+            "s3": "nothing to see",
+        }
+        body = [
+            {"packet_hash": h, "payload_hex": text.encode().hex()}
+            for h, text in payloads.items()
+        ]
+        body.append({"packet_hash": "bin", "payload_hex": "ff00fe70696e67"})
+        client.post("/ingest/packets", json=body, headers=auth_headers)
+
+    def test_search_matches_terms(self, client: TestClient, ingested):
+        """Only packets containing every term should be returned."""
+        resp = client.get("/api/packets/search", params={"q": "ping"})
+        assert resp.status_code == 200
+        hashes = {hit["packet_hash"] for hit in resp.json()}
+        assert hashes == {"s1", "s2"}
+        assert "[ping]" in resp.json()[0]["snippet"]
+
+        resp = client.get("/api/packets/search", params={"q": "ping hill*"})
+        assert [hit["packet_hash"] for hit in resp.json()] == ["s1"]
+
+    def test_search_pagination(self, client: TestClient, ingested):
+        """limit and offset should page through the ranked hits."""
+        first = client.get("/api/packets/search", params={"q": "ping", "limit": 1})
+        second = client.get(
+            "/api/packets/search", params={"q": "ping", "limit": 1, "offset": 1}
+        )
+        assert len(first.json()) == len(second.json()) == 1
+        assert first.json()[0]["id"] != second.json()[0]["id"]
+
+    def test_punctuation_is_not_fts_syntax(self, client: TestClient, ingested):
+        """Operator characters in the query should not cause errors."""
+        resp = client.get("/api/packets/search", params={"q": 'report: "ping'})
+        assert resp.status_code == 200
+
+    def test_deleted_packets_leave_index(self, client: TestClient, ingested):
+        """Deleting a packet row should remove it from search results."""
+        with Session(engine) as session:
+            pkt = session.exec(select(Packet).where(Packet.packet_hash == "s1")).one()
+            session.delete(pkt)
+            session.commit()
+        resp = client.get("/api/packets/search", params={"q": "ping"})
+        assert [hit["packet_hash"] for hit in resp.json()] == ["s2"]
+
+    def test_packets_stored_before_index_are_backfilled(self, client: TestClient):
+        """Creating the index on an existing database should index old rows."""
+        with Session(engine) as session:
+            session.connection().exec_driver_sql("DROP TABLE packet_fts")
+            session.add_all(
+                [
+                    Packet(packet_hash="old", payload_hex=b"ping from 2025".hex()),
+                    Packet(packet_hash="enc", payload_hex="ff00fe70696e67"),
+                    Packet(packet_hash="none"),
+                ]
+            )
+            session.commit()
+        create_db()
+        create_db()
+        resp = client.get("/api/packets/search", params={"q": "ping"})
+        assert [hit["packet_hash"] for hit in resp.json()] == ["old"]
@@ -0,0 +1,268 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Tests for the pub/sub backends and bot leader election."""
+
+import asyncio
+
+import pytest
+
+from server import pubsub
+from server.bot import worker
+from server.bot.event_queue import BotEventQueue
+from server.bot.index import RuleIndex
+from server.bot.leader import FileLock
+from server.models import BotRule
+from server.pubsub import (
+    BroadcastBackend,
+    MemoryBackend,
+    RedisBackend,
+    create_backend,
+)
+
+
+def _run(coro):
+    """Helper to run a coroutine synchronously."""
+    return asyncio.run(coro)
+
+
+class TestMemoryBackend:
+    """Tests for :class:`MemoryBackend`."""
+
+    def test_publish_reaches_channel_subscribers_only(self):
+        """Messages should reach handlers of their own channel."""
+        received: list[tuple[str, dict]] = []
+
+        async def scenario():
+            backend = MemoryBackend()
+
+            async def on_a(msg):
+                received.append(("a", msg))
+
+            async def on_b(msg):
+                received.append(("b", msg))
+
+            backend.subscribe("a", on_a)
+            unsubscribe = backend.subscribe("b", on_b)
+            await backend.publish("a", {"n": 1})
+            unsubscribe()
+            await backend.publish("b", {"n": 2})
+
+        _run(scenario())
+        assert received == [("a", {"n": 1})]
+
+    def test_sequence_blocks_are_contiguous(self):
+        """next_seq should reserve consecutive, increasing blocks."""
+
+        async def scenario():
+            backend = MemoryBackend()
+            return await backend.next_seq(3), await backend.next_seq(1)
+
+        first, second = _run(scenario())
+        assert second == first + 1
+
+    def test_unknown_scheme_rejected(self):
+        """Unsupported URLs should raise a clear error."""
+        with pytest.raises(ValueError):
+            create_backend("kafka://localhost")
+
+
+class _FakePubSub:
+    """Pub/sub connection yielding scripted messages, then an error."""
+
+    def __init__(self, messages: list[dict]) -> None:
+        self.messages = messages
+        self.closed = False
+
+    async def psubscribe(self, pattern: str) -> None:
+        pass
+
+    async def listen(self):
+        for message in self.messages:
+            yield message
+        raise ConnectionError("connection reset")
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+class TestRedisBackendReader:
+    """Tests for :class:`RedisBackend` subscription recovery."""
+
+    def test_resubscribes_after_connection_loss(self):
+        """The reader should reconnect and keep delivering messages."""
+        connections = [
+            _FakePubSub(
+                [{"type": "pmessage", "channel": b"meshcore:chan:ws", "data": "1"}]
+            ),
+            _FakePubSub(
+                [{"type": "pmessage", "channel": "meshcore:chan:ws", "data": "2"}]
+            ),
+        ]
+        opened = list(connections)
+        received: list[int] = []
+
+        class FakeRedis:
+            def pubsub(self):
+                return opened.pop(0)
+
+        async def scenario():
+            backend = RedisBackend.__new__(RedisBackend)
+            BroadcastBackend.__init__(backend)
+            backend.prefix = "meshcore"
+            backend.retry_min = backend.retry_max = 0.001
+            backend._redis = FakeRedis()
+            backend._pubsub = None
+
+            async def on_ws(message):
+                received.append(message)
+
+            backend.subscribe("ws", on_ws)
+            reader = asyncio.create_task(backend._read())
+            for _ in range(100):
+                await asyncio.sleep(0.001)
+                if len(received) == 2:
+                    break
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+
+        _run(scenario())
+        assert received == [1, 2]
+        assert connections[0].closed
+
+
+class TestLeaderElection:
+    """Tests for :class:`FileLock` and :func:`run_bot_leader`."""
+
+    def test_only_one_holder(self, tmp_path):
+        """A second lock on the same file should fail until released."""
+        path = str(tmp_path / "bot.lock")
+        first, second = FileLock(path), FileLock(path)
+        assert first.try_acquire() is True
+        assert second.try_acquire() is False
+        first.release()
+        assert second.try_acquire() is True
+        second.release()
+
+    def test_leader_consumes_bot_channel(self, tmp_path, monkeypatch):
+        """The leader should feed published bot events into its queue."""
+        seen: list[dict] = []
+
+        async def fake_worker():
+            seen.append(await worker.event_queue.get())
+
+        async def scenario():
+            monkeypatch.setattr(worker, "event_queue", BotEventQueue())
+            monkeypatch.setattr(worker, "start_bot_worker", fake_worker)
+            monkeypatch.setattr(pubsub, "backend", MemoryBackend())
+            lock = FileLock(str(tmp_path / "bot.lock"))
+            task = asyncio.create_task(worker.run_bot_leader(lock))
+            await asyncio.sleep(0)
+            await pubsub.backend.publish(
+                pubsub.BOT_CHANNEL, {"events": [{"type": "packet", "data": {}}]}
+            )
+            await asyncio.wait_for(task, 1.0)
+            return lock
+
+        lock = _run(scenario())
+        assert seen == [{"type": "packet", "data": {}}]
+        assert lock.held is False
+
+
+class TestBotEventQueue:
+    """Tests for the bounded bot queue and enqueue-time filtering."""
+
+    @staticmethod
+    def _fill(queue: BotEventQueue, count: int) -> list[bool]:
+        async def scenario():
+            return [await queue.put({"n": n}) for n in range(count)]
+
+        return _run(scenario())
+
+    def test_drop_oldest_keeps_newest(self):
+        """A full queue should discard its oldest event."""
+        queue = BotEventQueue(maxsize=2, policy="drop_oldest")
+        assert self._fill(queue, 3) == [True, True, True]
+        assert _run(queue.get()) == {"n": 1}
+        assert queue.stats()["dropped"] == 1
+
+    def test_drop_newest_rejects_incoming(self):
+        """A full queue should refuse new events."""
+        queue = BotEventQueue(maxsize=2, policy="drop_newest")
+        assert self._fill(queue, 3) == [True, True, False]
+        assert _run(queue.get()) == {"n": 0}
+        assert queue.stats()["enqueued"] == 2
+
+    def test_block_waits_for_space(self):
+        """With ``block`` the publisher should wait for the consumer."""
+
+        async def scenario():
+            queue = BotEventQueue(maxsize=1, policy="block")
+            await queue.put({"n": 0})
+            pending = asyncio.create_task(queue.put({"n": 1}))
+            await asyncio.sleep(0.01)
+            assert not pending.done()
+            first = await queue.get()
+            await pending
+            return first, queue.stats()
+
+        first, stats = _run(scenario())
+        assert first == {"n": 0}
+        assert stats["depth"] == 1
+        assert stats["dropped"] == 0
+        assert stats["lag"]["count"] == 1
+
+    def test_block_never_stalls_a_shared_reader(self, monkeypatch):
+        """Outside the memory backend ``block`` should drop, not wait."""
+        queue = BotEventQueue(maxsize=1, policy="block")
+        monkeypatch.setattr(worker, "event_queue", queue)
+        monkeypatch.setattr(worker, "engine", None)
+        monkeypatch.setattr(pubsub, "backend", RedisBackend.__new__(RedisBackend))
+        events = [{"type": "packet", "data": {"n": n}} for n in range(3)]
+
+        async def scenario():
+            await asyncio.wait_for(worker._receive({"events": events}), 1.0)
+            return await queue.get()
+
+        assert _run(scenario()) == events[2]
+        assert queue.stats()["dropped"] == 2
+
+    def test_unknown_policy_rejected(self):
+        """Misconfigured policies should fail loudly."""
+        with pytest.raises(ValueError):
+            BotEventQueue(policy="spill")
+
+    def test_events_no_rule_can_match_are_filtered(self, monkeypatch):
+        """Only events some enabled trigger could fire on should be queued."""
+        rules = [
+            BotRule(
+                id=1,
+                name="acks",
+                trigger_type="packet_type",
+                trigger_value="ACK",
+                action_type="log",
+            )
+        ]
+
+        class StubEngine:
+            def index(self):
+                return RuleIndex(rules)
+
+        queue = BotEventQueue()
+        monkeypatch.setattr(worker, "event_queue", queue)
+        monkeypatch.setattr(worker, "engine", StubEngine())
+        message = {
+            "events": [
+                {"type": "packet", "data": {"packet_type": "ADVERT"}},
+                {"type": "packet", "data": {"packet_type": "ACK"}},
+                {"type": "packet", "data": {"payload_hex": "6869"}},
+            ]
+        }
+        _run(worker._receive(message))
+        assert queue.qsize() == 1
+        assert queue.stats()["filtered"] == 2
+
+    def test_queue_reported_in_metrics(self, client):
+        """``/api/metrics`` should expose the bot queue figures."""
+        data = client.get("/api/metrics").json()
+        assert {"depth", "dropped", "lag"} <= data["bot"]["queue"].keys()
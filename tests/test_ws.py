@@ -0,0 +1,457 @@
+# Copyright © 2025-26 l5yth & contributors
+# Licensed under BSD 3-Clause License
+
+"""Tests for the WebSocket connection manager."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from server.routers.ws import ConnectionManager, negotiate_encoding
+
+
+class FakeWebSocket:
+    """Minimal stand-in for :class:`fastapi.WebSocket`.
+
+    Sends block while :attr:`gate` is clear, simulating a stalled client.
+    """
+
+    def __init__(self, stalled: bool = False) -> None:
+        self.client = SimpleNamespace(host="127.0.0.1", port=1234)
+        self.sent: list[str] = []
+        self.closed_with: int | None = None
+        self.gate = asyncio.Event()
+        if not stalled:
+            self.gate.set()
+
+    async def accept(self) -> None:
+        """Accept the connection (no-op)."""
+
+    async def send_text(self, msg: str) -> None:
+        """Record *msg* once the gate opens."""
+        await self.gate.wait()
+        self.sent.append(msg)
+
+    async def send_bytes(self, msg: bytes) -> None:
+        """Record binary *msg* once the gate opens."""
+        await self.send_text(msg)  # type: ignore[arg-type]
+
+    async def close(self, code: int = 1000) -> None:
+        """Record the close code."""
+        self.closed_with = code
+
+
+def _run(coro):
+    """Helper to run a coroutine synchronously."""
+    return asyncio.run(coro)
+
+
+class TestBroadcastQueues:
+    """Tests for per-client queues in :class:`ConnectionManager`."""
+
+    def test_broadcast_delivers_to_all_clients(self):
+        """Every client should receive the serialized event."""
+
+        async def scenario():
+            mgr = ConnectionManager(queue_size=8)
+            a, b = FakeWebSocket(), FakeWebSocket()
+            await mgr.connect(a)
+            await mgr.connect(b)
+            await mgr.broadcast("packet", {"id": 1})
+            await asyncio.sleep(0)
+            return mgr.seq, a.sent, b.sent
+
+        seq, sent_a, sent_b = _run(scenario())
+        expected = {"type": "packet", "seq": seq, "data": {"id": 1}}
+        assert [json.loads(m) for m in sent_a] == [expected]
+        assert sent_a == sent_b
+
+    def test_stalled_client_does_not_block_and_drops_oldest(self):
+        """A stalled client should lose its oldest frames, not block others."""
+
+        async def scenario():
+            mgr = ConnectionManager(queue_size=2, overflow_policy="drop_oldest")
+            slow, fast = FakeWebSocket(stalled=True), FakeWebSocket()
+            await mgr.connect(slow)
+            await mgr.connect(fast)
+            for i in range(5):
+                await asyncio.wait_for(mgr.broadcast("packet", {"id": i}), 0.1)
+            await asyncio.sleep(0)
+            stats = mgr.stats()
+            slow.gate.set()
+            await asyncio.sleep(0.01)
+            return slow, fast, stats
+
+        slow, fast, stats = _run(scenario())
+        assert len(fast.sent) == 5
+        # One frame was in flight when the queue filled; the rest overflowed.
+        assert [json.loads(m)["data"]["id"] for m in slow.sent] == [0, 3, 4]
+        per_client = {c["id"]: c for c in stats["per_client"]}
+        assert per_client[1]["dropped"] == 2
+        assert stats["dropped_total"] == 2
+
+    def test_disconnect_policy_closes_slow_client(self):
+        """The disconnect policy should remove and close a full client."""
+
+        async def scenario():
+            mgr = ConnectionManager(queue_size=1, overflow_policy="disconnect")
+            slow = FakeWebSocket(stalled=True)
+            await mgr.connect(slow)
+            for i in range(3):
+                await mgr.broadcast("packet", {"id": i})
+                await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return mgr, slow
+
+        mgr, slow = _run(scenario())
+        assert mgr.active == []
+        assert mgr.slow_disconnects == 1
+        assert slow.closed_with == 1013
+
+
+class TestCoalescing:
+    """Tests for v2 batched frames."""
+
+    def test_batch_is_one_frame_for_v2_and_per_event_for_v1(self):
+        """v2 clients get one shared array frame; v1 clients one frame each."""
+
+        async def scenario():
+            mgr = ConnectionManager(queue_size=16)
+            v1, v2a, v2b = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+            await mgr.connect(v1)
+            await mgr.connect(v2a, protocol=2)
+            await mgr.connect(v2b, protocol=2)
+            await mgr.broadcast_many("packet", [{"id": 1}, {"id": 2}, {"id": 3}])
+            await mgr.broadcast("neighbors_updated", {})
+            await asyncio.sleep(0)
+            return v1, v2a, v2b
+
+        v1, v2a, v2b = _run(scenario())
+        assert [json.loads(m)["type"] for m in v1.sent] == ["packet"] * 3 + [
+            "neighbors_updated"
+        ]
+        assert len(v2a.sent) == 2
+        batch = json.loads(v2a.sent[0])
+        assert batch["type"] == "packets"
+        assert batch["data"] == [{"id": 1}, {"id": 2}, {"id": 3}]
+        assert batch["seq"] == json.loads(v1.sent[2])["seq"]
+        assert json.loads(v2a.sent[1])["type"] == "neighbors_updated"
+        # Serialized once and shared between subscribers of the same protocol.
+        assert v2a.sent[0] is v2b.sent[0]
+
+    def test_time_window_merges_separate_broadcasts(self):
+        """With a coalesce window, separate calls should share one frame."""
+
+        async def scenario():
+            mgr = ConnectionManager(queue_size=16, coalesce_ms=20)
+            ws = FakeWebSocket()
+            await mgr.connect(ws, protocol=2)
+            await mgr.broadcast("packet", {"id": 1})
+            await mgr.broadcast("packet", {"id": 2})
+            assert ws.sent == []
+            await asyncio.sleep(0.05)
+            return ws
+
+        ws = _run(scenario())
+        assert [json.loads(m)["data"] for m in ws.sent] == [[{"id": 1}, {"id": 2}]]
+
+
+class TestSubscriptions:
+    """Tests for topic subscriptions and server-side filtering."""
+
+    def test_filters_by_packet_type_and_source(self):
+        """Clients should only receive events matching every dimension."""
+
+        async def scenario():
+            mgr = ConnectionManager(queue_size=16)
+            everything, adverts, fa_only = (FakeWebSocket() for _ in range(3))
+            for ws in (everything, adverts, fa_only):
+                await mgr.connect(ws)
+            await mgr.handle_message(
+                adverts, json.dumps({"type": "subscribe", "packet_types": ["ADVERT"]})
+            )
+            await mgr.handle_message(
+                fa_only,
+                json.dumps(
+                    {"type": "subscribe", "events": ["packet"], "source_hashes": "FA"}
+                ),
+            )
+            await mgr.broadcast_many(
+                "packet",
+                [
+                    {"id": 1, "packet_type": "ADVERT", "source_hash": "FA"},
+                    {"id": 2, "packet_type": "TXT_MSG", "source_hash": "FA"},
+                    {"id": 3, "packet_type": "ADVERT", "source_hash": "BB"},
+                ],
+            )
+            await mgr.broadcast("neighbors_updated", {})
+            await asyncio.sleep(0)
+            return everything, adverts, fa_only
+
+        def received(ws):
+            frames = [json.loads(m) for m in ws.sent]
+            return [
+                f["data"].get("id", f["type"])
+                for f in frames
+                if f["type"] != "subscribed"
+            ]
+
+        everything, adverts, fa_only = _run(scenario())
+        assert received(everything) == [1, 2, 3, "neighbors_updated"]
+        assert received(adverts) == [1, 3, "neighbors_updated"]
+        assert received(fa_only) == [1, 2]
+
+    def test_unsubscribe_restores_all_events(self):
+        """An unsubscribe message should clear every filter."""
+
+        async def scenario():
+            mgr = ConnectionManager(queue_size=16)
+            ws = FakeWebSocket()
+            client = await mgr.connect(ws)
+            await mgr.handle_message(ws, '{"type": "subscribe", "events": ["x"]}')
+            await mgr.handle_message(ws, '{"type": "unsubscribe"}')
+            await mgr.handle_message(ws, "keep-alive")
+            return mgr.subscriptions.subscription(client)
+
+        assert _run(scenario()) == {
+            "events": [],
+            "packet_types": [],
+            "source_hashes": [],
+        }
+
+    def test_disconnect_removes_from_index(self):
+        """Disconnected clients should no longer be routed events."""
+
+        async def scenario():
+            mgr = ConnectionManager(queue_size=16)
+            ws = FakeWebSocket()
+            await mgr.connect(ws)
+            mgr.subscribe(ws, packet_types=["ADVERT"])
+            mgr.disconnect(ws)
+            return mgr.subscriptions.recipients("packet", {"packet_type": "ADVERT"})
+
+        assert _run(scenario()) == set()
+
+
+class TestReplay:
+    """Tests for sequence numbers and reconnect backfill."""
+
+    def test_resume_replays_gap_from_buffer(self):
+        """A client resuming within the buffer should get only missed events."""
+
+        async def scenario():
+            mgr = ConnectionManager(queue_size=16, replay_buffer=10)
+            await mgr.broadcast_many("packet", [{"id": i} for i in range(5)])
+            last_seen = mgr.seq - 3
+            ws = FakeWebSocket()
+            await mgr.connect(ws)
+            await mgr.handle_message(
+                ws, json.dumps({"type": "resume", "last_seq": last_seen})
+            )
+            await asyncio.sleep(0)
+            return mgr, ws
+
+        mgr, ws = _run(scenario())
+        frames = [json.loads(m) for m in ws.sent]
+        assert [f["data"]["id"] for f in frames[:-1]] == [2, 3, 4]
+        assert frames[-1]["type"] == "replay_complete"
+        assert frames[-1]["data"]["source"] == "buffer"
+        assert mgr.replays["buffer"] == 1
+
+    def test_resume_past_buffer_falls_back_to_database(
+        self, client: TestClient, auth_headers: dict
+    ):
+        """A gap older than the buffer should be served from the database."""
+        client.post(
+            "/ingest/packets",
+            json=[{"packet_hash": f"r{i}"} for i in range(4)],
+            headers=auth_headers,
+        )
+        first_id = client.get("/api/packets").json()[-1]["id"]
+
+        async def scenario():
+            mgr = ConnectionManager(queue_size=16, replay_buffer=2)
+            await mgr.broadcast_many("packet", [{"id": i} for i in range(5)])
+            ws = FakeWebSocket()
+            await mgr.connect(ws)
+            await mgr.resume(ws, last_seq=0, last_packet_id=first_id)
+            await asyncio.sleep(0)
+            return ws
+
+        frames = [json.loads(m) for m in _run(scenario()).sent]
+        replayed = [f["data"]["packet_hash"] for f in frames if f["type"] == "packet"]
+        assert replayed == ["r1", "r2", "r3"]
+        assert frames[-1]["data"]["source"] == "db"
+        assert frames[-1]["data"]["resync"] is False
+
+    def test_resume_skips_events_already_delivered_live(self):
+        """Events broadcast after connecting should not be replayed."""
+
+        async def scenario():
+            mgr = ConnectionManager(queue_size=16, replay_buffer=10)
+            await mgr.broadcast_many("packet", [{"id": i} for i in range(3)])
+            last_seen = mgr.seq - 2
+            ws = FakeWebSocket()
+            await mgr.connect(ws)
+            await mgr.broadcast_many("packet", [{"id": 3}, {"id": 4}])
+            await mgr.resume(ws, last_seq=last_seen)
+            await asyncio.sleep(0)
+            return ws
+
+        frames = [json.loads(m) for m in _run(scenario()).sent]
+        packets = [(f["seq"], f["data"]["id"]) for f in frames[:-1]]
+        assert [packet_id for _, packet_id in packets] == [3, 4, 1, 2]
+        assert len({seq for seq, _ in packets}) == 4
+        assert frames[-1]["data"]["replayed"] == 2
+
+    def test_database_resume_stops_at_first_live_packet(
+        self, client: TestClient, auth_headers: dict
+    ):
+        """A database replay should not repeat packets delivered live."""
+        client.post(
+            "/ingest/packets",
+            json=[{"packet_hash": f"d{i}"} for i in range(5)],
+            headers=auth_headers,
+        )
+        rows = client.get("/api/packets").json()[::-1]
+
+        async def scenario():
+            mgr = ConnectionManager(queue_size=16, replay_buffer=1)
+            await mgr.broadcast_many("packet", [{"id": 0}, {"id": 0}])
+            ws = FakeWebSocket()
+            await mgr.connect(ws)
+            first_live = mgr.seq + 1
+            await mgr.broadcast_many("packet", rows[3:])
+            await mgr.resume(ws, last_seq=0, last_packet_id=rows[0]["id"])
+            await asyncio.sleep(0)
+            return first_live, ws
+
+        first_live, ws = _run(scenario())
+        frames = [json.loads(m) for m in ws.sent]
+        replayed = [f for f in frames[2:] if f["type"] == "packet"]
+        assert [f["data"]["packet_hash"] for f in replayed] == ["d1", "d2"]
+        assert {f["seq"] for f in replayed} == {first_live - 1}
+        assert [f["data"]["packet_hash"] for f in frames[:2]] == ["d3", "d4"]
+
+    def test_resume_without_packet_id_requests_resync(self):
+        """With no way to backfill, the client should be told to resync."""
+
+        async def scenario():
+            mgr = ConnectionManager(queue_size=16, replay_buffer=1)
+            await mgr.broadcast_many("packet", [{"id": 1}, {"id": 2}])
+            ws = FakeWebSocket()
+            await mgr.connect(ws)
+            await mgr.resume(ws, last_seq=0)
+            await asyncio.sleep(0)
+            return ws
+
+        (frame,) = [json.loads(m) for m in _run(scenario()).sent]
+        assert frame["type"] == "replay_complete"
+        assert frame["data"]["resync"] is True
+
+
+class TestBinaryEncodings:
+    """Tests for subprotocol negotiation and binary frames."""
+
+    def test_negotiation_falls_back_to_json(self):
+        """Unknown subprotocols should yield plain JSON with no subprotocol."""
+        assert negotiate_encoding(["graphql-ws"]) == ("json", None)
+        assert negotiate_encoding([]) == ("json", None)
+
+    def test_msgpack_frames_shared_and_counted(self):
+        """msgpack clients should get one shared binary frame per batch."""
+        msgpack = pytest.importorskip("msgpack")
+        assert negotiate_encoding(["meshcore.msgpack", "meshcore.json"]) == (
+            "msgpack",
+            "meshcore.msgpack",
+        )
+
+        async def scenario():
+            mgr = ConnectionManager(queue_size=16)
+            a, b, j = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+            await mgr.connect(a, protocol=2, encoding="msgpack")
+            await mgr.connect(b, protocol=2, encoding="msgpack")
+            await mgr.connect(j, protocol=2)
+            await mgr.broadcast_many("packet", [{"id": 1}, {"id": 2}])
+            await asyncio.sleep(0)
+            return mgr.stats()["encodings"], a, b, j
+
+        encodings, a, b, j = _run(scenario())
+        assert a.sent[0] is b.sent[0]
+        assert msgpack.unpackb(a.sent[0])["data"] == [{"id": 1}, {"id": 2}]
+        assert encodings["msgpack"]["packets"] == 4
+        assert encodings["msgpack"]["bytes_per_packet"] < (
+            encodings["json"]["bytes_per_packet"]
+        )
+
+
+def test_metrics_endpoint_reports_ws_stats(client: TestClient):
+    """``/api/metrics`` should include the broadcast counters."""
+    resp = client.get("/api/metrics")
+    assert resp.status_code == 200
+    assert resp.json()["ws"]["overflow_policy"] == "drop_oldest"
+
+
+def test_ingested_packet_reaches_websocket(auth_headers: dict):
+    """A packet posted to the ingest API should be pushed to ``/ws``."""
+    from server.main import app
+
+    with TestClient(app) as tc, tc.websocket_connect("/ws") as ws:
+        tc.post(
+            "/ingest/packets",
+            json=[{"packet_hash": "ws1", "packet_type": "ADVERT"}],
+            headers=auth_headers,
+        )
+        event = ws.receive_json()
+    assert event["type"] == "packet"
+    assert event["data"]["packet_hash"] == "ws1"
+
+
+def test_v2_client_receives_packets_frame(auth_headers: dict):
+    """A ``?v=2`` client should receive an ingest batch as one frame."""
+    from server.main import app
+
+    with TestClient(app) as tc, tc.websocket_connect("/ws?v=2") as ws:
+        tc.post(
+            "/ingest/packets",
+            json=[{"packet_hash": "b1"}, {"packet_hash": "b2"}],
+            headers=auth_headers,
+        )
+        event = ws.receive_json()
+    assert event["type"] == "packets"
+    assert [p["packet_hash"] for p in event["data"]] == ["b1", "b2"]
+
+
+def test_msgpack_subprotocol_handshake(auth_headers: dict):
+    """Offering ``meshcore.msgpack`` should yield binary frames."""
+    msgpack = pytest.importorskip("msgpack")
+    from server.main import app
+
+    with TestClient(app) as tc, tc.websocket_connect(
+        "/ws?v=2", subprotocols=["meshcore.msgpack"]
+    ) as ws:
+        assert ws.accepted_subprotocol == "meshcore.msgpack"
+        tc.post("/ingest/packets", json=[{"packet_hash": "m1"}], headers=auth_headers)
+        event = msgpack.unpackb(ws.receive_bytes())
+    assert event["type"] == "packets"
+    assert event["data"][0]["packet_hash"] == "m1"
+
+
+def test_binary_control_frames_use_negotiated_codec():
+    """A msgpack client should be able to subscribe with a binary frame."""
+    msgpack = pytest.importorskip("msgpack")
+    from server.main import app
+
+    with TestClient(app) as tc, tc.websocket_connect(
+        "/ws", subprotocols=["meshcore.msgpack"]
+    ) as ws:
+        ws.send_bytes(b"\xc1")  # never valid msgpack; ignored
+        ws.send_bytes(msgpack.packb({"type": "subscribe", "events": ["packet"]}))
+        ack = msgpack.unpackb(ws.receive_bytes())
+    assert ack == {
+        "type": "subscribed",
+        "data": {"events": ["packet"], "packet_types": [], "source_hashes": []},
+    }